@@ -45,30 +45,40 @@ UNWANTED_PATTERNS = [
 ]
 
 def save_to_json(data, filename):
-    """Save data to JSON file"""
+    """Save nested data to a compact JSON file"""
     data_dir = Path(__file__).parent.parent / "data"
     data_dir.mkdir(exist_ok=True)
     filepath = data_dir / filename
     
     with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
     
     print(f"   Saved to: {filepath.name}")
     return filepath
 
-def save_to_csv(data, filename, headers):
-    """Save data to CSV file"""
+def save_records(records, name, headers):
+    """Stream records to <name>.csv and <name>.jsonl, one record at a time
+    
+    Records can be a generator, so large reports are never held in memory.
+    Returns the number of records saved.
+    """
     data_dir = Path(__file__).parent.parent / "data"
     data_dir.mkdir(exist_ok=True)
-    filepath = data_dir / filename
+    csv_path = data_dir / f"{name}.csv"
+    jsonl_path = data_dir / f"{name}.jsonl"
     
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
+    count = 0
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file, \
+            open(jsonl_path, 'w', encoding='utf-8') as jsonl_file:
+        writer = csv.DictWriter(csv_file, fieldnames=headers)
         writer.writeheader()
-        writer.writerows(data)
+        for record in records:
+            writer.writerow(record)
+            jsonl_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
     
-    print(f"   Saved to: {filepath.name}")
-    return filepath
+    print(f"   Saved {count} rows to: {csv_path.name}, {jsonl_path.name}")
+    return count
 
 def get_campaigns(client, customer_id):
     """Get all campaigns"""
@@ -296,7 +306,7 @@ def get_negative_keyword_lists(client, customer_id):
     return dict(lists)
 
 def get_search_queries(client, customer_id):
-    """Get search query report"""
+    """Yield the search query report, one row at a time"""
     ga_service = client.get_service("GoogleAdsService")
     
     query = """
@@ -320,31 +330,27 @@ def get_search_queries(client, customer_id):
     
     print("Fetching search queries (last 14 days)...")
     
-    response = ga_service.search(customer_id=customer_id, query=query)
-    
-    queries = []
-    for row in response:
-        queries.append({
-            'search_term': row.search_term_view.search_term,
-            'status': row.search_term_view.status.name,
-            'campaign_id': row.campaign.id,
-            'campaign_name': row.campaign.name,
-            'ad_group_id': row.ad_group.id,
-            'ad_group_name': row.ad_group.name,
-            'keyword': row.segments.keyword.info.text if row.segments.keyword.info.text else 'N/A',
-            'match_type': row.segments.keyword.info.match_type.name if row.segments.keyword.info.match_type else 'UNKNOWN',
-            'impressions': row.metrics.impressions,
-            'clicks': row.metrics.clicks,
-            'cost': row.metrics.cost_micros / 1_000_000,
-            'conversions': row.metrics.conversions
-        })
-    
-    return queries
+    stream = ga_service.search_stream(customer_id=customer_id, query=query)
+    
+    for batch in stream:
+        for row in batch.results:
+            yield {
+                'search_term': row.search_term_view.search_term,
+                'status': row.search_term_view.status.name,
+                'campaign_id': row.campaign.id,
+                'campaign_name': row.campaign.name,
+                'ad_group_id': row.ad_group.id,
+                'ad_group_name': row.ad_group.name,
+                'keyword': row.segments.keyword.info.text if row.segments.keyword.info.text else 'N/A',
+                'match_type': row.segments.keyword.info.match_type.name if row.segments.keyword.info.match_type else 'UNKNOWN',
+                'impressions': row.metrics.impressions,
+                'clicks': row.metrics.clicks,
+                'cost': row.metrics.cost_micros / 1_000_000,
+                'conversions': row.metrics.conversions
+            }
 
-def analyze_unwanted_queries(queries):
-    """Identify unwanted queries"""
-    unwanted = []
-    
+def analyze_unwanted_queries(queries, unwanted):
+    """Pass queries through, collecting the unwanted ones into `unwanted`"""
     for query in queries:
         search_term = query['search_term'].lower()
         
@@ -355,10 +361,10 @@ def analyze_unwanted_queries(queries):
                     'unwanted_pattern': pattern
                 })
                 break
-    
-    return unwanted
+        
+        yield query
 
-def generate_analysis_report(campaigns, ad_groups, keywords, negatives, neg_lists, queries, unwanted):
+def generate_analysis_report(campaigns, ad_groups, keywords, negatives, neg_lists, query_count, unwanted):
     """Generate comprehensive analysis report"""
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -381,7 +387,7 @@ def generate_analysis_report(campaigns, ad_groups, keywords, negatives, neg_list
         f.write(f"Campaign-level Negatives: {len(negatives['campaign'])}\n")
         f.write(f"Ad Group-level Negatives: {len(negatives['ad_group'])}\n")
         f.write(f"Shared Negative Lists: {len(neg_lists)}\n")
-        f.write(f"Search Queries (14 days): {len(queries)}\n")
+        f.write(f"Search Queries (14 days): {query_count}\n")
         f.write(f"Unwanted Queries: {len(unwanted)}\n\n")
         
         # Campaigns
@@ -458,22 +464,19 @@ def main():
     print("-" * 80)
     
     campaigns = get_campaigns(client, CUSTOMER_ID)
-    save_to_json(campaigns, 'campaigns.json')
-    save_to_csv(campaigns, 'campaigns.csv', 
-                ['id', 'name', 'status', 'type', 'bidding_strategy', 
-                 'impressions', 'clicks', 'cost', 'conversions'])
+    save_records(campaigns, 'campaigns',
+                 ['id', 'name', 'status', 'type', 'bidding_strategy', 
+                  'impressions', 'clicks', 'cost', 'conversions'])
     
     ad_groups = get_ad_groups(client, CUSTOMER_ID)
-    save_to_json(ad_groups, 'ad_groups.json')
-    save_to_csv(ad_groups, 'ad_groups.csv',
-                ['campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name',
-                 'status', 'type', 'impressions', 'clicks', 'cost'])
+    save_records(ad_groups, 'ad_groups',
+                 ['campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name',
+                  'status', 'type', 'impressions', 'clicks', 'cost'])
     
     keywords = get_keywords(client, CUSTOMER_ID)
-    save_to_json(keywords, 'keywords.json')
-    save_to_csv(keywords, 'keywords.csv',
-                ['campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name', 'keyword', 'match_type', 
-                 'status', 'quality_score', 'impressions', 'clicks', 'cost', 'conversions'])
+    save_records(keywords, 'keywords',
+                 ['campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name', 'keyword', 'match_type', 
+                  'status', 'quality_score', 'impressions', 'clicks', 'cost', 'conversions'])
     
     negatives = get_negative_keywords(client, CUSTOMER_ID)
     all_negatives = negatives['campaign'] + negatives['ad_group']
@@ -486,8 +489,8 @@ def main():
         if 'ad_group_id' not in neg:
             neg['ad_group_id'] = ''
     
-    save_to_csv(all_negatives, 'negative_keywords.csv',
-                ['campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name', 'keyword', 'match_type', 'level'])
+    save_records(all_negatives, 'negative_keywords',
+                 ['campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name', 'keyword', 'match_type', 'level'])
     
     neg_lists = get_negative_keyword_lists(client, CUSTOMER_ID)
     save_to_json(neg_lists, 'negative_keyword_lists.json')
@@ -498,30 +501,31 @@ def main():
         for kw in keywords:
             neg_list_flat.append(kw)
     if neg_list_flat:
-        save_to_csv(neg_list_flat, 'negative_keyword_lists.csv',
-                    ['list_id', 'list_name', 'keyword', 'match_type'])
+        save_records(neg_list_flat, 'negative_keyword_lists',
+                     ['list_id', 'list_name', 'keyword', 'match_type'])
     
-    queries = get_search_queries(client, CUSTOMER_ID)
-    save_to_json(queries, 'search_queries.json')
-    save_to_csv(queries, 'search_queries.csv',
-                ['search_term', 'status', 'campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name',
-                 'keyword', 'match_type', 'impressions', 'clicks', 'cost', 'conversions'])
+    # Search queries are written as they are streamed, and only the unwanted
+    # ones are kept in memory for the analysis
+    unwanted = []
+    query_count = save_records(
+        analyze_unwanted_queries(get_search_queries(client, CUSTOMER_ID), unwanted),
+        'search_queries',
+        ['search_term', 'status', 'campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name',
+         'keyword', 'match_type', 'impressions', 'clicks', 'cost', 'conversions'])
     
     print()
     print("ANALYZING DATA...")
     print("-" * 80)
     
-    unwanted = analyze_unwanted_queries(queries)
     if unwanted:
-        save_to_json(unwanted, 'unwanted_queries.json')
-        save_to_csv(unwanted, 'unwanted_queries.csv',
-                    ['search_term', 'status', 'unwanted_pattern', 'keyword', 'match_type',
-                     'campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name', 
-                     'impressions', 'clicks', 'cost', 'conversions'])
+        save_records(unwanted, 'unwanted_queries',
+                     ['search_term', 'status', 'unwanted_pattern', 'keyword', 'match_type',
+                      'campaign_id', 'campaign_name', 'ad_group_id', 'ad_group_name', 
+                      'impressions', 'clicks', 'cost', 'conversions'])
     
     # Generate report
     report_path = generate_analysis_report(campaigns, ad_groups, keywords, 
-                                           negatives, neg_lists, queries, unwanted)
+                                           negatives, neg_lists, query_count, unwanted)
     
     print()
     print("=" * 80)
@@ -0,0 +1,333 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Group-by aggregation of GAQL results as they are streamed.
+
+Rows are folded into one accumulator per group as they arrive, so memory
+grows with the number of groups rather than with the number of rows. Only
+the top groups are kept once the stream ends.
+
+Aggregates are written as `function(field)`, e.g. `sum(metrics.clicks)`,
+with the functions of `FUNCTIONS`. A bare field name is summed, and
+`count(*)` counts the rows of each group.
+"""
+
+from collections.abc import Sequence
+import heapq
+import json
+import re
+from typing import Any
+
+from ads_mcp import formatters
+
+FUNCTIONS = ("sum", "avg", "min", "max", "count", "count_distinct")
+
+_AGGREGATE = re.compile(r"^(\w+)\s*\(\s*([\w.]+|\*)\s*\)$")
+_FIELD = re.compile(r"^[a-z][\w.]*$", re.IGNORECASE)
+_ORDER_TERM = re.compile(r"^(.+?)(?:\s+(ASC|DESC))?$", re.IGNORECASE)
+
+
+class Aggregate:
+  """An aggregate function of a field."""
+
+  def __init__(self, function: str, field: str | None):
+    self.function = function
+    self.field = field
+
+  @property
+  def name(self) -> str:
+    field = self.field or "*"
+    return f"{self.function}({field})"
+
+  @classmethod
+  def parse(cls, text: str) -> "Aggregate":
+    """Parses an aggregate, e.g. "sum(metrics.cost_micros)".
+
+    Raises:
+        ValueError: If the aggregate is invalid.
+    """
+    text = text.strip()
+    match = _AGGREGATE.match(text)
+    if match is None:
+      if not _FIELD.match(text):
+        raise ValueError(
+            f"Invalid aggregate {text!r}, expected e.g."
+            " sum(metrics.clicks) or count(*)."
+        )
+      return cls("sum", text)
+    function, field = match.group(1).lower(), match.group(2)
+    if function not in FUNCTIONS:
+      functions = ", ".join(FUNCTIONS)
+      raise ValueError(
+          f"Unknown aggregate function {function!r}, expected one of"
+          f" {functions}."
+      )
+    if field == "*":
+      if function != "count":
+        raise ValueError(f"Only count can aggregate *, not {function}.")
+      return cls(function, None)
+    return cls(function, field)
+
+
+def _key_value(value: Any) -> Any:
+  """Gets a hashable value equal for equal values of a group field."""
+  if isinstance(value, (dict, list)):
+    return json.dumps(value, sort_keys=True)
+  return value
+
+
+def _sort_key(index: int, descending: bool) -> Any:
+  """Gets the sort key of a column, with empty values last either way."""
+
+  def key(row: list[Any]) -> tuple[bool, Any]:
+    value = row[index]
+    if value is None:
+      return (not descending, 0)
+    return (descending, _key_value(value))
+
+  return key
+
+
+class Aggregation:
+  """Groups rows and aggregates fields of each group incrementally."""
+
+  def __init__(
+      self,
+      group_by: Sequence[str],
+      aggregates: Sequence[str],
+      order_by: str | None = None,
+      limit: int | None = None,
+      max_groups: int | None = None,
+  ):
+    """Initializes the aggregation.
+
+    Args:
+        group_by: The fields whose values define the groups. All rows are in
+            a single group if empty.
+        aggregates: The aggregates computed for each group.
+        order_by: (Optional) The output columns to sort the groups by, each
+            followed by ASC or DESC and separated by commas, e.g.
+            "sum(metrics.cost_micros) DESC". By default, the first aggregate
+            in descending order.
+        limit: (Optional) The maximum number of groups returned.
+        max_groups: (Optional) The maximum number of groups held in memory.
+
+    Raises:
+        ValueError: If an aggregate or the order is invalid.
+    """
+    if not aggregates:
+      raise ValueError("At least one aggregate is needed, e.g. count(*).")
+    if limit is not None and limit < 1:
+      raise ValueError("limit must be a positive number.")
+    self.group_by = [field.strip() for field in group_by]
+    self.aggregates = [Aggregate.parse(text) for text in aggregates]
+    self.columns = self.group_by + [a.name for a in self.aggregates]
+    if len(set(self.columns)) != len(self.columns):
+      raise ValueError("The group by fields and aggregates must be unique.")
+    self.order = self._parse_order(order_by)
+    self.limit = limit
+    self.max_groups = max_groups
+    self.rows_read = 0
+    # The values of the group fields and the aggregate state of each group.
+    self._groups: dict[tuple[Any, ...], tuple[list[Any], list[Any]]] = {}
+    self._group_indexes: list[int] = []
+    self._aggregate_indexes: list[int | None] = []
+    self._source_columns: list[str] | None = None
+
+  def _parse_order(self, order_by: str | None) -> list[tuple[int, bool]]:
+    """Parses the order, as (column index, descending) pairs."""
+    if not order_by or not order_by.strip():
+      return [(len(self.group_by), True)]
+    order = []
+    for term in order_by.split(","):
+      match = _ORDER_TERM.match(term.strip())
+      name = match.group(1).strip()
+      if name not in self.group_by:
+        try:
+          name = Aggregate.parse(name).name
+        except ValueError:
+          pass
+      if name not in self.columns:
+        columns = ", ".join(self.columns)
+        raise ValueError(
+            f"Cannot order by {name!r}, expected one of the output columns:"
+            f" {columns}."
+        )
+      descending = (match.group(2) or "ASC").upper() == "DESC"
+      order.append((self.columns.index(name), descending))
+    return order
+
+  @property
+  def fields(self) -> list[str]:
+    """The fields the aggregation reads."""
+    fields = list(self.group_by)
+    for aggregate in self.aggregates:
+      if aggregate.field is not None and aggregate.field not in fields:
+        fields.append(aggregate.field)
+    return fields
+
+  def check_fields(self, columns: Sequence[str]):
+    """Checks that the fields the aggregation reads are selected.
+
+    Raises:
+        ValueError: If a field is not one of the columns.
+    """
+    missing = [field for field in self.fields if field not in columns]
+    if missing:
+      fields = ", ".join(missing)
+      raise ValueError(
+          f"The query does not select {fields}. Add the fields to the SELECT"
+          " clause."
+      )
+
+  def _bind(self, columns: list[str]):
+    self.check_fields(columns)
+    self._source_columns = columns
+    self._group_indexes = [columns.index(field) for field in self.group_by]
+    self._aggregate_indexes = [
+        None if a.field is None else columns.index(a.field)
+        for a in self.aggregates
+    ]
+
+  def _new_state(self) -> list[Any]:
+    state = []
+    for aggregate in self.aggregates:
+      if aggregate.function == "avg":
+        state.append([0, 0])
+      elif aggregate.function == "count_distinct":
+        state.append(set())
+      elif aggregate.function in ("sum", "count"):
+        state.append(0)
+      else:
+        state.append(None)
+    return state
+
+  def add(self, columns: list[str], rows: Sequence[list[Any]]):
+    """Folds rows into the groups.
+
+    Args:
+        columns: The fields of the values of the rows.
+        rows: The formatted values of each row.
+
+    Raises:
+        ValueError: If a summed or averaged field is not a number, or if
+            there are more than `max_groups` groups.
+    """
+    if columns != self._source_columns:
+      self._bind(columns)
+    group_indexes = self._group_indexes
+    aggregations = list(
+        zip(
+            range(len(self.aggregates)),
+            (a.function for a in self.aggregates),
+            self._aggregate_indexes,
+        )
+    )
+    groups = self._groups
+    for row in rows:
+      key = tuple(_key_value(row[i]) for i in group_indexes)
+      group = groups.get(key)
+      if group is None:
+        if self.max_groups is not None and len(groups) >= self.max_groups:
+          raise ValueError(
+              f"There are more than {self.max_groups} groups. Group by fewer"
+              " fields or filter the query."
+          )
+        group = groups[key] = (
+            [row[i] for i in group_indexes],
+            self._new_state(),
+        )
+      state = group[1]
+      for position, function, index in aggregations:
+        if index is None:
+          state[position] += 1
+          continue
+        value = row[index]
+        if value is None:
+          continue
+        try:
+          if function == "sum":
+            state[position] += value
+          elif function == "count":
+            state[position] += 1
+          elif function == "avg":
+            state[position][0] += value
+            state[position][1] += 1
+          elif function == "count_distinct":
+            state[position].add(_key_value(value))
+          elif function == "min":
+            if state[position] is None or value < state[position]:
+              state[position] = value
+          elif state[position] is None or value > state[position]:
+            state[position] = value
+        except TypeError as e:
+          field = self.aggregates[position].field
+          raise ValueError(
+              f"Cannot compute {function} of {field}, its values are not"
+              " numbers."
+          ) from e
+    self.rows_read += len(rows)
+
+  def reset(self):
+    """Drops the groups, to fold the rows of a stream again."""
+    self._groups.clear()
+    self.rows_read = 0
+
+  @property
+  def group_count(self) -> int:
+    return len(self._groups)
+
+  def _final_values(self, state: list[Any], convert_micros: bool) -> list[Any]:
+    values = []
+    for aggregate, value in zip(self.aggregates, state):
+      if aggregate.function == "avg":
+        value = value[0] / value[1] if value[1] else None
+      elif aggregate.function == "count_distinct":
+        value = len(value)
+      if (
+          convert_micros
+          and aggregate.function not in ("count", "count_distinct")
+          and aggregate.field.endswith("_micros")
+          and isinstance(value, (int, float))
+      ):
+        value = formatters.micros_to_currency(value)
+      values.append(value)
+    return values
+
+  def result(self, convert_micros: bool = False) -> list[list[Any]]:
+    """Gets the top groups, in order.
+
+    Args:
+        convert_micros: Whether aggregated `*_micros` amounts are converted
+            to currency.
+
+    Returns:
+        The values of the group fields then of the aggregates of each group.
+    """
+    rows = [
+        values + self._final_values(state, convert_micros)
+        for values, state in self._groups.values()
+    ]
+    keys = [
+        (_sort_key(index, descending), descending)
+        for index, descending in self.order
+    ]
+    if self.limit is not None and len(keys) == 1:
+      key, descending = keys[0]
+      select = heapq.nlargest if descending else heapq.nsmallest
+      return select(self.limit, rows, key=key)
+    # Sort by the last order column first, sorts being stable.
+    for key, descending in reversed(keys):
+      rows.sort(key=key, reverse=descending)
+    return rows[: self.limit]
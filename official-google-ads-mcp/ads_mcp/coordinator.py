@@ -14,10 +14,11 @@
 
 """The coordinator for the Google Ads API MCP."""
 
+from ads_mcp.metrics import MetricsMiddleware
 from fastmcp import FastMCP
 
-
 # Initialize FastMCP server
 mcp_server = FastMCP(
     name="Google Ads API",
+    middleware=[MetricsMiddleware()],
 )
@@ -0,0 +1,171 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Server-held cursors for paginated query results."""
+
+import collections
+import secrets
+import threading
+import time
+from typing import Any, Protocol
+
+
+class Closeable(Protocol):
+
+  def close(self):
+    ...
+
+
+class _Cursor:
+  """A cursor entry, the held value and when it expires."""
+
+  def __init__(self, value: Closeable, owner: Any, expires_at: float):
+    self.value = value
+    self.owner = owner
+    self.expires_at = expires_at
+    self.lock = threading.Lock()
+
+
+class CursorStore:
+  """A bounded store of server-held cursors that expire when left idle.
+
+  Each cursor holds a value, such as an open result stream, that is closed
+  when the cursor expires, is evicted to make room for a new cursor, or is
+  released once the results are exhausted. Expired cursors are swept by a
+  background thread while the store holds cursors, so that an abandoned
+  cursor does not keep its stream open when no other cursor is used.
+  """
+
+  def __init__(
+      self,
+      ttl_seconds: float,
+      max_cursors: int,
+      clock=time.monotonic,
+      sweep_seconds: float | None = None,
+  ):
+    """Initializes the store.
+
+    Args:
+        ttl_seconds: The time after which an unused cursor expires.
+        max_cursors: The maximum number of cursors held.
+        clock: (Optional) The clock of the expiry times.
+        sweep_seconds: (Optional) The interval of the background sweep of
+            expired cursors, half the time to live by default.
+    """
+    self._ttl_seconds = ttl_seconds
+    self._max_cursors = max_cursors
+    self._clock = clock
+    self._sweep_seconds = (
+        sweep_seconds if sweep_seconds is not None else ttl_seconds / 2
+    )
+    self._cursors: collections.OrderedDict[str, _Cursor] = (
+        collections.OrderedDict()
+    )
+    self._lock = threading.Lock()
+    self._sweeper: threading.Thread | None = None
+
+  def _expire(self) -> list[_Cursor]:
+    """Removes idle and excess cursors, returns them for closing."""
+    now = self._clock()
+    removed = []
+    for cursor_id, cursor in list(self._cursors.items()):
+      if cursor.expires_at > now:
+        break  # Cursors are kept in expiry order.
+      removed.append(self._cursors.pop(cursor_id))
+    while len(self._cursors) > self._max_cursors:
+      removed.append(self._cursors.popitem(last=False)[1])
+    return removed
+
+  @staticmethod
+  def _close(cursors: list[_Cursor]):
+    for cursor in cursors:
+      with cursor.lock:
+        cursor.value.close()
+
+  def add(self, value: Closeable, owner: Any = None) -> str:
+    """Adds a cursor holding a value.
+
+    Args:
+        value: The value held by the cursor.
+        owner: (Optional) The identity allowed to use the cursor.
+
+    Returns:
+        The opaque ID of the new cursor.
+    """
+    cursor_id = secrets.token_urlsafe(16)
+    with self._lock:
+      self._cursors[cursor_id] = _Cursor(
+          value, owner, self._clock() + self._ttl_seconds
+      )
+      removed = self._expire()
+      if self._sweeper is None:
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, name="ads-mcp-cursor-sweep", daemon=True
+        )
+        self._sweeper.start()
+    self._close(removed)
+    return cursor_id
+
+  def sweep(self):
+    """Closes the cursors that have expired."""
+    with self._lock:
+      removed = self._expire()
+    self._close(removed)
+
+  def _sweep_loop(self):
+    """Sweeps expired cursors until the store is empty."""
+    while True:
+      time.sleep(self._sweep_seconds)
+      self.sweep()
+      with self._lock:
+        if not self._cursors:
+          self._sweeper = None
+          return
+
+  def checkout(self, cursor_id: str, owner: Any = None) -> _Cursor:
+    """Gets a cursor and extends its time to live.
+
+    The caller must hold `cursor.lock` while using the cursor value.
+
+    Args:
+        cursor_id: The ID of the cursor.
+        owner: (Optional) The identity using the cursor.
+
+    Returns:
+        The cursor.
+
+    Raises:
+        KeyError: If the cursor does not exist, has expired or belongs to
+            another owner.
+    """
+    with self._lock:
+      removed = self._expire()
+      cursor = self._cursors.get(cursor_id)
+      if cursor is not None and cursor.owner == owner:
+        cursor.expires_at = self._clock() + self._ttl_seconds
+        self._cursors.move_to_end(cursor_id)
+    self._close(removed)
+    if cursor is None or cursor.owner != owner:
+      raise KeyError(cursor_id)
+    return cursor
+
+  def release(self, cursor_id: str):
+    """Removes a cursor and closes its value."""
+    with self._lock:
+      cursor = self._cursors.pop(cursor_id, None)
+    if cursor is not None:
+      cursor.value.close()
+
+  def __len__(self) -> int:
+    return len(self._cursors)
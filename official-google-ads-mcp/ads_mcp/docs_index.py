@@ -0,0 +1,337 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An in-memory index of the Google Ads API docs in `context/`.
+
+Docs are read from disk on first use and kept in memory, together with the
+parsed metadata of each reporting view. The modification time of a file is
+checked at most once per `check_interval` seconds, so docs regenerated on
+disk are picked up without re-reading them on every call.
+
+The metadata of the reporting views is read from a single bundle,
+`views-<API version>.json`, when one exists, and from the YAML files in
+`views/` otherwise.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any
+
+from ads_mcp.utils import ADS_API_VERSION
+from ads_mcp.utils import dump_yaml
+from ads_mcp.utils import load_yaml
+from ads_mcp.utils import MODULE_DIR
+
+CONTEXT_PATH = os.path.join(MODULE_DIR, "context")
+FIELD_CATEGORIES = ("attributes", "segments", "metrics")
+BUNDLE_FORMAT = 1
+
+_VIEW_NAME = re.compile(r"^[a-z0-9_]+$")
+
+
+class _CachedFile:
+  """The text of a doc file, its parsed forms and when it was checked."""
+
+  def __init__(
+      self, text: str | None, mtime_ns: int | None, checked_at: float
+  ):
+    self.text = text
+    self.mtime_ns = mtime_ns
+    self.checked_at = checked_at
+    self.parsed: Any = None
+    self.fields: dict[str, dict[str, Any]] | None = None
+
+
+def bundle_file_name(api_version: str = ADS_API_VERSION) -> str:
+  return f"views-{api_version}.json"
+
+
+def build_bundle(
+    views: dict[str, dict[str, Any]], api_version: str = ADS_API_VERSION
+) -> dict[str, Any]:
+  """Builds the bundle of the metadata of reporting views.
+
+  The metadata of a field is stored once in `fields`, and each view lists
+  the names of its fields by category. Fields whose metadata differs from
+  the shared one are stored inline in the view.
+
+  Args:
+      views: The metadata of each view, as saved in its YAML file.
+      api_version: The Google Ads API version of the views.
+
+  Returns:
+      The bundle, to be serialized as JSON.
+  """
+  fields = {}
+  bundled_views = {}
+  for view, view_data in sorted(views.items()):
+    bundled_view = dict(view_data)
+    for category in FIELD_CATEGORIES:
+      entries = []
+      for name, metadata in (view_data.get(category) or {}).items():
+        shared = fields.setdefault(name, metadata)
+        entries.append(name if shared == metadata else {name: metadata})
+      bundled_view[category] = entries
+    bundled_views[view] = bundled_view
+  return {
+      "format": BUNDLE_FORMAT,
+      "api_version": api_version,
+      "fields": fields,
+      "views": bundled_views,
+  }
+
+
+class _Bundle:
+  """The metadata of all reporting views, read from a single file."""
+
+  def __init__(self, data: dict[str, Any], mtime_ns: int | None):
+    self.mtime_ns = mtime_ns
+    self.view_names = tuple(sorted(data["views"]))
+    self._fields = data["fields"]
+    self._views = data["views"]
+    self._files: dict[str, _CachedFile] = {}
+
+  def get_view_file(self, view: str) -> _CachedFile | None:
+    """Gets a view as if it was read from its YAML file."""
+    cached = self._files.get(view)
+    if cached is not None:
+      return cached
+    view_data = self._views.get(view)
+    if view_data is None:
+      return None
+    parsed = dict(view_data)
+    for category in FIELD_CATEGORIES:
+      fields = {}
+      for entry in view_data.get(category) or ():
+        if isinstance(entry, str):
+          fields[entry] = self._fields[entry]
+        else:
+          fields.update(entry)
+      parsed[category] = fields
+    cached = _CachedFile(None, self.mtime_ns, 0.0)
+    cached.parsed = parsed
+    self._files[view] = cached
+    return cached
+
+
+class DocsIndex:
+  """Docs of the `context/` directory, loaded on first use."""
+
+  def __init__(
+      self,
+      root: str = CONTEXT_PATH,
+      check_interval: float = 1.0,
+      clock=time.monotonic,
+      bundle_name: str = bundle_file_name(),
+  ):
+    self.root = root
+    self.bundle_name = bundle_name
+    self._check_interval = check_interval
+    self._clock = clock
+    self._files: dict[str, _CachedFile] = {}
+    self._views: tuple[str, ...] = ()
+    self._views_mtime_ns: int | None = None
+    self._views_checked_at: float | None = None
+    self._generation = 0
+    self._lock = threading.Lock()
+
+  def _get(self, relative_path: str) -> _CachedFile:
+    """Gets a doc file, reloading it if it changed on disk."""
+    now = self._clock()
+    cached = self._files.get(relative_path)
+    if cached is not None and now - cached.checked_at < self._check_interval:
+      return cached
+
+    with self._lock:
+      path = os.path.join(self.root, relative_path)
+      try:
+        mtime_ns = os.stat(path).st_mtime_ns
+      except FileNotFoundError:
+        mtime_ns = None
+      cached = self._files.get(relative_path)
+      if cached is not None and cached.mtime_ns == mtime_ns:
+        cached.checked_at = now
+        return cached
+
+      text = None
+      if mtime_ns is not None:
+        with open(path, "r", encoding="utf-8") as f:
+          text = f.read()
+      cached = _CachedFile(text, mtime_ns, now)
+      self._files[relative_path] = cached
+      return cached
+
+  def invalidate(self):
+    """Drops all loaded docs, they are read again on next use."""
+    with self._lock:
+      self._clear()
+
+  def _clear(self):
+    self._files.clear()
+    self._views_checked_at = None
+    self._generation += 1
+
+  def replace_views(self, new_views_path: str):
+    """Swaps in a new directory of view docs.
+
+    The previous docs keep being served until the new directory is in
+    place, then all docs are read again on next use.
+
+    Args:
+        new_views_path: The directory of the new view docs. It is moved to
+            the `views` directory of the docs root.
+    """
+    views_path = os.path.join(self.root, "views")
+    old_views_path = f"{views_path}.old"
+    shutil.rmtree(old_views_path, ignore_errors=True)
+    with self._lock:
+      if os.path.isdir(views_path):
+        os.rename(views_path, old_views_path)
+      os.rename(new_views_path, views_path)
+      self._clear()
+    shutil.rmtree(old_views_path, ignore_errors=True)
+
+  def read_text(self, relative_path: str) -> str | None:
+    """Gets the text of a doc file, None if it does not exist.
+
+    Args:
+        relative_path: The path of the file, relative to the docs root.
+    """
+    return self._get(relative_path).text
+
+  def _get_bundle(self) -> _Bundle | None:
+    """Gets the bundle of the view metadata, None if there is none."""
+    cached = self._get(self.bundle_name)
+    if cached.text is None:
+      return None
+    if cached.parsed is None:
+      bundle = None
+      try:
+        data = json.loads(cached.text)
+        if (
+            data.get("format") == BUNDLE_FORMAT
+            and data.get("api_version") == ADS_API_VERSION
+        ):
+          bundle = _Bundle(data, cached.mtime_ns)
+      except (ValueError, KeyError, AttributeError):
+        pass
+      if bundle is None:
+        logging.warning("Ignoring invalid view bundle %s.", self.bundle_name)
+      cached.parsed = bundle or False
+    return cached.parsed or None
+
+  def list_views(self) -> tuple[Any, tuple[str, ...]]:
+    """Lists the reporting views with a doc.
+
+    Returns:
+        A version of the view docs, which changes when a view doc is added
+        or replaced or the docs are swapped, and the sorted names of the
+        views.
+    """
+    bundle = self._get_bundle()
+    if bundle is not None:
+      return (self._generation, bundle.mtime_ns, None), bundle.view_names
+    now = self._clock()
+    with self._lock:
+      if (
+          self._views_checked_at is not None
+          and now - self._views_checked_at < self._check_interval
+      ):
+        return (self._generation, self._views_mtime_ns), self._views
+      views_path = os.path.join(self.root, "views")
+      try:
+        mtime_ns = os.stat(views_path).st_mtime_ns
+      except FileNotFoundError:
+        mtime_ns = None
+      if mtime_ns != self._views_mtime_ns or self._views_checked_at is None:
+        names = os.listdir(views_path) if mtime_ns is not None else []
+        self._views = tuple(
+            sorted(
+                name.removesuffix(".yaml")
+                for name in names
+                if name.endswith(".yaml")
+                and _VIEW_NAME.match(name.removesuffix(".yaml"))
+            )
+        )
+        self._views_mtime_ns = mtime_ns
+      self._views_checked_at = now
+      return (self._generation, self._views_mtime_ns), self._views
+
+  def get_view_text(self, view: str) -> str | None:
+    """Gets the YAML doc of a reporting view, None if it does not exist."""
+    if not _VIEW_NAME.match(view):
+      return None
+    bundle = self._get_bundle()
+    if bundle is None:
+      return self.read_text(f"views/{view}.yaml")
+    cached = bundle.get_view_file(view)
+    if cached is None:
+      return None
+    if cached.text is None:
+      cached.text = dump_yaml(cached.parsed, sort_keys=False)
+    return cached.text
+
+  def _get_view_file(self, view: str) -> _CachedFile | None:
+    """Gets the doc file of a reporting view with its metadata parsed."""
+    if not _VIEW_NAME.match(view):
+      return None
+    bundle = self._get_bundle()
+    if bundle is not None:
+      return bundle.get_view_file(view)
+    cached = self._get(f"views/{view}.yaml")
+    if cached.text is None:
+      return None
+    if cached.parsed is None:
+      cached.parsed = load_yaml(cached.text) or {}
+    return cached
+
+  def get_view(self, view: str) -> dict[str, Any] | None:
+    """Gets the parsed metadata of a reporting view.
+
+    Args:
+        view: The name of the view resource, e.g. "search_term_view".
+
+    Returns:
+        The view metadata, or None if the view does not exist.
+    """
+    cached = self._get_view_file(view)
+    return cached.parsed if cached is not None else None
+
+  def get_view_fields(self, view: str) -> dict[str, dict[str, Any]]:
+    """Gets the metadata of the fields selectable in a reporting view.
+
+    Args:
+        view: The name of the view resource, e.g. "search_term_view".
+
+    Returns:
+        The metadata of every attribute, segment and metric of the view, by
+        field name. Empty if the view does not exist.
+    """
+    cached = self._get_view_file(view)
+    if cached is None:
+      return {}
+    if cached.fields is None:
+      fields = {}
+      for category in FIELD_CATEGORIES:
+        fields.update(cached.parsed.get(category) or {})
+      cached.fields = fields
+    return cached.fields
+
+
+DOCS_INDEX = DocsIndex()
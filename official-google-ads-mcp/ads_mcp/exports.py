@@ -0,0 +1,280 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Export of GAQL results to files, written as the rows are streamed.
+
+Rows are written chunk by chunk, so memory stays bounded by the chunk size
+however large the report. CSV and JSON Lines files are written with the
+standard library. Parquet and Arrow IPC files are written from the column
+buffers of `ads_mcp.tables`, one row group per `ROW_GROUP_SIZE` rows, and
+need `pyarrow`.
+
+Files are written to a temporary file next to the target, which replaces
+the target only once all rows are written. Only files with the extension of
+their format are written, so that an export never replaces another kind of
+file, such as the credentials of the server.
+"""
+
+import csv
+import json
+import os
+import tempfile
+from typing import Any, IO, Literal
+
+from ads_mcp import tables
+
+ExportFormat = Literal["parquet", "arrow", "csv", "jsonl"]
+FORMATS = ("parquet", "arrow", "csv", "jsonl")
+EXTENSIONS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "csv": ".csv",
+    "jsonl": ".jsonl",
+}
+
+# The rows buffered in column buffers before a Parquet or Arrow row group is
+# written.
+ROW_GROUP_SIZE = 100_000
+
+
+def resolve_path(path: str, root: str) -> str:
+  """Resolves the path of an export inside the export directory.
+
+  Args:
+      path: The path of the file, relative to `root` or absolute.
+      root: The directory exports are written to.
+
+  Returns:
+      The absolute path of the file.
+
+  Raises:
+      ValueError: If the path is outside of `root`.
+  """
+  root = os.path.realpath(root)
+  resolved = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+  if os.path.commonpath([root, resolved]) != root or resolved == root:
+    raise ValueError(
+        f"Cannot export to {path}, exports are written in {root}. Set"
+        " ADS_MCP_EXPORT_DIR to export elsewhere."
+    )
+  return resolved
+
+
+def _value_type(value: Any) -> str:
+  if isinstance(value, bool):
+    return "bool"
+  if isinstance(value, int):
+    return "int64"
+  if isinstance(value, float):
+    return "double"
+  if isinstance(value, str):
+    return "string"
+  if isinstance(value, dict):
+    return "struct"
+  if isinstance(value, list):
+    return "list"
+  return "null"
+
+
+def _to_text(value: Any) -> Any:
+  """Formats a CSV cell, with messages and repeated fields as JSON."""
+  if isinstance(value, (dict, list)):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+  return value
+
+
+class Exporter:
+  """Writes the rows of a query to a file as they are streamed."""
+
+  def __init__(self, path: str, file_format: ExportFormat = "parquet"):
+    """Initializes the exporter.
+
+    Args:
+        path: The absolute path of the file written.
+        file_format: "parquet", "arrow" for the Arrow IPC file format, "csv"
+            or "jsonl" for JSON Lines.
+
+    Raises:
+        ValueError: If the format is unknown, if the path does not have the
+            extension of the format, or if the format is Parquet or Arrow
+            and `pyarrow` is not installed.
+    """
+    if file_format not in FORMATS:
+      formats = ", ".join(FORMATS)
+      raise ValueError(
+          f"Unsupported export format {file_format!r}, expected one of"
+          f" {formats}."
+      )
+    extension = EXTENSIONS[file_format]
+    if not os.path.basename(path).lower().endswith(extension):
+      raise ValueError(
+          f"Cannot export to {path}, the name of {file_format} files must end"
+          f" with {extension}."
+      )
+    self.path = path
+    self.file_format = file_format
+    self.columns: list[str] = []
+    self.rows = 0
+    self.schema: dict[str, str] = {}
+    self._pa = (
+        tables.import_pyarrow()
+        if file_format in ("parquet", "arrow")
+        else None
+    )
+    self._temp_path: str | None = None
+    self._file: IO[str] | None = None
+    self._csv: Any = None
+    self._arrow_writer: Any = None
+    self._arrow_schema: Any = None
+    self._buffer = tables.ColumnTable()
+
+  def _open(self, columns: list[str]):
+    directory = os.path.dirname(self.path)
+    os.makedirs(directory, exist_ok=True)
+    fd, self._temp_path = tempfile.mkstemp(
+        dir=directory, prefix=".", suffix=".partial"
+    )
+    os.close(fd)
+    self.columns = list(columns)
+    if self.file_format == "csv":
+      # pylint: disable-next=consider-using-with
+      self._file = open(self._temp_path, "w", encoding="utf-8", newline="")
+      self._csv = csv.writer(self._file)
+      self._csv.writerow(self.columns)
+    elif self.file_format == "jsonl":
+      # pylint: disable-next=consider-using-with
+      self._file = open(self._temp_path, "w", encoding="utf-8")
+
+  def write(self, columns: list[str], rows: list[list[Any]]):
+    """Writes a chunk of rows.
+
+    Args:
+        columns: The fields of the values of the rows.
+        rows: The formatted values of each row.
+    """
+    if self._temp_path is None:
+      self._open(columns)
+    if self._pa is None:
+      for name, value in zip(columns, rows[0] if rows else []):
+        if self.schema.get(name, "null") == "null":
+          self.schema[name] = _value_type(value)
+    if self.file_format == "csv":
+      self._csv.writerows([list(map(_to_text, row)) for row in rows])
+    elif self.file_format == "jsonl":
+      self._file.writelines(
+          json.dumps(
+              dict(zip(columns, row)),
+              ensure_ascii=False,
+              separators=(",", ":"),
+          )
+          + "\n"
+          for row in rows
+      )
+    else:
+      self._buffer.append(columns, rows)
+      if len(self._buffer) >= ROW_GROUP_SIZE:
+        self._flush()
+    self.rows += len(rows)
+
+  def _flush(self):
+    """Writes the buffered rows as a Parquet or Arrow row group."""
+    if not self._buffer.columns:
+      return
+    table = self._buffer.to_arrow()
+    # The Arrow table shares the buffers, which are not appended to again.
+    self._buffer = tables.ColumnTable()
+    pa = self._pa
+    if self.file_format == "arrow":
+      # An Arrow IPC file holds a single dictionary per column, while each
+      # row group comes with its own.
+      for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+          table = table.set_column(
+              i, field.name, table.column(i).cast(field.type.value_type)
+          )
+    if self._arrow_writer is None:
+      if self.file_format == "parquet":
+        self._arrow_writer = pa.parquet.ParquetWriter(
+            self._temp_path, table.schema
+        )
+      else:
+        self._arrow_writer = pa.ipc.new_file(self._temp_path, table.schema)
+      self._arrow_schema = table.schema
+      self.schema = {field.name: str(field.type) for field in table.schema}
+    elif table.schema != self._arrow_schema:
+      try:
+        table = table.cast(self._arrow_schema)
+      except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(
+            "The types of the rows changed during the export, e.g. integers"
+            " then decimals. Export to csv or jsonl instead."
+        ) from e
+    self._arrow_writer.write_table(table)
+
+  def _close_file(self):
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+    if self._arrow_writer is not None:
+      self._arrow_writer.close()
+      self._arrow_writer = None
+
+  def reset(self):
+    """Drops the rows written, to write the rows of a stream again."""
+    self.abort()
+    self.rows = 0
+    self.schema = {}
+
+  def abort(self):
+    """Stops the export, removing the partial file."""
+    self._close_file()
+    self._buffer = tables.ColumnTable()
+    self._arrow_schema = None
+    if self._temp_path is not None:
+      try:
+        os.remove(self._temp_path)
+      except FileNotFoundError:
+        pass
+      self._temp_path = None
+
+  def finish(self, columns: list[str]) -> dict[str, Any]:
+    """Completes the file and moves it to its path.
+
+    Args:
+        columns: The fields of the query, to write the header of a query
+            without rows.
+
+    Returns:
+        The path, format, number of rows, column types and size in bytes of
+        the file.
+    """
+    if self._temp_path is None:
+      self._open(columns)
+    if self._pa is not None:
+      if self.rows == 0:
+        # An empty file with a schema of null columns.
+        self._buffer.append(self.columns, [])
+      self._flush()
+    self._close_file()
+    os.replace(self._temp_path, self.path)
+    self._temp_path = None
+    return {
+        "path": self.path,
+        "format": self.file_format,
+        "rows": self.rows,
+        "schema": {
+            name: self.schema.get(name, "null") for name in self.columns
+        },
+        "bytes": os.path.getsize(self.path),
+    }
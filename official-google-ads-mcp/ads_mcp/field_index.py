@@ -0,0 +1,187 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A search index over the fields of the reporting views.
+
+The index maps each token of a field name and description to the fields it
+appears in. It is built once from the view docs, and rebuilt when the view
+docs on disk change, so that a search only looks up the query tokens.
+"""
+
+import bisect
+import collections
+import heapq
+import re
+import threading
+from typing import Any
+
+from ads_mcp.docs_index import DOCS_INDEX
+from ads_mcp.docs_index import DocsIndex
+from ads_mcp.docs_index import FIELD_CATEGORIES
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to"
+    " was which with".split()
+)
+
+# Weights of a query token found in a field name and in its description.
+_NAME_WEIGHT = 4.0
+_PREFIX_WEIGHT = 2.0
+_DESCRIPTION_WEIGHT = 1.0
+_EXACT_NAME_BONUS = 100.0
+_MIN_PREFIX_LENGTH = 3
+
+
+def tokenize(text: str) -> list[str]:
+  """Splits a text into lowercase tokens, without stop words."""
+  return [
+      token
+      for token in _TOKEN.findall(text.lower())
+      if token not in _STOP_WORDS
+  ]
+
+
+class _Field:
+  """A field, its metadata and the views it is selectable in."""
+
+  def __init__(self, name: str, category: str, metadata: dict[str, Any]):
+    self.name = name
+    self.category = category
+    self.metadata = metadata
+    self.views: set[str] = set()
+    self.name_length = len(tokenize(name))
+
+  def to_dict(self) -> dict[str, Any]:
+    return {
+        "name": self.name,
+        "category": self.category,
+        "data_type": self.metadata.get("data_type"),
+        "is_repeated": self.metadata.get("is_repeated", False),
+        "filterable": self.metadata.get("filterable", False),
+        "sortable": self.metadata.get("sortable", False),
+        "description": self.metadata.get("description", ""),
+    }
+
+
+class _Snapshot:
+  """The fields of all views and the inverted indexes over them."""
+
+  def __init__(self, fields: dict[str, _Field]):
+    self.fields = fields
+    self.name_index: dict[str, set[str]] = collections.defaultdict(set)
+    self.description_index: dict[str, set[str]] = collections.defaultdict(set)
+    for name, field in fields.items():
+      for token in tokenize(name):
+        self.name_index[token].add(name)
+      for token in tokenize(field.metadata.get("description") or ""):
+        self.description_index[token].add(name)
+    self.name_tokens = sorted(self.name_index)
+
+  def prefixed_name_tokens(self, prefix: str) -> list[str]:
+    """Gets the name tokens starting with a prefix, other than itself."""
+    start = bisect.bisect_right(self.name_tokens, prefix)
+    end = bisect.bisect_left(self.name_tokens, prefix + "\x7f")
+    return self.name_tokens[start:end]
+
+
+class FieldIndex:
+  """An inverted index from tokens to the fields of the reporting views."""
+
+  def __init__(self, docs: DocsIndex = DOCS_INDEX):
+    self._docs = docs
+    self._snapshot: _Snapshot | None = None
+    self._version: Any = None
+    self._lock = threading.Lock()
+
+  def _build(self, views: tuple[str, ...]) -> _Snapshot:
+    fields: dict[str, _Field] = {}
+    for view in views:
+      view_data = self._docs.get_view(view) or {}
+      for category in FIELD_CATEGORIES:
+        for name, metadata in (view_data.get(category) or {}).items():
+          field = fields.get(name)
+          if field is None:
+            field = fields[name] = _Field(name, category, metadata or {})
+          field.views.add(view)
+    return _Snapshot(fields)
+
+  def _get_snapshot(self) -> _Snapshot:
+    """Gets the index, building it again if the view docs changed."""
+    version, views = self._docs.list_views()
+    snapshot = self._snapshot
+    if snapshot is not None and version == self._version:
+      return snapshot
+    with self._lock:
+      if self._snapshot is None or version != self._version:
+        self._snapshot = self._build(views)
+        self._version = version
+      return self._snapshot
+
+  def search(
+      self,
+      query: str,
+      view: str | None = None,
+      category: str | None = None,
+      filterable: bool | None = None,
+      limit: int = 20,
+  ) -> list[dict[str, Any]]:
+    """Searches fields by name and description.
+
+    Args:
+        query: The words to search for, e.g. "search impression share".
+        view: (Optional) Only fields selectable in this view.
+        category: (Optional) Only fields of this category, one of
+            "attributes", "segments" or "metrics".
+        filterable: (Optional) Only fields that can, or cannot, be used in
+            a WHERE clause.
+        limit: The maximum number of fields returned.
+
+    Returns:
+        The matching fields, best matches first.
+    """
+    snapshot = self._get_snapshot()
+    scores: dict[str, float] = collections.defaultdict(float)
+    for token in set(tokenize(query)):
+      for name in snapshot.name_index.get(token, ()):
+        scores[name] += _NAME_WEIGHT
+      for name in snapshot.description_index.get(token, ()):
+        scores[name] += _DESCRIPTION_WEIGHT
+      if len(token) >= _MIN_PREFIX_LENGTH:
+        for name_token in snapshot.prefixed_name_tokens(token):
+          for name in snapshot.name_index[name_token]:
+            scores[name] += _PREFIX_WEIGHT
+    exact_name = query.strip().lower()
+    if exact_name in snapshot.fields:
+      scores[exact_name] += _EXACT_NAME_BONUS
+
+    matches = []
+    for name, score in scores.items():
+      field = snapshot.fields[name]
+      if view is not None and view not in field.views:
+        continue
+      if category is not None and field.category != category:
+        continue
+      if filterable is not None and (
+          bool(field.metadata.get("filterable")) != filterable
+      ):
+        continue
+      matches.append((-score, field.name_length, name))
+    return [
+        snapshot.fields[name].to_dict()
+        for _, _, name in heapq.nsmallest(limit, matches)
+    ]
+
+
+FIELD_INDEX = FieldIndex()
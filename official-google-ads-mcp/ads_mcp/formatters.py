@@ -0,0 +1,290 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-column value formatters for Google Ads API query results.
+
+Converters are selected once per column from the reporting view metadata in
+`context/views/*.yaml` (`data_type` and `is_repeated`), so formatting a cell
+is a single call with no type checks. Message values are converted by
+functions compiled once per message type, which produce the same output as
+`proto.Message.to_dict` without going through `json_format.MessageToDict`.
+Clients built with `use_proto_plus=False` return raw protobuf values, which
+the converters accept too: enums stay numbers and messages become dicts.
+
+`google.protobuf` and `proto` are imported when a converter is first built,
+so that importing the server does not load them.
+"""
+
+import base64
+from collections.abc import Callable
+import math
+import re
+import struct
+import threading
+from typing import Any
+
+Converter = Callable[[Any], Any]
+
+_FROM_CLAUSE = re.compile(r"\bFROM\s+([a-z_]+)", re.IGNORECASE)
+_SELECT_CLAUSE = re.compile(
+    r"^\s*SELECT\s+(.*?)\s+FROM\s", re.IGNORECASE | re.DOTALL
+)
+
+
+def enum_name(value: Any) -> Any:
+  """Gets the name of a proto-plus enum, raw protobuf enums are numbers."""
+  return getattr(value, "name", value)
+
+
+def micros_to_currency(value: int) -> float:
+  """Converts an amount in micros to currency units."""
+  return value / 1_000_000
+
+
+def _pb_to_dict_fallback(message: Any) -> dict[str, Any]:
+  """Converts a raw protobuf message the way `proto.Message.to_dict` does."""
+  # pylint: disable-next=import-outside-toplevel
+  from google.protobuf import json_format
+
+  return json_format.MessageToDict(
+      message,
+      preserving_proto_field_name=True,
+      use_integers_for_enums=True,
+      always_print_fields_with_no_presence=True,
+  )
+
+
+def _float_to_json(value: float) -> float | str:
+  if math.isinf(value):
+    return "-Infinity" if value < 0.0 else "Infinity"
+  if math.isnan(value):
+    return "NaN"
+  return value
+
+
+def _float32_to_json(value: float) -> float | str:
+  """Converts a float field value, with the fewest digits of its float32."""
+  if not math.isfinite(value):
+    return _float_to_json(value)
+  # Every float32 round-trips with 9 significant digits.
+  for precision in range(6, 9):
+    shortest = float(f"{value:.{precision}g}")
+    if struct.unpack("<f", struct.pack("<f", shortest))[0] == value:
+      return shortest
+  return float(f"{value:.9g}")
+
+
+def _single_value_converter(field: Any) -> Converter | None:
+  """Builds the converter of one value of a field, None for identity."""
+  # pylint: disable-next=import-outside-toplevel
+  from google.protobuf.descriptor import FieldDescriptor
+
+  cpp_type = field.cpp_type
+  if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+    return _compile_pb_converter(field.message_type)
+  if cpp_type in (
+      FieldDescriptor.CPPTYPE_INT64,
+      FieldDescriptor.CPPTYPE_UINT64,
+  ):
+    return str
+  if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+    return _float32_to_json
+  if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+    return _float_to_json
+  if field.type == FieldDescriptor.TYPE_BYTES:
+    return lambda value: base64.b64encode(value).decode("utf-8")
+  return None
+
+
+def _field_converter(field: Any) -> Converter:
+  """Builds the converter of a field value, repeated and map aware."""
+  if field.message_type and field.message_type.GetOptions().map_entry:
+    value_converter = _single_value_converter(
+        field.message_type.fields_by_name["value"]
+    ) or (lambda value: value)
+
+    def convert_map(value: Any) -> dict[str, Any]:
+      return {
+          ("true" if key else "false")
+          if isinstance(key, bool)
+          else str(key): (value_converter(value[key]))
+          for key in value
+      }
+
+    return convert_map
+
+  converter = _single_value_converter(field)
+  if field.is_repeated:
+    if converter is None:
+      return list
+    return lambda values: [converter(value) for value in values]
+  return converter or (lambda value: value)
+
+
+def _default_value(field: Any) -> Callable[[], Any]:
+  """Builds a factory of the JSON default value of a field without presence."""
+  if field.message_type and field.message_type.GetOptions().map_entry:
+    return dict
+  if field.is_repeated:
+    return list
+  value = _field_converter(field)(field.default_value)
+  return lambda: value
+
+
+_PB_CONVERTERS: dict[str, Converter] = {}
+_PB_CONVERTERS_LOCK = threading.RLock()
+
+
+def _compile_pb_converter(message_descriptor: Any) -> Converter:
+  """Compiles a converter from a raw protobuf message type to a dict.
+
+  The output matches `proto.Message.to_dict`: proto field names, enums as
+  integers, 64-bit integers as strings and fields without presence always
+  printed. Well-known types keep going through `json_format`.
+  """
+  full_name = message_descriptor.full_name
+  converter = _PB_CONVERTERS.get(full_name)
+  if converter is not None:
+    return converter
+
+  with _PB_CONVERTERS_LOCK:
+    if full_name in _PB_CONVERTERS:
+      return _PB_CONVERTERS[full_name]
+    if full_name.startswith("google.protobuf."):
+      _PB_CONVERTERS[full_name] = _pb_to_dict_fallback
+      return _pb_to_dict_fallback
+
+    # Register the converter before compiling the fields, so that recursive
+    # message types resolve to it.
+    field_converters: dict[int, Converter] = {}
+    defaults: list[tuple[str, Callable[[], Any]]] = []
+
+    def convert(message: Any) -> dict[str, Any]:
+      js = {
+          field.name: field_converters[field.number](value)
+          for field, value in message.ListFields()
+      }
+      for name, default in defaults:
+        if name not in js:
+          js[name] = default()
+      return js
+
+    _PB_CONVERTERS[full_name] = convert
+    for field in message_descriptor.fields:
+      field_converters[field.number] = _field_converter(field)
+      if not field.has_presence:
+        defaults.append((field.name, _default_value(field)))
+    return convert
+
+
+def message_to_dict(value: Any) -> dict[str, Any]:
+  """Converts a message to a dict, like `proto.Message.to_dict`.
+
+  Args:
+      value: A proto-plus message, or a raw protobuf message.
+
+  Returns:
+      The message as a dict.
+  """
+  message_type = type(value)
+  meta = getattr(message_type, "meta", None)
+  if meta is None:
+    # A raw protobuf message.
+    return _compile_pb_converter(value.DESCRIPTOR)(value)
+  return _compile_pb_converter(meta.pb.DESCRIPTOR)(message_type.pb(value))
+
+
+def repeated_message_to_list(values: Any) -> list[dict[str, Any]]:
+  return [message_to_dict(value) for value in values]
+
+
+def repeated_enum_names(values: Any) -> list[str]:
+  return [enum_name(value) for value in values]
+
+
+def select_converter(
+    field: str,
+    field_metadata: dict[str, Any],
+    convert_micros: bool = False,
+) -> Converter | None:
+  """Selects the converter of a column from its view metadata.
+
+  Args:
+      field: The field mask path of the column, e.g. "metrics.cost_micros".
+      field_metadata: The view metadata of the field, with `data_type` and
+          `is_repeated`.
+      convert_micros: Whether `*_micros` amounts are converted to currency.
+
+  Returns:
+      The converter of the column values, or None if the values are returned
+      unchanged.
+  """
+  data_type = field_metadata.get("data_type")
+  if field_metadata.get("is_repeated"):
+    if data_type == "ENUM":
+      return repeated_enum_names
+    if data_type == "MESSAGE":
+      return repeated_message_to_list
+    return list
+  if data_type == "ENUM":
+    return enum_name
+  if data_type == "MESSAGE":
+    return message_to_dict
+  if convert_micros and data_type == "INT64" and field.endswith("_micros"):
+    return micros_to_currency
+  return None
+
+
+def select_converter_from_value(
+    field: str,
+    value: Any,
+    convert_micros: bool = False,
+) -> Converter | None:
+  """Selects the converter of a column without metadata from one of its values.
+
+  Args:
+      field: The field mask path of the column.
+      value: A value of the column.
+      convert_micros: Whether `*_micros` amounts are converted to currency.
+
+  Returns:
+      The converter of the column values, or None if the values are returned
+      unchanged.
+  """
+  # pylint: disable=import-outside-toplevel
+  from google.protobuf import message as message_lib
+  import proto
+
+  # pylint: enable=import-outside-toplevel
+  if isinstance(value, (proto.Message, message_lib.Message)):
+    return message_to_dict
+  if isinstance(value, proto.Enum):
+    return enum_name
+  if convert_micros and isinstance(value, int) and field.endswith("_micros"):
+    return micros_to_currency
+  return None
+
+
+def get_query_view(query: str) -> str | None:
+  """Gets the name of the resource in the FROM clause of a GAQL query."""
+  match = _FROM_CLAUSE.search(query)
+  return match.group(1).lower() if match else None
+
+
+def get_selected_fields(query: str) -> list[str]:
+  """Gets the fields in the SELECT clause of a GAQL query."""
+  match = _SELECT_CLAUSE.match(query)
+  if match is None:
+    return []
+  return [field.strip() for field in match.group(1).split(",")]
@@ -0,0 +1,344 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Metrics and traces of the server hot paths.
+
+Metrics are kept in process by a small registry and served in the Prometheus
+text format, so that no metrics library is needed. Counters kept elsewhere,
+such as those of the result cache, are read when the metrics are collected.
+
+Traces go through the OpenTelemetry API, and are only recorded when an
+OpenTelemetry SDK is configured in the process. The API is optional, spans
+are dropped when it is not installed.
+"""
+
+import bisect
+from collections.abc import Callable, Iterable, Sequence
+import math
+import threading
+import time
+from typing import Any
+
+from fastmcp.server import middleware
+from fastmcp.tools.tool import ToolResult
+import mcp.types as mt
+
+try:
+  from opentelemetry import trace
+except ImportError:
+  trace = None
+
+# Labels of a sample, as sorted (name, value) pairs.
+Labels = tuple[tuple[str, str], ...]
+# A sample name, its labels and its value.
+Sample = tuple[str, Labels, float]
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+SIZE_BUCKETS = tuple(float(4**i) for i in range(4, 14))
+
+
+class _NoOpSpan:
+  """A span dropped as it is recorded."""
+
+  def add_event(self, name: str):
+    del name  # Unused.
+
+  def set_attribute(self, key: str, value: Any):
+    del key, value  # Unused.
+
+  def record_exception(self, exception: BaseException):
+    del exception  # Unused.
+
+  def end(self):
+    pass
+
+
+class _NoOpTracer:
+  """The tracer used when the OpenTelemetry API is not installed."""
+
+  def start_span(
+      self, name: str, attributes: dict[str, Any] | None = None
+  ) -> _NoOpSpan:
+    del name, attributes  # Unused.
+    return _NoOpSpan()
+
+
+TRACER = trace.get_tracer("ads_mcp") if trace is not None else _NoOpTracer()
+
+
+def set_span_error(span: Any, error: BaseException):
+  """Records an error on a span and marks the span as failed."""
+  span.record_exception(error)
+  if trace is not None:
+    span.set_status(trace.StatusCode.ERROR)
+
+
+def _labels(label_names: Sequence[str], labels: dict[str, Any]) -> Labels:
+  if set(labels) != set(label_names):
+    raise ValueError(
+        f"Expected the labels {sorted(label_names)}, got {sorted(labels)}."
+    )
+  return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Counter:
+  """A value that only goes up, per set of labels."""
+
+  kind = "counter"
+
+  def __init__(self, name: str, documentation: str, label_names=()):
+    self.name = name
+    self.documentation = documentation
+    self._label_names = tuple(label_names)
+    self._values: dict[Labels, float] = {}
+    self._lock = threading.Lock()
+
+  def inc(self, amount: float = 1.0, **labels: Any):
+    key = _labels(self._label_names, labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0.0) + amount
+
+  def collect(self) -> list[Sample]:
+    with self._lock:
+      return [
+          (f"{self.name}_total", labels, value)
+          for labels, value in self._values.items()
+      ]
+
+
+class Histogram:
+  """The distribution of observed values in buckets, per set of labels."""
+
+  kind = "histogram"
+
+  def __init__(
+      self,
+      name: str,
+      documentation: str,
+      label_names=(),
+      buckets: Sequence[float] = LATENCY_BUCKETS,
+  ):
+    self.name = name
+    self.documentation = documentation
+    self._label_names = tuple(label_names)
+    self._buckets = tuple(sorted(buckets))
+    # The count of each bucket, then the overall count and sum.
+    self._values: dict[Labels, list[float]] = {}
+    self._lock = threading.Lock()
+
+  def observe(self, value: float, **labels: Any):
+    key = _labels(self._label_names, labels)
+    index = bisect.bisect_left(self._buckets, value)
+    with self._lock:
+      values = self._values.get(key)
+      if values is None:
+        values = self._values[key] = [0.0] * (len(self._buckets) + 2)
+      if index < len(self._buckets):
+        values[index] += 1
+      values[-2] += 1
+      values[-1] += value
+
+  def collect(self) -> list[Sample]:
+    samples = []
+    with self._lock:
+      for labels, values in self._values.items():
+        cumulative = 0.0
+        for bound, count in zip(self._buckets, values):
+          cumulative += count
+          samples.append(
+              (
+                  f"{self.name}_bucket",
+                  (*labels, ("le", f"{bound:g}")),
+                  cumulative,
+              )
+          )
+        samples.append(
+            (f"{self.name}_bucket", (*labels, ("le", "+Inf")), values[-2])
+        )
+        samples.append((f"{self.name}_count", labels, values[-2]))
+        samples.append((f"{self.name}_sum", labels, values[-1]))
+    return samples
+
+
+class _Collected:
+  """Metrics read from elsewhere when collected."""
+
+  def __init__(
+      self,
+      name: str,
+      documentation: str,
+      kind: str,
+      read: Callable[[], Iterable[tuple[dict[str, Any], float]]],
+  ):
+    self.name = name
+    self.documentation = documentation
+    self.kind = kind
+    self._read = read
+
+  def collect(self) -> list[Sample]:
+    suffix = "_total" if self.kind == "counter" else ""
+    return [
+        (
+            f"{self.name}{suffix}",
+            tuple(sorted((k, str(v)) for k, v in labels.items())),
+            value,
+        )
+        for labels, value in self._read()
+    ]
+
+
+def _escape(value: str) -> str:
+  return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+  if math.isinf(value):
+    return "+Inf" if value > 0 else "-Inf"
+  if value == int(value):
+    return str(int(value))
+  return repr(value)
+
+
+class Registry:
+  """The metrics of the server."""
+
+  def __init__(self):
+    self._metrics: dict[str, Any] = {}
+    self._lock = threading.Lock()
+
+  def _register(self, metric: Any) -> Any:
+    with self._lock:
+      if metric.name in self._metrics:
+        raise ValueError(f"Metric {metric.name} is already registered.")
+      self._metrics[metric.name] = metric
+    return metric
+
+  def counter(self, name: str, documentation: str, label_names=()) -> Counter:
+    """Registers a counter."""
+    return self._register(Counter(name, documentation, label_names))
+
+  def histogram(
+      self,
+      name: str,
+      documentation: str,
+      label_names=(),
+      buckets: Sequence[float] = LATENCY_BUCKETS,
+  ) -> Histogram:
+    """Registers a histogram."""
+    return self._register(Histogram(name, documentation, label_names, buckets))
+
+  def collected(
+      self,
+      name: str,
+      documentation: str,
+      read: Callable[[], Iterable[tuple[dict[str, Any], float]]],
+      kind: str = "gauge",
+  ):
+    """Registers a metric whose values are read when collected.
+
+    Args:
+        name: The name of the metric.
+        documentation: The description of the metric.
+        read: A function returning the labels and value of each sample.
+        kind: "gauge", or "counter" for values that only go up.
+    """
+    self._register(_Collected(name, documentation, kind, read))
+
+  def collect(self) -> dict[tuple[str, Labels], float]:
+    """Gets the current value of every sample, by name and labels."""
+    with self._lock:
+      metrics = list(self._metrics.values())
+    return {
+        (name, labels): value
+        for metric in metrics
+        for name, labels, value in metric.collect()
+    }
+
+  def get_sample(self, name: str, **labels: Any) -> float | None:
+    """Gets the current value of a sample, None if it was never set."""
+    key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+    return self.collect().get((name, key))
+
+  def render(self) -> str:
+    """Renders the metrics in the Prometheus text exposition format."""
+    with self._lock:
+      metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+      lines.append(f"# HELP {metric.name} {metric.documentation}")
+      lines.append(f"# TYPE {metric.name} {metric.kind}")
+      for name, labels, value in metric.collect():
+        if labels:
+          label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+          name = f"{name}{{{label_text}}}"
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_CALL_SECONDS = REGISTRY.histogram(
+    "ads_mcp_tool_call_seconds",
+    "Time to run an MCP tool call, including the serialization of its result.",
+    ("tool", "status"),
+)
+TOOL_RESPONSE_BYTES = REGISTRY.histogram(
+    "ads_mcp_tool_response_bytes",
+    "Size of the text content returned by an MCP tool call.",
+    ("tool",),
+    SIZE_BUCKETS,
+)
+
+
+class MetricsMiddleware(middleware.Middleware):
+  """Records the latency and the response size of MCP tool calls."""
+
+  async def on_call_tool(
+      self,
+      context: middleware.MiddlewareContext[mt.CallToolRequestParams],
+      call_next: middleware.CallNext[mt.CallToolRequestParams, ToolResult],
+  ) -> ToolResult:
+    tool = context.message.name
+    started_at = time.perf_counter()
+    status = "error"
+    try:
+      result = await call_next(context)
+      status = "ok"
+    finally:
+      TOOL_CALL_SECONDS.observe(
+          time.perf_counter() - started_at, tool=tool, status=status
+      )
+    TOOL_RESPONSE_BYTES.observe(
+        sum(
+            len(content.text.encode("utf-8"))
+            for content in result.content
+            if isinstance(content, mt.TextContent)
+        ),
+        tool=tool,
+    )
+    return result
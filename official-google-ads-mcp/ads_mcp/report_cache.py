@@ -0,0 +1,319 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A persistent cache of daily report partitions for closed date ranges.
+
+Metrics of days older than the conversion lag window no longer change, so
+the rows of a `segments.date BETWEEN` query are stored per customer and per
+day in a SQLite database. A later query over a wider range only fetches the
+days that are missing or still open, and merges them with the stored days.
+"""
+
+from collections.abc import Callable
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any
+
+from ads_mcp import result_cache
+
+Fetch = Callable[[str], tuple[list[str], list[list[Any]]]]
+
+_DATE_RANGE = re.compile(
+    r"segments\.date\s+BETWEEN\s+(['\"])(\d{4}-\d{2}-\d{2})\1"
+    r"\s+AND\s+(['\"])(\d{4}-\d{2}-\d{2})\3",
+    re.IGNORECASE,
+)
+_SELECT_CLAUSE = re.compile(
+    r"^\s*SELECT\s+(.*?)\s+FROM\s", re.IGNORECASE | re.DOTALL
+)
+_ORDER_OR_LIMIT = re.compile(r"\b(ORDER\s+BY|LIMIT)\b", re.IGNORECASE)
+_DATE_COLUMN = "segments.date"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partitions (
+  report_key TEXT NOT NULL,
+  customer_id TEXT NOT NULL,
+  day TEXT NOT NULL,
+  columns TEXT NOT NULL,
+  rows TEXT NOT NULL,
+  PRIMARY KEY (report_key, customer_id, day)
+)
+"""
+
+
+class DateRangeQuery:
+  """A GAQL query filtered on a `segments.date BETWEEN` range of days."""
+
+  def __init__(
+      self, prefix: str, suffix: str, start: datetime.date, end: datetime.date
+  ):
+    self.prefix = prefix
+    self.suffix = suffix
+    self.start = start
+    self.end = end
+
+  @property
+  def template(self) -> str:
+    """The query with the date range left out, identifying the report."""
+    return result_cache.normalize_query(
+        f"{self.prefix}segments.date BETWEEN ? AND ?{self.suffix}"
+    )
+
+  def with_range(self, start: datetime.date, end: datetime.date) -> str:
+    """Builds the query for another range of days."""
+    return (
+        f"{self.prefix}segments.date BETWEEN"
+        f" '{start.isoformat()}' AND '{end.isoformat()}'{self.suffix}"
+    )
+
+
+def parse_date_range_query(query: str) -> DateRangeQuery | None:
+  """Parses a query whose results can be stored in daily partitions.
+
+  The query must select `segments.date`, filter on a single
+  `segments.date BETWEEN` range of literal dates, and have no ORDER BY or
+  LIMIT clause, which merging partitions would not preserve.
+
+  Args:
+      query: The GAQL query.
+
+  Returns:
+      The parsed query, or None if its results cannot be partitioned.
+  """
+  select_clause = _SELECT_CLAUSE.match(query)
+  if not select_clause or _ORDER_OR_LIMIT.search(query):
+    return None
+  fields = [field.strip() for field in select_clause.group(1).split(",")]
+  if _DATE_COLUMN not in fields:
+    return None
+  matches = list(_DATE_RANGE.finditer(query))
+  if len(matches) != 1:
+    return None
+  match = matches[0]
+  try:
+    start = datetime.date.fromisoformat(match.group(2))
+    end = datetime.date.fromisoformat(match.group(4))
+  except ValueError:
+    return None
+  if start > end:
+    return None
+  return DateRangeQuery(
+      query[: match.start()], query[match.end() :], start, end
+  )
+
+
+def _days(start: datetime.date, end: datetime.date) -> list[datetime.date]:
+  return [
+      start + datetime.timedelta(days=i) for i in range((end - start).days + 1)
+  ]
+
+
+def earliest_today() -> datetime.date:
+  """Gets the current date in the earliest time zone, UTC-12.
+
+  No account is on a later day than this one, whatever the time zone of the
+  server or of the account, so that the lag window never closes a day early.
+  """
+  return datetime.datetime.now(
+      datetime.timezone(datetime.timedelta(hours=-12))
+  ).date()
+
+
+def _project(
+    columns: list[str], rows: list[list[Any]], to_columns: list[str]
+) -> list[list[Any]] | None:
+  """Gets the values of rows in other columns, None if some are missing."""
+  if columns == to_columns or not rows:
+    return rows
+  if not set(to_columns).issubset(columns):
+    return None
+  indexes = [columns.index(column) for column in to_columns]
+  return [[row[i] for i in indexes] for row in rows]
+
+
+def _contiguous_ranges(
+    days: list[datetime.date],
+) -> list[tuple[datetime.date, datetime.date]]:
+  """Groups sorted days into ranges of consecutive days."""
+  ranges = []
+  for day in days:
+    if ranges and ranges[-1][1] + datetime.timedelta(days=1) == day:
+      ranges[-1] = (ranges[-1][0], day)
+    else:
+      ranges.append((day, day))
+  return ranges
+
+
+class ReportCache:
+  """A SQLite store of query results partitioned by customer and day."""
+
+  def __init__(self, directory: str, lag_days: int):
+    os.makedirs(directory, exist_ok=True)
+    self._path = os.path.join(directory, "reports.sqlite3")
+    self._lag_days = lag_days
+    self._lock = threading.Lock()
+    with self._connect() as conn:
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.execute(_SCHEMA)
+    self.fetched_days = 0
+    self.cached_days = 0
+
+  @contextlib.contextmanager
+  def _connect(self):
+    conn = sqlite3.connect(self._path, timeout=30)
+    try:
+      with conn:
+        yield conn
+    finally:
+      conn.close()
+
+  def _load(
+      self,
+      report_key: str,
+      customer_id: str,
+      start: datetime.date,
+      end: datetime.date,
+  ) -> dict[datetime.date, tuple[list[str], list[list[Any]]]]:
+    with self._connect() as conn:
+      records = conn.execute(
+          "SELECT day, columns, rows FROM partitions WHERE report_key = ?"
+          " AND customer_id = ? AND day BETWEEN ? AND ?",
+          (report_key, customer_id, start.isoformat(), end.isoformat()),
+      ).fetchall()
+    return {
+        datetime.date.fromisoformat(day): (
+            json.loads(columns),
+            json.loads(rows),
+        )
+        for day, columns, rows in records
+    }
+
+  def _store(
+      self,
+      report_key: str,
+      customer_id: str,
+      columns: list[str],
+      partitions: dict[datetime.date, list[list[Any]]],
+  ):
+    if not partitions:
+      return
+    columns_json = json.dumps(columns)
+    with self._lock, self._connect() as conn:
+      conn.executemany(
+          "INSERT OR REPLACE INTO partitions VALUES (?, ?, ?, ?, ?)",
+          [
+              (
+                  report_key,
+                  customer_id,
+                  day.isoformat(),
+                  columns_json,
+                  json.dumps(rows, default=str),
+              )
+              for day, rows in partitions.items()
+          ],
+      )
+
+  def execute(
+      self,
+      query: DateRangeQuery,
+      customer_id: str,
+      fetch: Fetch,
+      today: datetime.date,
+      key_extra: tuple[Any, ...] = (),
+  ) -> tuple[list[str], list[list[Any]]]:
+    """Gets the results of a query, fetching only the days not stored.
+
+    Days older than the lag window are read from the store when present.
+    The other days are fetched with `fetch`, in as few queries as possible,
+    and the closed ones among them are stored for later queries. Rows that
+    cannot be split by day, without `segments.date`, are returned as they
+    are and not stored.
+
+    Args:
+        query: The parsed query.
+        customer_id: The ID of the customer being queried.
+        fetch: A function running a GAQL query and returning its columns and
+            rows.
+        today: The current date the lag window ends on, independent of the
+            time zone of the server, e.g. `earliest_today()`.
+        key_extra: (Optional) Other options changing the results, such as
+            value formatting, to be included in the report key.
+
+    Returns:
+        The columns and rows of the results, ordered by day.
+    """
+    report_key = hashlib.sha256(
+        json.dumps([query.template, *key_extra]).encode("utf-8")
+    ).hexdigest()
+    last_closed_day = today - datetime.timedelta(days=self._lag_days)
+    stored = self._load(
+        report_key,
+        customer_id,
+        query.start,
+        min(query.end, last_closed_day),
+    )
+    all_days = _days(query.start, query.end)
+    to_fetch = [day for day in all_days if day not in stored]
+
+    # The columns and rows of each day, or of the first day of a range whose
+    # rows cannot be split by day.
+    partitions = dict(stored)
+    columns = next((c for c, _ in stored.values() if c), [])
+    unsplit_columns = None
+    for start, end in _contiguous_ranges(to_fetch):
+      fetched_columns, fetched_rows = fetch(query.with_range(start, end))
+      columns = fetched_columns or columns
+      if fetched_rows and _DATE_COLUMN not in fetched_columns:
+        partitions[start] = (fetched_columns, fetched_rows)
+        unsplit_columns = fetched_columns
+        continue
+      fetched = {day: [] for day in _days(start, end)}
+      for row in fetched_rows:
+        day = datetime.date.fromisoformat(
+            row[fetched_columns.index(_DATE_COLUMN)]
+        )
+        fetched.setdefault(day, []).append(row)
+      partitions.update(
+          (day, (fetched_columns, rows)) for day, rows in fetched.items()
+      )
+      self._store(
+          report_key,
+          customer_id,
+          fetched_columns,
+          {
+              day: rows
+              for day, rows in fetched.items()
+              if day <= last_closed_day
+          },
+      )
+
+    self.cached_days += len(stored)
+    self.fetched_days += len(to_fetch)
+    if unsplit_columns is not None:
+      # The other days are read in the columns of the rows without a date.
+      columns = unsplit_columns
+    rows = []
+    for day in sorted(partitions):
+      day_rows = _project(*partitions[day], columns)
+      if day_rows is None:
+        # The days were stored with other columns than the API returns now.
+        return fetch(query.with_range(query.start, query.end))
+      rows.extend(day_rows)
+    return columns, rows
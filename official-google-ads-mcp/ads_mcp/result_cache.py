@@ -0,0 +1,250 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An in-process cache of GAQL query results."""
+
+import asyncio
+import collections
+from collections.abc import Awaitable, Callable
+import json
+import re
+import threading
+import time
+from typing import Any, TypeVar
+
+_T = TypeVar("_T")
+
+# Rows serialized at once when estimating the size of a result.
+_SIZE_CHUNK_ROWS = 1000
+
+_METRICS_FIELD = re.compile(r"\b(metrics\.|segments\.date\b)", re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+  """Normalizes the whitespace of a GAQL query."""
+  return " ".join(query.split())
+
+
+def is_structural_query(query: str) -> bool:
+  """Checks if a query only reads account structure, not metrics or dates."""
+  return not _METRICS_FIELD.search(query)
+
+
+def estimate_size(
+    columns: list[str], rows: list[list[Any]], limit: int | None = None
+) -> int:
+  """Estimates the size in bytes of a query result, as serialized JSON.
+
+  Args:
+      columns: The columns of the result.
+      rows: The rows of the result.
+      limit: (Optional) A size past which the estimate stops. A result
+          over it gets a size over it, without serializing all of its rows.
+
+  Returns:
+      The length of `[columns, rows]` serialized as JSON, or a size over
+      `limit` if the result is larger.
+  """
+  # The brackets and separator around the columns and rows.
+  size = len(json.dumps(columns, default=str)) + 4
+  if not rows:
+    return size + 2
+  if limit is not None:
+    # Each value is at least one character and a separator.
+    size_at_least = size + len(rows) * (3 * len(columns) + 2)
+    if size_at_least > limit:
+      return size_at_least
+  for start in range(0, len(rows), _SIZE_CHUNK_ROWS):
+    # The brackets of each chunk count for the separator after it, and for
+    # the brackets of the rows after the last chunk.
+    chunk = rows[start : start + _SIZE_CHUNK_ROWS]
+    size += len(json.dumps(chunk, default=str))
+    if limit is not None and size > limit:
+      break
+  return size
+
+
+class _Entry:
+  """A cached query result and when it expires."""
+
+  def __init__(
+      self,
+      columns: list[str],
+      rows: list[list[Any]],
+      size: int,
+      expires_at: float,
+  ):
+    self.columns = columns
+    self.rows = rows
+    self.size = size
+    self.expires_at = expires_at
+
+
+class ResultCache:
+  """A least-recently-used cache of query results bounded by size in bytes.
+
+  Each result expires after a time to live chosen when it is added. Results
+  larger than a quarter of the cache are not kept, so that one large report
+  does not flush every other entry.
+  """
+
+  def __init__(self, max_bytes: int, clock=time.monotonic):
+    self.max_bytes = max_bytes
+    self._clock = clock
+    self._entries: collections.OrderedDict[tuple[Any, ...], _Entry] = (
+        collections.OrderedDict()
+    )
+    self._size = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(
+      self, key: tuple[Any, ...]
+  ) -> tuple[list[str], list[list[Any]]] | None:
+    """Gets a cached result.
+
+    Args:
+        key: The cache key of the query.
+
+    Returns:
+        The columns and rows of the result, or None if it is not cached or
+        has expired. The result is shared and must not be modified.
+    """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and entry.expires_at <= self._clock():
+        self._remove(key)
+        entry = None
+      if entry is None:
+        self.misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry.columns, entry.rows
+
+  def put(
+      self,
+      key: tuple[Any, ...],
+      columns: list[str],
+      rows: list[list[Any]],
+      ttl_seconds: float,
+  ):
+    """Adds a result to the cache.
+
+    Args:
+        key: The cache key of the query.
+        columns: The columns of the result.
+        rows: The rows of the result.
+        ttl_seconds: The time after which the result expires.
+    """
+    if self.max_bytes <= 0 or ttl_seconds <= 0:
+      return
+    size = estimate_size(columns, rows, limit=self.max_bytes // 4)
+    if size > self.max_bytes // 4:
+      return
+    with self._lock:
+      if key in self._entries:
+        self._remove(key)
+      self._entries[key] = _Entry(
+          columns, rows, size, self._clock() + ttl_seconds
+      )
+      self._size += size
+      while self._size > self.max_bytes:
+        oldest_key = next(iter(self._entries))
+        self._remove(oldest_key)
+        self.evictions += 1
+
+  def _remove(self, key: tuple[Any, ...]):
+    entry = self._entries.pop(key)
+    self._size -= entry.size
+
+  def clear(self):
+    """Removes all results from the cache and resets the counters."""
+    with self._lock:
+      self._entries.clear()
+      self._size = 0
+      self.hits = self.misses = self.evictions = 0
+
+  def stats(self) -> dict[str, int]:
+    """Gets the hit and miss counters and the size of the cache."""
+    with self._lock:
+      return {
+          "hits": self.hits,
+          "misses": self.misses,
+          "evictions": self.evictions,
+          "entries": len(self._entries),
+          "bytes": self._size,
+          "max_bytes": self.max_bytes,
+      }
+
+
+class _Call:
+  """A running call of `SingleFlight` and the number of its callers."""
+
+  def __init__(self, task: asyncio.Future):
+    self.task = task
+    self.waiters = 0
+
+
+class SingleFlight:
+  """Runs concurrent calls with the same key once and shares their result.
+
+  Calls are coroutines run on the event loop. The first caller of a key
+  starts the call as a task, and callers arriving while it is running await
+  the same task, without holding a thread, and get the same result or the
+  same exception. A call is cancelled once all of its callers are.
+  """
+
+  def __init__(self):
+    self._calls: dict[tuple[Any, ...], _Call] = {}
+    self.coalesced = 0
+
+  async def run(
+      self, key: tuple[Any, ...], func: Callable[[], Awaitable[_T]]
+  ) -> _T:
+    """Runs a call, or waits for the running call with the same key.
+
+    Args:
+        key: The key identifying identical calls.
+        func: Starts the call.
+
+    Returns:
+        The result of the call, shared with the callers it was run for.
+    """
+    call = self._calls.get(key)
+    if call is None or call.task.done():
+      call = self._calls[key] = _Call(asyncio.ensure_future(func()))
+      call.task.add_done_callback(lambda _: self._forget(key, call))
+    else:
+      self.coalesced += 1
+    call.waiters += 1
+    try:
+      # A caller that is cancelled does not cancel the call of the others.
+      return await asyncio.shield(call.task)
+    except asyncio.CancelledError:
+      if call.waiters == 1 and not call.task.done():
+        # The last caller cancels the call and waits for it to stop, while
+        # new callers start another call.
+        self._forget(key, call)
+        call.task.cancel()
+        await asyncio.wait([call.task])
+      raise
+    finally:
+      call.waiters -= 1
+
+  def _forget(self, key: tuple[Any, ...], call: _Call):
+    if self._calls.get(key) is call:
+      del self._calls[key]
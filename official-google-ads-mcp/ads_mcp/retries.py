@@ -0,0 +1,223 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Retries of Google Ads API requests failing with transient errors.
+
+A failure is retried only when every error in it has a code documented as
+transient, such as `INTERNAL_ERROR` or `TRANSIENT_ERROR`. Failures with an
+INTERNAL or RESOURCE_EXHAUSTED gRPC status, and failures without details,
+are raised by the client library as `google.api_core` or plain gRPC errors
+rather than as `GoogleAdsException`. Their details are read from the
+trailing metadata of the call, and their gRPC status is used otherwise.
+Retries wait an exponentially growing, jittered delay so that concurrent
+requests failing at the same time do not retry in lockstep.
+"""
+
+import importlib
+import random
+import threading
+from typing import Any
+
+from ads_mcp.utils import ADS_API_VERSION
+
+# The (error code field, error code) pairs of the errors worth retrying.
+RETRYABLE_ERROR_CODES = frozenset(
+    (
+        ("internal_error", "INTERNAL_ERROR"),
+        ("internal_error", "TRANSIENT_ERROR"),
+        ("internal_error", "DEADLINE_EXCEEDED"),
+        ("quota_error", "RESOURCE_TEMPORARILY_EXHAUSTED"),
+    )
+)
+# The gRPC status codes worth retrying for errors without failure details.
+RETRYABLE_STATUS_CODES = frozenset(
+    ("UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+)
+# The trailing metadata key of the failure details of a gRPC error.
+_FAILURE_KEY = (
+    f"google.ads.googleads.{ADS_API_VERSION}.errors.googleadsfailure-bin"
+)
+
+
+def get_failure(error: Exception) -> Any:
+  """Gets the `GoogleAdsFailure` of a Google Ads API error.
+
+  Args:
+      error: A `GoogleAdsException`, or a `google.api_core` or gRPC error
+          raised by the client library.
+
+  Returns:
+      The failure, or None if the error has no failure details.
+  """
+  failure = getattr(error, "failure", None)
+  if failure is not None:
+    return failure
+  # `google.api_core` errors keep the failed gRPC call as `response`.
+  call = getattr(error, "response", None) or error
+  trailing_metadata = getattr(call, "trailing_metadata", None)
+  if not callable(trailing_metadata):
+    return None
+  for key, value in trailing_metadata() or ():
+    if key == _FAILURE_KEY:
+      errors = importlib.import_module(
+          f"google.ads.googleads.{ADS_API_VERSION}.errors.types.errors"
+      )
+      try:
+        return errors.GoogleAdsFailure.deserialize(value)
+      except Exception:  # pylint: disable=broad-exception-caught
+        return None
+  return None
+
+
+def get_status_code(error: Exception) -> str | None:
+  """Gets the name of the gRPC status code of an error, if it has one."""
+  status_code = getattr(error, "grpc_status_code", None)
+  if status_code is not None:
+    return status_code.name
+  error = getattr(error, "error", None) or error
+  code = getattr(error, "code", None)
+  if not callable(code):
+    return None
+  try:
+    return code().name
+  except Exception:  # pylint: disable=broad-exception-caught
+    return None
+
+
+def get_error_codes(failure: Any) -> list[tuple[str, str]]:
+  """Gets the error codes of a `GoogleAdsFailure`.
+
+  Args:
+      failure: The failure of a `GoogleAdsException`.
+
+  Returns:
+      The name of the error code field and the name of the code of each
+      error, e.g. ("internal_error", "TRANSIENT_ERROR"). Errors without a
+      readable code are left out.
+  """
+  codes = []
+  for error in getattr(failure, "errors", None) or ():
+    error_code = getattr(error, "error_code", None)
+    try:
+      field = type(error_code).pb(error_code).WhichOneof("error_code")
+    except (AttributeError, TypeError, ValueError):
+      continue
+    if field:
+      codes.append((field, getattr(error_code, field).name))
+  return codes
+
+
+def is_retryable(failure: Any) -> bool:
+  """Checks if all the errors of a `GoogleAdsFailure` are transient."""
+  errors = getattr(failure, "errors", None) or ()
+  codes = get_error_codes(failure)
+  return (
+      bool(codes)
+      and len(codes) == len(errors)
+      and all(code in RETRYABLE_ERROR_CODES for code in codes)
+  )
+
+
+def is_retryable_error(error: Exception) -> bool:
+  """Checks if a Google Ads API error is transient.
+
+  Args:
+      error: A `GoogleAdsException`, or a `google.api_core` or gRPC error
+          raised by the client library.
+  """
+  failure = get_failure(error)
+  if failure is not None and getattr(failure, "errors", None):
+    return is_retryable(failure)
+  return get_status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+  """Gets a jittered delay before retrying a failed attempt.
+
+  Args:
+      attempt: The number of attempts made so far, starting at 1.
+      base_delay: The delay after the first attempt, before jitter.
+      max_delay: The maximum delay, before jitter.
+
+  Returns:
+      A random delay between half and all of the exponential delay.
+  """
+  delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+  return random.uniform(delay / 2, delay)
+
+
+class RetryPolicy:
+  """Decides whether failed requests are retried, and counts retries."""
+
+  def __init__(
+      self,
+      max_attempts: int = 3,
+      base_delay: float = 0.5,
+      max_delay: float = 8.0,
+  ):
+    """Initializes the policy.
+
+    Args:
+        max_attempts: The maximum number of attempts of a request.
+        base_delay: The delay in seconds after the first attempt.
+        max_delay: The maximum delay in seconds between two attempts.
+    """
+    self.max_attempts = max_attempts
+    self._base_delay = base_delay
+    self._max_delay = max_delay
+    self._lock = threading.Lock()
+    self.retries = 0
+    self.resumed = 0
+    self.exhausted = 0
+
+  def should_retry(self, error: Exception, attempt: int) -> bool:
+    """Checks if a failed attempt is retried.
+
+    Args:
+        error: The Google Ads API error raised.
+        attempt: The number of attempts made so far, starting at 1.
+    """
+    if not is_retryable_error(error):
+      return False
+    if attempt >= self.max_attempts:
+      with self._lock:
+        self.exhausted += 1
+      return False
+    return True
+
+  def next_delay(self, attempt: int, resumed: bool = False) -> float:
+    """Counts a retry and gets the delay to wait before it.
+
+    Args:
+        attempt: The number of attempts made so far, starting at 1.
+        resumed: Whether the next attempt skips the rows already read
+            rather than starting over.
+
+    Returns:
+        The delay in seconds before the next attempt.
+    """
+    with self._lock:
+      self.retries += 1
+      if resumed:
+        self.resumed += 1
+    return backoff_delay(attempt, self._base_delay, self._max_delay)
+
+  def stats(self) -> dict[str, int]:
+    """Gets the retry counters of the policy."""
+    with self._lock:
+      return {
+          "retries": self.retries,
+          "resumed": self.resumed,
+          "exhausted": self.exhausted,
+      }
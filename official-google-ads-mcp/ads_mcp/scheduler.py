@@ -0,0 +1,346 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Admission of Google Ads API requests within the API rate limits.
+
+Requests take a token from the bucket of their developer token and from the
+bucket of their customer before being sent. When a bucket is empty, the
+request waits in a queue instead of failing with RESOURCE_EXHAUSTED.
+Interactive requests are admitted before batch requests, and requests of
+the same priority in arrival order. Requests wait either in their thread or
+on the event loop, and are woken up when a request ahead of them leaves the
+queue.
+"""
+
+import asyncio
+import bisect
+import collections
+from collections.abc import Callable
+import contextlib
+import enum
+import itertools
+import threading
+import time
+from typing import Any
+
+# Full buckets are dropped when there are more than this many, a new bucket
+# starts full anyway.
+_MAX_BUCKETS = 10_000
+
+
+class Priority(enum.IntEnum):
+  """The priority classes of requests, lower values are admitted first."""
+
+  INTERACTIVE = 0
+  BATCH = 1
+
+
+class TokenBucket:
+  """A token bucket refilled at a constant rate up to its burst size."""
+
+  def __init__(self, rate: float, burst: float, now: float):
+    self.rate = rate
+    self.burst = burst
+    self.tokens = burst
+    self._updated_at = now
+
+  def refill(self, now: float):
+    self.tokens = min(
+        self.burst, self.tokens + (now - self._updated_at) * self.rate
+    )
+    self._updated_at = now
+
+  def time_until(self, tokens: float) -> float:
+    """Gets the time until the bucket holds a number of tokens."""
+    return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+class _Waiter:
+  """A request waiting for admission."""
+
+  def __init__(
+      self,
+      order: tuple[int, int],
+      developer_key: Any,
+      customer_key: Any,
+  ):
+    self.order = order
+    self.developer_key = developer_key
+    self.customer_key = customer_key
+    self.started_at = 0.0
+    self.waited = 0.0
+    self.throttled = False
+    # Wakes up a waiter on the event loop, threads wait on the condition.
+    self.wake: Callable[[], Any] | None = None
+
+  def __lt__(self, other: "_Waiter") -> bool:
+    return self.order < other.order
+
+
+class QuotaScheduler:
+  """Queues requests until the rate limits of their buckets allow them.
+
+  A request waiting for its customer bucket does not hold back the requests
+  of other customers. Waiting for the developer token bucket follows the
+  priority order.
+  """
+
+  def __init__(
+      self,
+      developer_rate: float,
+      customer_rate: float,
+      burst_seconds: float = 2.0,
+      clock=time.monotonic,
+  ):
+    """Initializes the scheduler.
+
+    Args:
+        developer_rate: The requests per second allowed per developer token,
+            unlimited if not positive.
+        customer_rate: The requests per second allowed per customer,
+            unlimited if not positive.
+        burst_seconds: The seconds of requests a full bucket allows at once.
+        clock: The monotonic clock of the buckets.
+    """
+    self._developer_rate = developer_rate
+    self._customer_rate = customer_rate
+    self._burst_seconds = burst_seconds
+    self._clock = clock
+    self._buckets: dict[Any, TokenBucket] = {}
+    self._waiters: list[_Waiter] = []
+    self._sequence = itertools.count()
+    self._condition = threading.Condition()
+    self.admitted = 0
+    self.throttled = 0
+    self.timeouts = 0
+    self.wait_seconds = 0.0
+
+  def _bucket(self, key: Any, rate: float, now: float) -> TokenBucket | None:
+    if rate <= 0:
+      return None
+    bucket = self._buckets.get(key)
+    if bucket is None:
+      burst = max(1.0, rate * self._burst_seconds)
+      bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+    else:
+      bucket.refill(now)
+    return bucket
+
+  def _try_admit(self, waiter: _Waiter) -> float:
+    """Takes the tokens of a waiter if its turn has come.
+
+    Returns:
+        0 if the waiter was admitted, otherwise the time after which it
+        should try again.
+    """
+    now = self._clock()
+    developer_bucket = self._bucket(
+        waiter.developer_key, self._developer_rate, now
+    )
+    # Count the waiters ahead of this one whose customer bucket would let
+    # them through, they get the developer tokens first.
+    claimed = collections.Counter()
+    developer_tokens_needed = 0
+    for ahead in self._waiters:
+      if ahead.developer_key != waiter.developer_key:
+        continue
+      customer_bucket = self._bucket(
+          ahead.customer_key, self._customer_rate, now
+      )
+      needed = claimed[ahead.customer_key] + 1
+      if customer_bucket is None or customer_bucket.tokens >= needed:
+        claimed[ahead.customer_key] = needed
+        developer_tokens_needed += 1
+      elif ahead is waiter:
+        return customer_bucket.time_until(needed)
+      if ahead is waiter:
+        break
+
+    if developer_bucket is not None:
+      if developer_bucket.tokens < developer_tokens_needed:
+        return developer_bucket.time_until(developer_tokens_needed)
+      developer_bucket.tokens -= 1
+    customer_bucket = self._buckets.get(waiter.customer_key)
+    if customer_bucket is not None and self._customer_rate > 0:
+      customer_bucket.tokens -= 1
+    return 0.0
+
+  def _prune(self, now: float):
+    for key, bucket in list(self._buckets.items()):
+      bucket.refill(now)
+      if bucket.tokens >= bucket.burst:
+        del self._buckets[key]
+
+  def _enqueue(
+      self, developer_key: Any, customer_id: str | None, priority: Priority
+  ) -> _Waiter:
+    waiter = _Waiter(
+        (priority, next(self._sequence)),
+        developer_key,
+        (developer_key, customer_id),
+    )
+    waiter.started_at = self._clock()
+    bisect.insort(self._waiters, waiter)
+    return waiter
+
+  def _dequeue(self, waiter: _Waiter):
+    self._waiters.remove(waiter)
+    self._condition.notify_all()
+    for other in self._waiters:
+      if other.wake is not None:
+        other.wake()
+
+  def _admitted(self, waiter: _Waiter, now: float):
+    if len(self._buckets) > _MAX_BUCKETS:
+      self._prune(now)
+    self.admitted += 1
+    if waiter.throttled:
+      waiter.waited = now - waiter.started_at
+      self.throttled += 1
+      self.wait_seconds += waiter.waited
+
+  def _poll(self, waiter: _Waiter, timeout: float | None) -> float:
+    """Admits a waiter if its turn has come.
+
+    Returns:
+        0 if the waiter was admitted, otherwise the time after which it
+        should try again.
+
+    Raises:
+        RuntimeError: If the waiter could not be admitted in time.
+    """
+    delay = self._try_admit(waiter)
+    now = self._clock()
+    if delay <= 0:
+      self._admitted(waiter, now)
+      return 0.0
+    if timeout is not None:
+      remaining = waiter.started_at + timeout - now
+      if remaining <= 0:
+        self.timeouts += 1
+        raise RuntimeError(
+            "Timed out waiting for Google Ads API quota after"
+            f" {timeout:g} seconds. Try again later."
+        )
+      delay = min(delay, remaining)
+    waiter.throttled = True
+    return delay
+
+  def admit(
+      self,
+      developer_key: Any,
+      customer_id: str | None = None,
+      priority: Priority = Priority.INTERACTIVE,
+      timeout: float | None = None,
+  ) -> float:
+    """Waits until a request can be sent within the rate limits.
+
+    Args:
+        developer_key: The key identifying the developer token.
+        customer_id: (Optional) The ID of the customer of the request.
+        priority: The priority class of the request.
+        timeout: (Optional) The maximum number of seconds to wait.
+
+    Returns:
+        The number of seconds the request waited.
+
+    Raises:
+        RuntimeError: If the request could not be admitted in time.
+    """
+    with self._condition:
+      waiter = self._enqueue(developer_key, customer_id, priority)
+      try:
+        while delay := self._poll(waiter, timeout):
+          self._condition.wait(delay)
+        return waiter.waited
+      finally:
+        self._dequeue(waiter)
+
+  def try_admit(
+      self,
+      developer_key: Any,
+      customer_id: str | None = None,
+      priority: Priority = Priority.INTERACTIVE,
+  ) -> bool:
+    """Admits a request if it can be sent right away, without waiting.
+
+    Args:
+        developer_key: The key identifying the developer token.
+        customer_id: (Optional) The ID of the customer of the request.
+        priority: The priority class of the request.
+
+    Returns:
+        Whether the request was admitted.
+    """
+    with self._condition:
+      waiter = self._enqueue(developer_key, customer_id, priority)
+      try:
+        if self._try_admit(waiter) > 0:
+          return False
+        self._admitted(waiter, self._clock())
+        return True
+      finally:
+        self._dequeue(waiter)
+
+  async def admit_async(
+      self,
+      developer_key: Any,
+      customer_id: str | None = None,
+      priority: Priority = Priority.INTERACTIVE,
+      timeout: float | None = None,
+  ) -> float:
+    """Waits on the event loop until a request can be sent.
+
+    Unlike `admit`, no thread is held while the request waits.
+
+    Args:
+        developer_key: The key identifying the developer token.
+        customer_id: (Optional) The ID of the customer of the request.
+        priority: The priority class of the request.
+        timeout: (Optional) The maximum number of seconds to wait.
+
+    Returns:
+        The number of seconds the request waited.
+
+    Raises:
+        RuntimeError: If the request could not be admitted in time.
+    """
+    loop = asyncio.get_running_loop()
+    woken = asyncio.Event()
+    with self._condition:
+      waiter = self._enqueue(developer_key, customer_id, priority)
+      waiter.wake = lambda: loop.call_soon_threadsafe(woken.set)
+    try:
+      while True:
+        woken.clear()
+        with self._condition:
+          delay = self._poll(waiter, timeout)
+        if not delay:
+          return waiter.waited
+        with contextlib.suppress(TimeoutError):
+          await asyncio.wait_for(woken.wait(), delay)
+    finally:
+      with self._condition:
+        self._dequeue(waiter)
+
+  def stats(self) -> dict[str, Any]:
+    """Gets the admission counters of the scheduler."""
+    with self._condition:
+      return {
+          "admitted": self.admitted,
+          "throttled": self.throttled,
+          "timeouts": self.timeouts,
+          "wait_seconds": round(self.wait_seconds, 3),
+          "queued": len(self._waiters),
+      }
@@ -13,39 +13,126 @@
 # limitations under the License.
 """Generates YAML files for Google Ads API reporting views."""
 
+import argparse
 import asyncio
+from collections.abc import Callable
+import json
 import logging
 import os
-from typing import Any, Literal
+import random
+import shutil
+import tempfile
+import threading
+from typing import Any, Literal, TextIO
 
+from ads_mcp import docs_index
+from ads_mcp.docs_index import DOCS_INDEX
+from ads_mcp.utils import ADS_API_VERSION
+from ads_mcp.utils import dump_yaml
+from ads_mcp.utils import load_yaml
 import httpx
-import yaml
 
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-ADS_API_VERSION = "v21"
 VIEW_JSON_URL_PATH = (
     f"https://gaql-query-builder.uc.r.appspot.com/schemas/{ADS_API_VERSION}/"
 )
 MODULE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONTEXT_PATH = f"{MODULE_ROOT}/context"
+VIEWS_PATH = f"{CONTEXT_PATH}/views"
+STAGING_PATH = f"{CONTEXT_PATH}/.views-staging"
+BUNDLE_PATH = f"{CONTEXT_PATH}/{docs_index.bundle_file_name()}"
+MANIFEST_FILE = ".manifest.json"
+VIEWS_REFRESH_MODES = ("background", "startup", "off")
 
-http_client = httpx.AsyncClient(http2=True)
+MAX_CONCURRENT_FETCHES = 8
+MAX_FETCH_ATTEMPTS = 4
+RETRY_BASE_DELAY_SECONDS = 0.5
+_RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+  """Gets the shared HTTP client, created on first use."""
+  global _http_client
+  if _http_client is None:
+    _http_client = httpx.AsyncClient(http2=True)
+  return _http_client
+
+
+class ViewNotModified(Exception):
+  """The view definition did not change since it was last fetched."""
 
 
 def get_view_json_url(view: str) -> str:
   return f"{VIEW_JSON_URL_PATH}{view}.json"
 
 
-async def get_view_json(view: str) -> dict[str, Any]:
-  """Fetches the JSON definition for a given reporting view."""
-  http_res = await http_client.get(get_view_json_url(view))
-  view_json = http_res.json()
-  return view_json
+async def fetch_view_json(
+    view: str, validators: dict[str, str] | None = None
+) -> tuple[dict[str, Any], dict[str, str]]:
+  """Fetches the JSON definition of a view, retrying transient failures.
+
+  Args:
+      view: The name of the view.
+      validators: (Optional) The `etag` and `last_modified` of the last
+          fetched definition, sent as conditional request headers.
+
+  Returns:
+      The view definition and the validators of the response.
+
+  Raises:
+      ViewNotModified: If the definition did not change since `validators`.
+      httpx.HTTPError: If the definition could not be fetched.
+  """
+  headers = {}
+  if validators and validators.get("etag"):
+    headers["If-None-Match"] = validators["etag"]
+  if validators and validators.get("last_modified"):
+    headers["If-Modified-Since"] = validators["last_modified"]
+
+  for attempt in range(MAX_FETCH_ATTEMPTS):
+    try:
+      http_res = await get_http_client().get(
+          get_view_json_url(view), headers=headers
+      )
+      if http_res.status_code not in _RETRY_STATUS_CODES:
+        break
+      error = httpx.HTTPStatusError(
+          f"Server error {http_res.status_code} fetching {view}.",
+          request=http_res.request,
+          response=http_res,
+      )
+    except httpx.TransportError as e:
+      error = e
+    if attempt == MAX_FETCH_ATTEMPTS - 1:
+      raise error
+    delay = RETRY_BASE_DELAY_SECONDS * 2**attempt
+    await asyncio.sleep(random.uniform(delay / 2, delay))
 
+  if http_res.status_code == 304:
+    raise ViewNotModified(view)
+  http_res.raise_for_status()
+  new_validators = {}
+  if "etag" in http_res.headers:
+    new_validators["etag"] = http_res.headers["etag"]
+  if "last-modified" in http_res.headers:
+    new_validators["last_modified"] = http_res.headers["last-modified"]
+  return http_res.json(), new_validators
 
-# def get_view_json(view: str):
-#     return json.load(open("ad_group_ad_asset_combination_view.json"))
+
+def write_atomically(path: str, write: Callable[[TextIO], Any]):
+  """Writes a file through a temporary file, so it is never left partial."""
+  directory, name = os.path.split(path)
+  fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.")
+  try:
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+      write(f)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
 
 
 def get_fields_obj(
@@ -73,9 +160,29 @@ def get_fields_obj(
   }
 
 
-async def save_view_yaml(view: str, path: str = "."):
-  """Saves the reporting view metadata as a YAML file."""
-  view_json = await get_view_json(view)
+async def save_view_yaml(
+    view: str,
+    path: str = ".",
+    validators: dict[str, str] | None = None,
+) -> dict[str, str]:
+  """Saves the reporting view metadata as a YAML file.
+
+  Args:
+      view: The name of the view.
+      path: The directory of the YAML file.
+      validators: (Optional) The validators of the saved definition. The
+          file is left unchanged if the definition was not modified.
+
+  Returns:
+      The validators of the saved definition.
+  """
+  yaml_path = os.path.join(path, f"{view}.yaml")
+  try:
+    view_json, validators = await fetch_view_json(
+        view, validators if os.path.isfile(yaml_path) else None
+    )
+  except ViewNotModified:
+    return validators
 
   attributed_views = set(
       v.split(".")[0]
@@ -93,26 +200,179 @@ async def save_view_yaml(view: str, path: str = "."):
       "metrics": get_fields_obj(view_json, "metrics"),
   }
 
-  with open(os.path.join(path, f"{view}.yaml"), "w", encoding="utf-8") as f:
-    yaml.safe_dump(view_data, f, sort_keys=False)
+  write_atomically(
+      yaml_path,
+      lambda f: dump_yaml(view_data, f, sort_keys=False),
+  )
+  return validators
+
+
+def write_views_bundle(views: list[str], views_path: str, bundle_path: str):
+  """Writes the metadata of the saved views as a single compact bundle."""
+  views_data = {}
+  for view in views:
+    with open(f"{views_path}/{view}.yaml", "r", encoding="utf-8") as f:
+      views_data[view] = load_yaml(f)
+  bundle = docs_index.build_bundle(views_data)
+  write_atomically(
+      bundle_path,
+      lambda f: json.dump(bundle, f, separators=(",", ":"), sort_keys=True),
+  )
+
+
+def load_manifest(path: str) -> dict[str, Any]:
+  """Loads the refresh manifest, reset if it is for another API version.
 
+  The manifest records the views saved for the current API version and the
+  validators of their definitions.
+  """
+  manifest = None
+  if os.path.isfile(path):
+    try:
+      with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    except ValueError:
+      logging.warning("Ignoring invalid views manifest %s.", path)
+  if not manifest or manifest.get("api_version") != ADS_API_VERSION:
+    manifest = {"api_version": ADS_API_VERSION, "completed": [], "views": {}}
+  return manifest
 
-async def update_views_yaml():
-  """Updates the YAML files for all reporting views."""
-  if os.path.isfile(f"{CONTEXT_PATH}/.api-version"):
+
+def save_manifest(path: str, manifest: dict[str, Any]):
+  write_atomically(path, lambda f: json.dump(manifest, f, indent=2))
+
+
+async def update_views_yaml(
+    force: bool = False, staged: bool = False
+) -> list[str]:
+  """Updates the YAML files for all reporting views.
+
+  Views are fetched concurrently, up to `MAX_CONCURRENT_FETCHES` at a time.
+  Each saved view is recorded in the manifest of the views directory, so an
+  update interrupted by failures only fetches the remaining views when run
+  again. The API version is written once all views are saved.
+
+  Args:
+      force: Whether to check every view for changes, even if all views
+          were saved for the current API version. Unchanged views are not
+          downloaded again.
+      staged: Whether to save the views in a staging directory, swapped in
+          for the served views once all of them are saved, instead of
+          updating the served views one by one.
+
+  Returns:
+      The views that could not be saved.
+  """
+  if not force and os.path.isfile(BUNDLE_PATH):
+    return []
+  if not force and os.path.isfile(f"{CONTEXT_PATH}/.api-version"):
     with open(f"{CONTEXT_PATH}/.api-version", "r", encoding="utf-8") as f:
       if f.read().strip() == ADS_API_VERSION:
-        return
+        return []
 
   with open(f"{CONTEXT_PATH}/views.yaml", "r", encoding="utf-8") as f:
-    views = yaml.safe_load(f)
+    views = load_yaml(f)
+
+  views_path = VIEWS_PATH
+  if staged:
+    views_path = STAGING_PATH
+    if not os.path.isdir(STAGING_PATH) and os.path.isdir(VIEWS_PATH):
+      # Start from the served views, so that unchanged ones are kept.
+      shutil.copytree(VIEWS_PATH, STAGING_PATH)
+  os.makedirs(views_path, exist_ok=True)
+  manifest_path = f"{views_path}/{MANIFEST_FILE}"
+  manifest = load_manifest(manifest_path)
+  if force:
+    manifest["completed"] = []
+  completed = set(manifest["completed"])
+  semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
 
-  tasks = [save_view_yaml(view, f"{CONTEXT_PATH}/views") for view in views]
-  await asyncio.gather(*tasks)
+  async def update_view(view: str):
+    async with semaphore:
+      validators = await save_view_yaml(
+          view, views_path, manifest["views"].get(view)
+      )
+    manifest["views"][view] = validators
+    completed.add(view)
+    manifest["completed"] = sorted(completed)
+    save_manifest(manifest_path, manifest)
+
+  pending = [
+      view
+      for view in views
+      if view not in completed
+      or not os.path.isfile(f"{views_path}/{view}.yaml")
+  ]
+  results = await asyncio.gather(
+      *(update_view(view) for view in pending), return_exceptions=True
+  )
+  failed = []
+  for view, result in zip(pending, results):
+    if isinstance(result, BaseException):
+      logging.error("Failed to update view %s: %s", view, result)
+      failed.append(view)
+  if failed:
+    return failed
 
+  write_views_bundle(views, views_path, BUNDLE_PATH)
+  if staged:
+    DOCS_INDEX.replace_views(STAGING_PATH)
   with open(f"{CONTEXT_PATH}/.api-version", "w", encoding="utf-8") as f:
     f.write(ADS_API_VERSION)
+  return []
+
+
+def _refresh_views():
+  try:
+    failed = asyncio.run(update_views_yaml(staged=True))
+  except Exception:  # pylint: disable=broad-exception-caught
+    logging.exception("Failed to refresh the reporting view docs.")
+    return
+  if failed:
+    logging.warning(
+        "Serving the previous reporting view docs, %d views failed to"
+        " refresh.",
+        len(failed),
+    )
+  else:
+    logging.info("Reporting view docs are up to date.")
+
+
+def start_views_refresh(mode: str = "background") -> threading.Thread | None:
+  """Refreshes the reporting view docs when the server starts.
+
+  Args:
+      mode: "background" to serve the current docs while the new ones are
+          fetched in a background thread, "startup" to fetch them before
+          returning, or "off" to serve the current docs as they are. The new
+          docs are swapped in at once when all of them are saved.
+
+  Returns:
+      The background refresh thread, if one was started.
+  """
+  if mode not in VIEWS_REFRESH_MODES:
+    modes = ", ".join(VIEWS_REFRESH_MODES)
+    raise ValueError(
+        f"Unknown views refresh mode {mode!r}, expected one of {modes}."
+    )
+  if mode == "off":
+    return None
+  if mode == "startup":
+    _refresh_views()
+    return None
+  thread = threading.Thread(
+      target=_refresh_views, name="views-refresh", daemon=True
+  )
+  thread.start()
+  return thread
 
 
 if __name__ == "__main__":
-  asyncio.run(update_views_yaml())
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument(
+      "--force",
+      action="store_true",
+      help="Check every view for changes, even if the bundle is up to date.",
+  )
+  args = parser.parse_args()
+  asyncio.run(update_views_yaml(force=args.force))
@@ -13,30 +13,38 @@
 # limitations under the License.
 
 """The server for the Google Ads API MCP."""
-import asyncio
+
+import logging
 import os
+import time
 
+from ads_mcp import metrics
 from ads_mcp.coordinator import mcp_server
-from ads_mcp.scripts.generate_views import update_views_yaml
+from ads_mcp.scripts.generate_views import start_views_refresh
 from ads_mcp.tools import api
 from ads_mcp.tools import docs
 
 import dotenv
-from fastmcp.server.auth.providers.google import GoogleProvider
-from fastmcp.server.auth.providers.google import GoogleTokenVerifier
-
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 
 dotenv.load_dotenv()
 
 
 tools = [api, docs]
 
+# The auth providers are only imported when configured, they pull in a large
+# dependency tree.
 if os.getenv("USE_GOOGLE_OAUTH_ACCESS_TOKEN"):
+  from fastmcp.server.auth.providers.google import GoogleTokenVerifier
+
   mcp_server.auth = GoogleTokenVerifier()
 
 if os.getenv("FASTMCP_SERVER_AUTH_GOOGLE_CLIENT_ID") and os.getenv(
     "FASTMCP_SERVER_AUTH_GOOGLE_CLIENT_SECRET"
 ):
+  from fastmcp.server.auth.providers.google import GoogleProvider
+
   base_url = os.getenv("FASTMCP_SERVER_BASE_URL", "http://localhost:8000")
   mcp_server.auth = GoogleProvider(
       base_url=base_url,
@@ -44,10 +52,37 @@ if os.getenv("FASTMCP_SERVER_AUTH_GOOGLE_CLIENT_ID") and os.getenv(
   )
 
 
+def add_metrics_route(path: str):
+  """Serves the server metrics in the Prometheus text format at a path."""
+
+  @mcp_server.custom_route(path, methods=["GET"])
+  async def get_metrics(request: Request) -> PlainTextResponse:
+    del request  # Unused.
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# Path of the Prometheus metrics endpoint, not served unless set. The endpoint
+# is not behind the server authentication.
+METRICS_PATH = os.getenv("ADS_MCP_METRICS_PATH", "")
+
+if METRICS_PATH:
+  add_metrics_route(METRICS_PATH)
+
+
 def main():
   """Initializes and runs the MCP server."""
-  asyncio.run(update_views_yaml())  # Check and update docs resource
-  api.get_ads_client()  # Check Google Ads credentials
+  started_at = time.perf_counter()
+  logging.basicConfig(level=logging.INFO)
+  # Check and update docs resource
+  start_views_refresh(os.getenv("ADS_MCP_VIEWS_REFRESH", "background"))
+  api.check_credentials()  # Check Google Ads credentials
+  api.start_warm_up()
+  logging.info(
+      "Server started in %.3f seconds.", time.perf_counter() - started_at
+  )
   print("mcp server starting...")
   mcp_server.run(transport="streamable-http")  # Initialize and run the server
 
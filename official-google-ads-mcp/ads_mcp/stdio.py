@@ -13,10 +13,12 @@
 # limitations under the License.
 
 """The server for the Google Ads API MCP."""
-import asyncio
+import logging
+import os
+import time
 
 from ads_mcp.coordinator import mcp_server
-from ads_mcp.scripts.generate_views import update_views_yaml
+from ads_mcp.scripts.generate_views import start_views_refresh
 from ads_mcp.tools import api
 from ads_mcp.tools import docs
 
@@ -30,8 +32,15 @@ tools = [api, docs]
 
 def main():
   """Initializes and runs the MCP server."""
-  asyncio.run(update_views_yaml())  # Check and update docs resource
-  api.get_ads_client()  # Check Google Ads credentials
+  started_at = time.perf_counter()
+  logging.basicConfig(level=logging.INFO)
+  # Check and update docs resource
+  start_views_refresh(os.getenv("ADS_MCP_VIEWS_REFRESH", "background"))
+  api.check_credentials()  # Check Google Ads credentials
+  api.start_warm_up()
+  logging.info(
+      "Server started in %.3f seconds.", time.perf_counter() - started_at
+  )
   print("mcp server starting...")
   mcp_server.run(transport="stdio")  # Initialize and run the server
 
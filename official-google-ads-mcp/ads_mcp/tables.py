@@ -0,0 +1,673 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Column buffers of GAQL results, for post-processing large reports.
+
+Each chunk of streamed rows is appended column by column into typed
+buffers: `array.array` of int64 for ids and micros, with a mask of the
+missing values if any, of float64 for fractional metrics, and
+dictionary-encoded strings for names, enums and dates. A million-row
+report then takes a few dozen bytes per row instead of a Python list per
+row. Derived metrics and filters still loop over the values in Python, but
+one column at a time, without building a row, and filters on a
+dictionary-encoded column compare each distinct value once.
+
+The buffers support the buffer protocol, so `ColumnTable.to_arrow` wraps
+the numeric columns without copying them when `pyarrow` is installed.
+"""
+
+import array
+from collections.abc import Callable, Iterable, Sequence
+import copy
+import math
+import operator
+import re
+from typing import Any
+
+# The derived metrics, as (numerator, denominator, divisor) computing
+# numerator / denominator / divisor, without denominator for a plain
+# division. Amounts are in currency units.
+DERIVED_METRICS: dict[str, tuple[str, str | None, int]] = {
+    "ctr": ("metrics.clicks", "metrics.impressions", 1),
+    "cpc": ("metrics.cost_micros", "metrics.clicks", 1_000_000),
+    "cpa": ("metrics.cost_micros", "metrics.conversions", 1_000_000),
+    "cost": ("metrics.cost_micros", None, 1_000_000),
+}
+
+_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+_CONDITION = re.compile(r"^([\w.]+)\s*(!=|>=|<=|=|>|<)\s*(.+)$")
+# An AND joining conditions, or a quoted literal, which may contain one.
+_AND_OR_LITERAL = re.compile(
+    r"""(?P<literal>'[^']*'|"[^"]*")|\s+AND\s+""", re.IGNORECASE
+)
+
+
+def _is_number(value: Any) -> bool:
+  return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _Column:
+  """A column of values of a single type."""
+
+  kind = ""
+
+  def __len__(self) -> int:
+    raise NotImplementedError
+
+  def extend(self, values: Sequence[Any]) -> "_Column":
+    """Appends values, returning the column or a wider one holding them."""
+    raise NotImplementedError
+
+  def values(self) -> list[Any]:
+    """Gets the values, with None for missing values."""
+    raise NotImplementedError
+
+  def take(self, indexes: Sequence[int]) -> "_Column":
+    """Gets the column of the values at the given indexes."""
+    raise NotImplementedError
+
+  def numbers(self) -> Sequence[int | float]:
+    """Gets the numeric values, with NaN for missing values.
+
+    Raises:
+        TypeError: If the column is not numeric.
+    """
+    raise TypeError(f"a {self.kind} column is not numeric")
+
+  def matching(
+      self,
+      predicate: Callable[[Any], bool],
+      indexes: Iterable[int],
+  ) -> list[int]:
+    """Gets the indexes of the values for which the predicate is true."""
+    values = self.values()
+    return [
+        i
+        for i in indexes
+        if values[i] is not None and _safe_test(predicate, values[i])
+    ]
+
+  def to_arrow(self, pa: Any) -> Any:
+    """Converts the column to a `pyarrow.Array`."""
+    raise NotImplementedError
+
+
+def _safe_test(predicate: Callable[[Any], bool], value: Any) -> bool:
+  try:
+    return predicate(value)
+  except TypeError:
+    return False
+
+
+class _NumberColumn(_Column):
+  """A column of numbers held in an `array.array`."""
+
+  typecode = ""
+
+  def __init__(self, data: Iterable[Any] = ()):
+    self.data = array.array(self.typecode, data)
+
+  def __len__(self) -> int:
+    return len(self.data)
+
+  def numbers(self) -> Sequence[int | float]:
+    return self.data
+
+  def matching(
+      self,
+      predicate: Callable[[Any], bool],
+      indexes: Iterable[int],
+  ) -> list[int]:
+    data = self.data
+    return [i for i in indexes if _safe_test(predicate, data[i])]
+
+  def take(self, indexes: Sequence[int]) -> _Column:
+    return type(self)(map(self.data.__getitem__, indexes))
+
+  def _widen(self, values: Sequence[Any]) -> _Column:
+    if all(value is None or _is_number(value) for value in values):
+      column = Float64Column(self.numbers())
+    else:
+      column = ObjectColumn(self.values())
+    return column.extend(values)
+
+
+class Int64Column(_NumberColumn):
+  """A column of 64-bit integers, e.g. ids, counts and micros amounts.
+
+  Missing values are held as 0, and flagged in `valid`, which is only
+  created once a value is missing, so that large ids stay exact instead of
+  being widened to floats.
+  """
+
+  kind = "int64"
+  typecode = "q"
+
+  def __init__(self, data: Iterable[Any] = ()):
+    super().__init__(data)
+    # 1 for each value set and 0 for each missing one, or None if all set.
+    self.valid: bytearray | None = None
+
+  def extend(self, values: Sequence[Any]) -> _Column:
+    if any(map(_is_bool, values)):
+      return self._widen(values)
+    size = len(self.data)
+    try:
+      self.data.extend(values)
+    except (TypeError, OverflowError):
+      # The values before the failing one were appended.
+      del self.data[size:]
+      return self._extend_missing(values)
+    if self.valid is not None:
+      self.valid.extend(b"\x01" * len(values))
+    return self
+
+  def _extend_missing(self, values: Sequence[Any]) -> _Column:
+    """Appends integers and missing values, or widens the column."""
+    if not all(value is None or _is_int(value) for value in values):
+      return self._widen(values)
+    size = len(self.data)
+    try:
+      self.data.extend(0 if value is None else value for value in values)
+    except OverflowError:
+      del self.data[size:]
+      return self._widen(values)
+    if self.valid is None:
+      self.valid = bytearray(b"\x01" * size)
+    self.valid.extend(value is not None for value in values)
+    return self
+
+  def values(self) -> list[Any]:
+    if self.valid is None:
+      return self.data.tolist()
+    return [
+        value if valid else None for value, valid in zip(self.data, self.valid)
+    ]
+
+  def numbers(self) -> Sequence[int | float]:
+    if self.valid is None:
+      return self.data
+    return array.array(
+        "d",
+        [
+            value if valid else math.nan
+            for value, valid in zip(self.data, self.valid)
+        ],
+    )
+
+  def matching(
+      self,
+      predicate: Callable[[Any], bool],
+      indexes: Iterable[int],
+  ) -> list[int]:
+    if self.valid is None:
+      return super().matching(predicate, indexes)
+    data, valid = self.data, self.valid
+    return [i for i in indexes if valid[i] and _safe_test(predicate, data[i])]
+
+  def take(self, indexes: Sequence[int]) -> _Column:
+    column = Int64Column(map(self.data.__getitem__, indexes))
+    if self.valid is not None:
+      column.valid = bytearray(map(self.valid.__getitem__, indexes))
+    return column
+
+  def to_arrow(self, pa: Any) -> Any:
+    validity = None
+    if self.valid is not None:
+      # Casting the bytes to booleans packs them into a validity bitmap.
+      validity = (
+          pa.Array.from_buffers(
+              pa.uint8(), len(self.valid), [None, pa.py_buffer(self.valid)]
+          )
+          .cast(pa.bool_())
+          .buffers()[1]
+      )
+    return pa.Array.from_buffers(
+        pa.int64(), len(self.data), [validity, pa.py_buffer(self.data)]
+    )
+
+
+def _is_int(value: Any) -> bool:
+  return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_bool(value: Any) -> bool:
+  return isinstance(value, bool)
+
+
+class Float64Column(_NumberColumn):
+  """A column of 64-bit floats, with NaN for missing values."""
+
+  kind = "float64"
+  typecode = "d"
+
+  def extend(self, values: Sequence[Any]) -> _Column:
+    if any(map(_is_bool, values)):
+      return self._widen(values)
+    size = len(self.data)
+    try:
+      self.data.extend(values)
+    except TypeError:
+      del self.data[size:]
+      if not all(value is None or _is_number(value) for value in values):
+        return self._widen(values)
+      self.data.extend(
+          math.nan if value is None else value for value in values
+      )
+    return self
+
+  def values(self) -> list[Any]:
+    return [None if math.isnan(value) else value for value in self.data]
+
+  def matching(
+      self,
+      predicate: Callable[[Any], bool],
+      indexes: Iterable[int],
+  ) -> list[int]:
+    data = self.data
+    # Missing values never match, although NaN passes `!=`.
+    return [
+        i
+        for i in indexes
+        if not math.isnan(data[i]) and _safe_test(predicate, data[i])
+    ]
+
+  def to_arrow(self, pa: Any) -> Any:
+    if any(map(math.isnan, self.data)):
+      return pa.array(self.values(), pa.float64())
+    return pa.Array.from_buffers(
+        pa.float64(), len(self.data), [None, pa.py_buffer(self.data)]
+    )
+
+
+class DictionaryColumn(_Column):
+  """A column of repeated values, e.g. names, enums and dates.
+
+  Each distinct value is held once, and the rows hold its int32 code.
+  """
+
+  kind = "dictionary"
+
+  def __init__(self):
+    self.codes = array.array("i")
+    self.dictionary: list[Any] = []
+    self._code_of: dict[Any, int] = {}
+    self._has_null = False
+
+  def __len__(self) -> int:
+    return len(self.codes)
+
+  def _code(self, value: Any) -> int:
+    if value is None:
+      self._has_null = True
+      return -1
+    # Keyed by type too, so that True and 1 get different codes.
+    key = (type(value), value)
+    code = self._code_of.get(key)
+    if code is None:
+      code = self._code_of[key] = len(self.dictionary)
+      self.dictionary.append(value)
+    return code
+
+  def extend(self, values: Sequence[Any]) -> _Column:
+    size = len(self.codes)
+    try:
+      self.codes.extend(map(self._code, values))
+    except TypeError:
+      # An unhashable value, e.g. a message converted to a dict.
+      del self.codes[size:]
+      return ObjectColumn(self.values()).extend(values)
+    return self
+
+  def values(self) -> list[Any]:
+    lookup = self.dictionary + [None]
+    return [lookup[code] for code in self.codes]
+
+  def matching(
+      self,
+      predicate: Callable[[Any], bool],
+      indexes: Iterable[int],
+  ) -> list[int]:
+    matched = {
+        code
+        for code, value in enumerate(self.dictionary)
+        if _safe_test(predicate, value)
+    }
+    codes = self.codes
+    return [i for i in indexes if codes[i] in matched]
+
+  def take(self, indexes: Sequence[int]) -> _Column:
+    # The copy shares the dictionary, which only ever grows.
+    column = copy.copy(self)
+    column.codes = array.array("i", map(self.codes.__getitem__, indexes))
+    return column
+
+  def to_arrow(self, pa: Any) -> Any:
+    if self._has_null:
+      indices = pa.array(
+          [None if code < 0 else code for code in self.codes], pa.int32()
+      )
+    else:
+      indices = pa.Array.from_buffers(
+          pa.int32(), len(self.codes), [None, pa.py_buffer(self.codes)]
+      )
+    return pa.DictionaryArray.from_arrays(indices, pa.array(self.dictionary))
+
+
+class ObjectColumn(_Column):
+  """A column of values of any type, e.g. messages and repeated fields."""
+
+  kind = "object"
+
+  def __init__(self, data: Iterable[Any] = ()):
+    self.data = list(data)
+
+  def __len__(self) -> int:
+    return len(self.data)
+
+  def extend(self, values: Sequence[Any]) -> _Column:
+    self.data.extend(values)
+    return self
+
+  def values(self) -> list[Any]:
+    return self.data
+
+  def take(self, indexes: Sequence[int]) -> _Column:
+    return ObjectColumn(map(self.data.__getitem__, indexes))
+
+  def to_arrow(self, pa: Any) -> Any:
+    return pa.array(self.data)
+
+
+def _new_column(values: Sequence[Any]) -> _Column:
+  """Creates an empty column for values, typed after the first one set."""
+  sample = next((value for value in values if value is not None), None)
+  if isinstance(sample, (bool, str)):
+    return DictionaryColumn()
+  if isinstance(sample, int):
+    return Int64Column()
+  if isinstance(sample, float):
+    return Float64Column()
+  return ObjectColumn()
+
+
+def check_derived_metrics(names: Sequence[str], columns: Sequence[str]):
+  """Checks that derived metrics exist and their fields are selected.
+
+  Args:
+      names: The names of the derived metrics.
+      columns: The selected fields.
+
+  Raises:
+      ValueError: If a metric is unknown or a field it needs is missing.
+  """
+  for name in names:
+    if name not in DERIVED_METRICS:
+      metrics = ", ".join(DERIVED_METRICS)
+      raise ValueError(
+          f"Unknown derived metric {name!r}, expected one of {metrics}."
+      )
+    missing = [
+        field
+        for field in DERIVED_METRICS[name][:2]
+        if field is not None and field not in columns
+    ]
+    if missing:
+      fields = " and ".join(missing)
+      raise ValueError(
+          f"{name} needs {fields}. Add them to the SELECT clause."
+      )
+
+
+def _split_conditions(conditions: str) -> list[str]:
+  """Splits conditions on AND, except within quoted literals."""
+  parts = []
+  start = 0
+  for match in _AND_OR_LITERAL.finditer(conditions):
+    if match.group("literal") is None:
+      parts.append(conditions[start : match.start()])
+      start = match.end()
+  parts.append(conditions[start:])
+  return parts
+
+
+def _parse_literal(text: str) -> Any:
+  text = text.strip()
+  if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+    return text[1:-1]
+  if text.upper() in ("TRUE", "FALSE"):
+    return text.upper() == "TRUE"
+  # Integers stay exact, as ids do not all fit in a float.
+  for parse in (int, float):
+    try:
+      return parse(text)
+    except ValueError:
+      pass
+  # Enum values, e.g. status = ENABLED.
+  return text
+
+
+def _ratios(
+    numerators: Sequence[int | float],
+    denominators: Sequence[int | float],
+    divisor: int,
+) -> array.array:
+  return array.array(
+      "d",
+      [
+          numerator / denominator / divisor if denominator else math.nan
+          for numerator, denominator in zip(numerators, denominators)
+      ],
+  )
+
+
+class ColumnTable:
+  """A table of GAQL results held in typed column buffers."""
+
+  def __init__(self):
+    self.columns: list[str] = []
+    self._data: list[_Column] = []
+
+  def __len__(self) -> int:
+    return len(self._data[0]) if self._data else 0
+
+  def append(self, columns: list[str], rows: Sequence[Sequence[Any]]):
+    """Appends a chunk of rows.
+
+    Args:
+        columns: The fields of the values of the rows.
+        rows: The formatted values of each row.
+
+    Raises:
+        ValueError: If the columns differ from the ones of earlier rows.
+    """
+    if not self.columns:
+      self.columns = list(columns)
+    elif list(columns) != self.columns:
+      raise ValueError("The rows have other columns than the table.")
+    if not rows:
+      if not self._data:
+        self._data = [ObjectColumn() for _ in self.columns]
+      return
+    if len(self) == 0:
+      self._data = [_new_column(values) for values in zip(*rows)]
+    self._data = [
+        column.extend(values) for column, values in zip(self._data, zip(*rows))
+    ]
+
+  def reset(self):
+    """Drops all rows, to append the rows of a stream again."""
+    self.columns = []
+    self._data = []
+
+  def column(self, name: str) -> _Column:
+    """Gets a column by name.
+
+    Raises:
+        ValueError: If the table has no such column.
+    """
+    try:
+      return self._data[self.columns.index(name)]
+    except ValueError:
+      raise ValueError(
+          f"The query does not select {name}. Add it to the SELECT clause."
+      ) from None
+
+  def kinds(self) -> dict[str, str]:
+    """Gets the kind of each column, e.g. "int64" or "dictionary"."""
+    return {name: c.kind for name, c in zip(self.columns, self._data)}
+
+  def _set_column(self, name: str, column: _Column):
+    if name in self.columns:
+      self._data[self.columns.index(name)] = column
+    else:
+      self.columns.append(name)
+      self._data.append(column)
+
+  def _numbers(self, name: str) -> Sequence[int | float]:
+    try:
+      return self.column(name).numbers()
+    except TypeError:
+      raise ValueError(f"The values of {name} are not numbers.") from None
+
+  def add_derived_metric(self, name: str):
+    """Computes a metric of `DERIVED_METRICS` into a new column.
+
+    Ratios with a zero denominator are missing.
+
+    Raises:
+        ValueError: If the metric is unknown or a field it needs is not
+            selected.
+    """
+    check_derived_metrics([name], self.columns)
+    numerator, denominator, divisor = DERIVED_METRICS[name]
+    if len(self) == 0:
+      self._set_column(name, Float64Column())
+      return
+    numerators = self._numbers(numerator)
+    if denominator is None:
+      data = array.array("d", [value / divisor for value in numerators])
+    else:
+      data = _ratios(numerators, self._numbers(denominator), divisor)
+    column = Float64Column()
+    column.data = data
+    self._set_column(name, column)
+
+  def convert_micros(self):
+    """Converts the numeric `*_micros` columns to currency units."""
+    for name, column in zip(self.columns, self._data):
+      if name.endswith("_micros") and column.kind in ("int64", "float64"):
+        converted = Float64Column()
+        converted.data = array.array(
+            "d", [value / 1_000_000 for value in column.numbers()]
+        )
+        self._set_column(name, converted)
+
+  def filter(self, conditions: str):
+    """Keeps the rows meeting all the conditions.
+
+    Args:
+        conditions: Comparisons of a column to a value joined by AND, e.g.
+            "ctr > 0.02 AND campaign.status = 'ENABLED'". The operators are
+            =, !=, >, >=, < and <=. Rows with a missing value never match.
+
+    Raises:
+        ValueError: If a condition is invalid or its column is unknown.
+    """
+    tests = []
+    for condition in _split_conditions(conditions.strip()):
+      match = _CONDITION.match(condition.strip())
+      if match is None:
+        raise ValueError(
+            f"Invalid condition {condition!r}, expected e.g. ctr > 0.02."
+        )
+      name, symbol, literal = match.groups()
+      value = _parse_literal(literal)
+      compare = _OPERATORS[symbol]
+      tests.append(
+          (self.column(name), lambda item, c=compare, v=value: c(item, v))
+      )
+    indexes: Iterable[int] = range(len(self))
+    for column, predicate in tests:
+      indexes = column.matching(predicate, indexes)
+    self.take(list(indexes))
+
+  def take(self, indexes: Sequence[int]):
+    """Keeps the rows at the given indexes, in their order."""
+    self._data = [column.take(indexes) for column in self._data]
+
+  def rows(self) -> list[list[Any]]:
+    """Gets the values of each row, with None for missing values."""
+    return [list(row) for row in zip(*(c.values() for c in self._data))]
+
+  def to_arrow(self) -> Any:
+    """Converts the table to a `pyarrow.Table`.
+
+    Numeric columns are shared with the table without a copy, so the table
+    must not be appended to while the Arrow table is in use.
+
+    Raises:
+        ValueError: If `pyarrow` is not installed.
+    """
+    pa = import_pyarrow()
+    return pa.table(
+        [column.to_arrow(pa) for column in self._data], names=self.columns
+    )
+
+  def write_arrow(self, path: str, file_format: str = "parquet"):
+    """Writes the table to an Arrow IPC or Parquet file.
+
+    Args:
+        path: The path of the file written.
+        file_format: "arrow" for the Arrow IPC file format or "parquet".
+
+    Raises:
+        ValueError: If the format is unknown or `pyarrow` is not installed.
+    """
+    if file_format not in ("arrow", "parquet"):
+      raise ValueError(f"Unsupported file format: {file_format}")
+    table = self.to_arrow()
+    pa = import_pyarrow()
+    if file_format == "parquet":
+      pa.parquet.write_table(table, path)
+    else:
+      with pa.ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table)
+
+
+def import_pyarrow() -> Any:
+  """Imports `pyarrow` and its IPC and Parquet modules.
+
+  Raises:
+      ValueError: If `pyarrow` is not installed.
+  """
+  # pylint: disable=import-outside-toplevel
+  try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+  except ImportError as e:
+    raise ValueError(
+        "Arrow and Parquet files need the pyarrow package. Install the"
+        " server with its `arrow` extra, or run `pip install pyarrow`."
+    ) from e
+  # pylint: enable=import-outside-toplevel
+  return pyarrow
@@ -14,43 +14,257 @@
 
 """This module contains tools for interacting with the Google Ads API."""
 
+import asyncio
+import collections
+from collections.abc import Callable, Iterator, Mapping, Sequence
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import hashlib
+import itertools
+import logging
+import operator
 import os
-from typing import Any
+import re
+import threading
+import time
+from typing import Any, Literal, TYPE_CHECKING, TypeVar
 
+from ads_mcp import aggregation
+from ads_mcp import cursors
+from ads_mcp import exports
+from ads_mcp import formatters
+from ads_mcp import metrics
+from ads_mcp import report_cache
+from ads_mcp import result_cache
+from ads_mcp import retries
+from ads_mcp import scheduler
+from ads_mcp import tables
 from ads_mcp.coordinator import mcp_server as mcp
+from ads_mcp.docs_index import DOCS_INDEX
+from ads_mcp.utils import load_yaml_file
 from ads_mcp.utils import ROOT_DIR
 
+from fastmcp import Context
 from fastmcp.server.dependencies import get_access_token
-from google.ads.googleads.client import GoogleAdsClient
-from google.ads.googleads.errors import GoogleAdsException
-from google.ads.googleads.util import get_nested_attr
-from google.ads.googleads.v21.services.services.customer_service import CustomerServiceClient
-from google.ads.googleads.v21.services.services.google_ads_service import GoogleAdsServiceClient
-from google.oauth2.credentials import Credentials
-import proto
-import yaml
 
-_ADS_CLIENT: GoogleAdsClient | None = None
+# The Google Ads API client libraries take about a second to import, they are
+# imported on first use so that the server can answer `initialize` first.
+if TYPE_CHECKING:
+  from google.ads.googleads.client import GoogleAdsClient
+  from google.ads.googleads.v21.services.services.customer_service import CustomerServiceClient
+  from google.ads.googleads.v21.services.services.google_ads_service import GoogleAdsServiceClient
 
+# Maximum number of Google Ads API calls running at once in this process.
+# Blocking gRPC calls are offloaded to a bounded thread pool so that one slow
+# report does not hold up the event loop serving other MCP sessions.
+MAX_CONCURRENT_QUERIES = int(
+    os.environ.get("ADS_MCP_MAX_CONCURRENT_QUERIES", "8")
+)
+_QUERY_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_QUERIES, thread_name_prefix="ads-mcp-query"
+)
 
-def get_ads_client() -> GoogleAdsClient:
-  """Gets a GoogleAdsClient instance.
+_T = TypeVar("_T")
 
-  Looks for an access token from the environment or loads credentials from
-  a YAML file.
+
+def _api_errors() -> tuple[type[Exception], ...]:
+  """Gets the Google Ads API error types, importing them on first use.
+
+  The client library raises INTERNAL and RESOURCE_EXHAUSTED failures, and
+  failures without details, as `google.api_core` or plain gRPC errors rather
+  than as `GoogleAdsException`.
+  """
+  # pylint: disable=import-outside-toplevel
+  from google.ads.googleads.errors import GoogleAdsException
+  from google.api_core.exceptions import GoogleAPICallError
+  import grpc
+
+  # pylint: enable=import-outside-toplevel
+  return GoogleAdsException, GoogleAPICallError, grpc.RpcError
+
+
+def _error_message(error: Exception) -> str:
+  """Gets the message of a Google Ads API error."""
+  failure = retries.get_failure(error)
+  if failure is not None and failure.errors:
+    return "\n".join(str(i) for i in failure.errors)
+  details = getattr(error, "details", None)
+  return (details() if callable(details) else None) or str(error)
+
+
+def _error_codes(error: Exception) -> list[str]:
+  """Gets the codes of a Google Ads API error, for metrics."""
+  failure = retries.get_failure(error)
+  codes = retries.get_error_codes(failure) if failure is not None else []
+  if codes:
+    return [f"{field}.{code}" for field, code in codes]
+  status = retries.get_status_code(error) or "UNKNOWN"
+  return [f"status.{status}"]
+
+
+ResultFormat = Literal["rows", "columnar"]
+
+
+class _Cancellation:
+  """Stops the API requests of a function running in the query pool.
+
+  The function registers callbacks, such as cancelling its running
+  `search_stream` calls, which are run by the thread cancelling it.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._callbacks: list[Callable[[], None]] = []
+    self.cancelled = False
+
+  def add_callback(self, callback: Callable[[], None]):
+    """Registers a callback, run at once if already cancelled."""
+    with self._lock:
+      if not self.cancelled:
+        self._callbacks.append(callback)
+        return
+    callback()
+
+  def cancel(self):
+    """Runs the callbacks."""
+    with self._lock:
+      self.cancelled = True
+      callbacks, self._callbacks = self._callbacks, []
+    for callback in callbacks:
+      callback()
+
+
+_CANCELLATION: contextvars.ContextVar[_Cancellation | None] = (
+    contextvars.ContextVar("ads_mcp_cancellation", default=None)
+)
+
+
+async def run_blocking(func: Callable[..., _T], *args: Any) -> _T:
+  """Runs a blocking function in the query thread pool.
+
+  The current context is copied into the worker thread, so request-scoped
+  values such as the access token stay visible to the function.
+
+  A thread cannot be stopped, so when the call is cancelled, for example on
+  a timeout, the function is removed from the queue of the pool if it has not
+  started, and otherwise its API requests are cancelled and the call waits
+  for it to stop.
+
+  Args:
+      func: The blocking function to run.
+      *args: Positional arguments for the function.
 
   Returns:
-      A GoogleAdsClient instance.
+      The return value of the function.
+  """
+  cancellation = _Cancellation()
+  context = contextvars.copy_context()
+  context.run(_CANCELLATION.set, cancellation)
+  future = _QUERY_EXECUTOR.submit(context.run, func, *args)
+  result = asyncio.wrap_future(future)
+  try:
+    return await asyncio.shield(result)
+  except asyncio.CancelledError:
+    if not future.cancel():
+      cancellation.cancel()
+      # The function fails once cancelled, with an error nobody waits for.
+      with contextlib.suppress(Exception):
+        await result
+    raise
 
-  Raises:
-      FileNotFoundError: If the credentials YAML file is not found.
+
+class _PooledClient:
+  """A GoogleAdsClient together with the service clients created from it.
+
+  Service clients own their gRPC channel, so caching them here lets later
+  requests reuse the open channel instead of paying for TLS and channel setup
+  again.
   """
-  global _ADS_CLIENT
 
-  access_token = get_access_token()
-  if access_token:
-    access_token = access_token.token
+  def __init__(self, ads_client: "GoogleAdsClient"):
+    self.ads_client = ads_client
+    self._services: dict[str, Any] = {}
+    self._lock = threading.Lock()
+
+  def get_service(self, name: str) -> Any:
+    """Gets a cached service client, creating it on first use."""
+    with self._lock:
+      service = self._services.get(name)
+      if service is None:
+        service = self.ads_client.get_service(name)
+        self._services[name] = service
+      return service
+
+
+class AdsClientPool:
+  """A bounded, least-recently-used pool of GoogleAdsClient instances.
+
+  Clients are keyed by credentials and `login_customer_id`, and are never
+  modified after they are added, so concurrent requests can share them
+  safely. Evicted clients are dropped and their channels are closed when they
+  are garbage collected, which leaves requests still using them unaffected.
+  """
 
+  def __init__(self, max_size: int):
+    self._max_size = max_size
+    self._entries: collections.OrderedDict[tuple[Any, ...], _PooledClient] = (
+        collections.OrderedDict()
+    )
+    self._lock = threading.Lock()
+
+  def get(
+      self,
+      key: tuple[Any, ...],
+      factory: Callable[[], "GoogleAdsClient"],
+  ) -> _PooledClient:
+    """Gets the pooled client for a key, creating it with `factory` if needed.
+
+    Args:
+        key: The pool key identifying the credentials of the client.
+        factory: A function returning a new GoogleAdsClient for the key.
+
+    Returns:
+        The pooled client.
+    """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None:
+        self._entries.move_to_end(key)
+        return entry
+
+    # Build the client outside of the lock, it may read files from disk.
+    entry = _PooledClient(factory())
+    with self._lock:
+      existing = self._entries.get(key)
+      if existing is not None:
+        self._entries.move_to_end(key)
+        return existing
+      self._entries[key] = entry
+      while len(self._entries) > self._max_size:
+        self._entries.popitem(last=False)
+    return entry
+
+  def clear(self):
+    """Removes all clients from the pool."""
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+
+CLIENT_POOL_SIZE = int(os.environ.get("ADS_MCP_CLIENT_POOL_SIZE", "32"))
+_CLIENT_POOL = AdsClientPool(CLIENT_POOL_SIZE)
+
+
+def _get_credentials_path() -> str:
+  """Gets the path of the credentials YAML file.
+
+  Raises:
+      FileNotFoundError: If the credentials YAML file is not found.
+  """
   default_path = f"{ROOT_DIR}/google-ads.yaml"
   credentials_path = os.environ.get("GOOGLE_ADS_CREDENTIALS", default_path)
   if not os.path.isfile(credentials_path):
@@ -58,31 +272,438 @@ def get_ads_client() -> GoogleAdsClient:
         "Google Ads credentials YAML file is not found. "
         "Check [GOOGLE_ADS_CREDENTIALS] config."
     )
+  return credentials_path
+
+
+def _hash_access_token(access_token: str) -> str:
+  return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
 
+def get_credentials_id() -> str | None:
+  """Gets an ID of the request credentials that is safe to keep in memory.
+
+  Returns:
+      A hash of the OAuth access token of the request, or None when the
+      server credentials from the YAML file are used.
+  """
+  access_token = get_access_token()
   if access_token:
-    credentials = Credentials(access_token)
-    with open(credentials_path, "r", encoding="utf-8") as f:
-      ads_config = yaml.safe_load(f.read())
-    return GoogleAdsClient(
-        credentials, developer_token=ads_config.get("developer_token")
+    return _hash_access_token(access_token.token)
+  return None
+
+
+def _get_developer_key() -> str | None:
+  """Gets a hash of the developer token the requests are sent with."""
+  developer_token = (load_yaml_file(_get_credentials_path()) or {}).get(
+      "developer_token"
+  )
+  if not developer_token:
+    return None
+  return hashlib.sha256(developer_token.encode("utf-8")).hexdigest()
+
+
+# Requests per second sent to the Google Ads API per developer token and per
+# customer, unlimited by default. Requests over these rates wait for their
+# turn, interactive requests first, instead of failing with
+# RESOURCE_EXHAUSTED.
+DEVELOPER_TOKEN_QPS = float(os.environ.get("ADS_MCP_DEVELOPER_TOKEN_QPS", "0"))
+CUSTOMER_QPS = float(os.environ.get("ADS_MCP_CUSTOMER_QPS", "0"))
+QUOTA_BURST_SECONDS = float(os.environ.get("ADS_MCP_QUOTA_BURST_SECONDS", "2"))
+QUOTA_WAIT_TIMEOUT_SECONDS = float(
+    os.environ.get("ADS_MCP_QUOTA_WAIT_TIMEOUT_SECONDS", "60")
+)
+_SCHEDULER = scheduler.QuotaScheduler(
+    DEVELOPER_TOKEN_QPS, CUSTOMER_QPS, QUOTA_BURST_SECONDS
+)
+_PRIORITY: contextvars.ContextVar[scheduler.Priority] = contextvars.ContextVar(
+    "ads_mcp_priority", default=scheduler.Priority.INTERACTIVE
+)
+
+
+class _Suspended(Exception):
+  """Gives the thread of a blocking function back while it has to wait.
+
+  The function, run by `run_admitted`, waits on the event loop instead of in
+  the query pool, and runs again once done waiting.
+  """
+
+
+class _AdmissionNeeded(_Suspended):
+  """Gives the thread of a blocking function back until a request is admitted.
+
+  A request sent from the query pool without quota left suspends its
+  function, which runs again once the request is admitted on the event loop.
+  """
+
+  def __init__(self, customer_id: str | None):
+    super().__init__(customer_id)
+    self.customer_id = customer_id
+
+
+class _BackoffNeeded(_Suspended):
+  """Gives the thread of a blocking function back before a retry.
+
+  A request failing with a transient error suspends its function, which
+  runs again once the delay before the retry is over.
+  """
+
+  def __init__(self, delay: float):
+    super().__init__(delay)
+    self.delay = delay
+
+
+class _CallState:
+  """The state of a blocking function kept while it is suspended.
+
+  When the function runs again, its requests use the admissions obtained
+  on the event loop, and it picks up the streams it was reading and the
+  results of the queries it had read.
+  """
+
+  def __init__(self, admitted: list[str | None]):
+    self.admitted = admitted
+    self.streams: dict[tuple[Any, ...], "QueryStream"] = {}
+    self.results: dict[tuple[Any, ...], tuple[list[str], list[list[Any]]]] = {}
+
+  def close(self):
+    for stream in self.streams.values():
+      stream.close()
+
+
+_CALL_STATE: contextvars.ContextVar[_CallState | None] = (
+    contextvars.ContextVar("ads_mcp_call_state", default=None)
+)
+
+
+def _admit(customer_id: str | None = None):
+  """Takes the quota of a request before it is sent.
+
+  Functions run by `run_admitted` never wait for quota in their thread: the
+  request takes an admission obtained on the event loop, or quota available
+  right away, and otherwise raises `_AdmissionNeeded`. Other callers wait in
+  their thread.
+  """
+  state = _CALL_STATE.get()
+  if state is None:
+    _SCHEDULER.admit(
+        _get_developer_key(),
+        customer_id,
+        _PRIORITY.get(),
+        timeout=QUOTA_WAIT_TIMEOUT_SECONDS,
     )
+    return
+  if customer_id in state.admitted:
+    state.admitted.remove(customer_id)
+    return
+  if not _SCHEDULER.try_admit(
+      _get_developer_key(), customer_id, _PRIORITY.get()
+  ):
+    raise _AdmissionNeeded(customer_id)
+
+
+async def _admit_async(customer_id: str | None):
+  await _SCHEDULER.admit_async(
+      _get_developer_key(),
+      customer_id,
+      _PRIORITY.get(),
+      timeout=QUOTA_WAIT_TIMEOUT_SECONDS,
+  )
+
+
+async def run_admitted(
+    customer_id: str | None,
+    func: Callable[..., _T],
+    *args: Any,
+    admit_first: bool = True,
+) -> _T:
+  """Runs a blocking function sending API requests, admitted on the event loop.
+
+  The first request of the function waits for quota on the event loop,
+  before the function takes a thread of the query pool, so that queued
+  requests do not hold the threads other requests are admitted to. When a
+  later request, such as a retry, has no quota left, the function gives its
+  thread back, and runs again once the request is admitted. The delays
+  before retries are waited on the event loop as well. Waiting is cancelled
+  with the call. The function picks up the streams it
+  was reading, so the consumers of their rows, such as an aggregation, are
+  created by the caller and passed as arguments.
+
+  Args:
+      customer_id: The ID of the customer of the first request, if any.
+      func: The blocking function to run.
+      *args: Positional arguments for the function.
+      admit_first: Whether the first request is admitted before the function
+          runs. Functions that may not send any request are run right away.
+
+  Returns:
+      The return value of the function.
+  """
+  admitted = []
+  if admit_first:
+    await _admit_async(customer_id)
+    admitted.append(customer_id)
+  state = _CallState(admitted)
+  token = _CALL_STATE.set(state)
+  try:
+    while True:
+      try:
+        return await run_blocking(func, *args)
+      except _Suspended as e:
+        try:
+          if isinstance(e, _BackoffNeeded):
+            await asyncio.sleep(e.delay)
+            continue
+          await _admit_async(e.customer_id)
+        except BaseException:
+          state.close()
+          raise
+        state.admitted.append(e.customer_id)
+  finally:
+    _CALL_STATE.reset(token)
+
+
+@mcp.resource("resource://stats/scheduler", mime_type="application/json")
+def get_scheduler_stats() -> dict[str, Any]:
+  """Get the admission counters of the Google Ads API request scheduler."""
+  return _SCHEDULER.stats()
+
+
+def _export_stats(
+    prefix: str,
+    get_stats: Callable[[], dict[str, Any]],
+    counters: Mapping[str, str],
+    gauges: Mapping[str, str] | None = None,
+):
+  """Serves the values of a stats resource as metrics.
+
+  Args:
+      prefix: The prefix of the metric names.
+      get_stats: The function of the stats resource.
+      counters: The description of each stat that only goes up, by key.
+      gauges: (Optional) The description of each other stat, by key.
+  """
+  for kind, documented in (("counter", counters), ("gauge", gauges or {})):
+    for key, documentation in documented.items():
+      metrics.REGISTRY.collected(
+          f"{prefix}_{key}",
+          documentation,
+          lambda key=key: [({}, get_stats()[key])],
+          kind,
+      )
+
+
+_export_stats(
+    "ads_mcp_quota",
+    get_scheduler_stats,
+    {
+        "admitted": "Google Ads API requests admitted by the scheduler.",
+        "throttled": "Requests that waited for Google Ads API quota.",
+        "timeouts": "Requests that timed out waiting for quota.",
+        "wait_seconds": "Time requests waited for Google Ads API quota.",
+    },
+    {"queued": "Requests waiting for Google Ads API quota."},
+)
+
+
+# Attempts of a query failing with transient errors, such as INTERNAL_ERROR,
+# before the error is returned.
+MAX_QUERY_ATTEMPTS = int(os.environ.get("ADS_MCP_MAX_QUERY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_SECONDS = float(
+    os.environ.get("ADS_MCP_RETRY_BASE_DELAY_SECONDS", "0.5")
+)
+_RETRY_POLICY = retries.RetryPolicy(
+    MAX_QUERY_ATTEMPTS, RETRY_BASE_DELAY_SECONDS
+)
+_ORDER_BY = re.compile(
+    r"\bORDER\s+BY\s+(.*?)(?:\s+LIMIT\b|\s+PARAMETERS\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def has_stable_order(query: str) -> bool:
+  """Checks whether a GAQL query returns its rows in the same order every time.
+
+  Rows are only in a stable order when the ORDER BY clause ends with a key
+  unique to each row: the `id` or `resource_name` of the resource in the
+  FROM clause, with no segments selected to split its rows. Other keys, such
+  as `metrics.clicks`, have ties that may come in any order.
+
+  Args:
+      query: The GAQL query.
+
+  Returns:
+      Whether the rows of the query come in a stable order.
+  """
+  match = _ORDER_BY.search(query)
+  view = formatters.get_query_view(query)
+  if match is None or view is None:
+    return False
+  if any(
+      field.startswith("segments.")
+      for field in formatters.get_selected_fields(query)
+  ):
+    return False
+  last_key = match.group(1).split(",")[-1].split()
+  return bool(last_key) and last_key[0].lower() in (
+      f"{view}.id",
+      f"{view}.resource_name",
+  )
+
+
+@mcp.resource("resource://stats/retries", mime_type="application/json")
+def get_retry_stats() -> dict[str, int]:
+  """Get the counters of Google Ads API queries retried after a failure."""
+  return _RETRY_POLICY.stats()
+
+
+_export_stats(
+    "ads_mcp_gaql",
+    get_retry_stats,
+    {
+        "retries": "GAQL queries retried after a transient failure.",
+        "resumed": "GAQL streams resumed after the rows already read.",
+        "exhausted": "GAQL queries failing after their last attempt.",
+    },
+)
+
+
+def _get_pooled_client(login_customer_id: str | None = None) -> _PooledClient:
+  """Gets the pooled client for the current request.
+
+  Args:
+      login_customer_id: (Optional) The ID of the customer being logged in.
+
+  Returns:
+      The pooled client matching the request credentials.
+
+  Raises:
+      FileNotFoundError: If the credentials YAML file is not found.
+  """
+  access_token = get_access_token()
+  if access_token:
+    access_token = access_token.token
+
+  credentials_path = _get_credentials_path()
+  ads_config = load_yaml_file(credentials_path) or {}
+  developer_token = ads_config.get("developer_token")
+
+  if access_token:
+    token_hash = _hash_access_token(access_token)
+
+    def factory() -> "GoogleAdsClient":
+      # pylint: disable=import-outside-toplevel
+      from google.ads.googleads.client import GoogleAdsClient
+      from google.oauth2.credentials import Credentials
+
+      return GoogleAdsClient(
+          Credentials(access_token),
+          developer_token=developer_token,
+          endpoint=ads_config.get("endpoint"),
+          login_customer_id=login_customer_id,
+          use_proto_plus=True,
+      )
+
+  else:
+    token_hash = None
+
+    def factory() -> "GoogleAdsClient":
+      # pylint: disable-next=import-outside-toplevel
+      from google.ads.googleads.client import GoogleAdsClient
+
+      ads_client = GoogleAdsClient.load_from_storage(credentials_path)
+      if login_customer_id:
+        ads_client.login_customer_id = login_customer_id
+      return ads_client
+
+  key = (token_hash, developer_token, login_customer_id)
+  return _CLIENT_POOL.get(key, factory)
+
+
+def get_ads_client(
+    login_customer_id: str | None = None,
+) -> "GoogleAdsClient":
+  """Gets a GoogleAdsClient instance.
+
+  Looks for an access token from the environment or loads credentials from
+  a YAML file. Clients are pooled per credentials and `login_customer_id`;
+  the returned client is shared and must not be modified.
+
+  Args:
+      login_customer_id: (Optional) The ID of the customer being logged in.
+
+  Returns:
+      A GoogleAdsClient instance.
+
+  Raises:
+      FileNotFoundError: If the credentials YAML file is not found.
+  """
+  return _get_pooled_client(login_customer_id).ads_client
+
+
+def check_credentials():
+  """Checks that the credentials YAML file exists and can be parsed.
+
+  Unlike `get_ads_client`, this does not import the Google Ads API client
+  libraries, so it can run before the server starts.
+
+  Raises:
+      FileNotFoundError: If the credentials YAML file is not found.
+  """
+  load_yaml_file(_get_credentials_path())
+
+
+def _warm_up():
+  try:
+    get_ads_client()
+  except Exception:  # pylint: disable=broad-exception-caught
+    logging.exception("Failed to load the Google Ads API client.")
+
 
-  if not _ADS_CLIENT:
-    _ADS_CLIENT = GoogleAdsClient.load_from_storage(credentials_path)
+def start_warm_up() -> threading.Thread:
+  """Loads the Google Ads API client in a background thread.
 
-  return _ADS_CLIENT
+  The first tool call then does not wait for the client libraries to be
+  imported, while the server answers `initialize` right away.
+
+  Returns:
+      The warm up thread.
+  """
+  thread = threading.Thread(target=_warm_up, name="ads-warm-up", daemon=True)
+  thread.start()
+  return thread
+
+
+def get_ads_service(name: str, login_customer_id: str | None = None) -> Any:
+  """Gets a Google Ads API service client that reuses a pooled channel.
+
+  Args:
+      name: The name of the service, e.g. "GoogleAdsService".
+      login_customer_id: (Optional) The ID of the customer being logged in.
+
+  Returns:
+      The service client.
+
+  Raises:
+      FileNotFoundError: If the credentials YAML file is not found.
+  """
+  return _get_pooled_client(login_customer_id).get_service(name)
 
 
 @mcp.tool()
-def list_accessible_accounts() -> list[str]:
+async def list_accessible_accounts() -> list[str]:
   """Lists Google Ads customers id directly accessible by the user.
 
   The accounts can be used as `login_customer_id`.
   """
-  ads_client = get_ads_client()
-  customer_service: CustomerServiceClient = ads_client.get_service(
+  return await run_admitted(None, _list_accessible_accounts)
+
+
+def _list_accessible_accounts() -> list[str]:
+  """Blocking implementation of `list_accessible_accounts`."""
+  customer_service: "CustomerServiceClient" = get_ads_service(
       "CustomerService"
   )
+  _admit()
   accounts = customer_service.list_accessible_customers().resource_names
   return [account.split("/")[-1] for account in accounts]
 
@@ -98,6 +719,8 @@ def preprocess_gaql(query: str) -> str:
 
 def format_value(value: Any) -> Any:
   """Formats a value from a Google Ads API response."""
+  import proto  # pylint: disable=import-outside-toplevel
+
   if isinstance(value, proto.Message):
     return_value = proto.Message.to_dict(value)
   elif isinstance(value, proto.Enum):
@@ -108,12 +731,472 @@ def format_value(value: Any) -> Any:
   return return_value
 
 
+def compile_row_formatter(
+    paths: Sequence[str],
+    field_metadata: Mapping[str, dict[str, Any]] | None = None,
+    convert_micros: bool = False,
+) -> Callable[[Any], list[Any]]:
+  """Compiles a function formatting a GoogleAdsRow into a list of values.
+
+  The field mask is turned into a single `operator.attrgetter` once per
+  stream batch, instead of splitting and walking each dotted path for every
+  cell. The converter of each column is selected ahead of time from the view
+  metadata, or from the first row for fields without metadata, so formatting
+  a cell needs no type checks.
+
+  Args:
+      paths: The field mask paths of the query, in selection order.
+      field_metadata: (Optional) The view metadata of the fields, by name.
+      convert_micros: Whether `*_micros` amounts are converted to currency.
+
+  Returns:
+      A function returning the formatted values of a row, in path order.
+  """
+  if not paths:
+    return lambda row: []
+  getter = operator.attrgetter(*paths)
+  single_path = len(paths) == 1
+
+  field_metadata = field_metadata or {}
+  conversions: list[tuple[int, Callable[[Any], Any]]] = []
+  unresolved: list[int] = []
+  for index, path in enumerate(paths):
+    if path in field_metadata:
+      converter = formatters.select_converter(
+          path, field_metadata[path], convert_micros
+      )
+      if converter is not None:
+        conversions.append((index, converter))
+    else:
+      unresolved.append(index)
+
+  def format_row(row: Any) -> list[Any]:
+    values = [getter(row)] if single_path else list(getter(row))
+    if unresolved:
+      for index in unresolved:
+        converter = formatters.select_converter_from_value(
+            paths[index], values[index], convert_micros
+        )
+        if converter is not None:
+          conversions.append((index, converter))
+      unresolved.clear()
+    for index, converter in conversions:
+      values[index] = converter(values[index])
+    return values
+
+  return format_row
+
+
+def build_response(
+    columns: list[str],
+    rows: list[list[Any]],
+    format: ResultFormat = "rows",  # pylint: disable=redefined-builtin
+) -> list[dict[str, Any]] | dict[str, Any]:
+  """Builds the `execute_gaql` response from a table of formatted values.
+
+  Args:
+      columns: The field mask paths of the query, in selection order.
+      rows: The formatted values of each row, in the order of `columns`.
+      format: "rows" for an array of objects, one per row, or "columnar" for
+          an object holding the `columns` once and the `rows` as arrays.
+
+  Returns:
+      The response in the requested format.
+
+  Raises:
+      ValueError: If the format is not supported.
+  """
+  if format == "rows":
+    return [dict(zip(columns, row)) for row in rows]
+  if format == "columnar":
+    return {"columns": columns, "rows": rows}
+  raise ValueError(f"Unsupported result format: {format}")
+
+
+_GAQL_FIRST_BATCH_SECONDS = metrics.REGISTRY.histogram(
+    "ads_mcp_gaql_first_batch_seconds",
+    "Time from opening a GAQL search_stream to receiving its first batch.",
+)
+_GAQL_STREAM_SECONDS = metrics.REGISTRY.histogram(
+    "ads_mcp_gaql_stream_seconds",
+    "Time from opening a GAQL search_stream to reading or closing it.",
+)
+_GAQL_FORMAT_SECONDS = metrics.REGISTRY.histogram(
+    "ads_mcp_gaql_format_seconds",
+    "Time spent formatting the rows of a GAQL search_stream.",
+)
+_GAQL_ROWS = metrics.REGISTRY.counter(
+    "ads_mcp_gaql_rows", "Rows received from GAQL search_stream calls."
+)
+_GAQL_ERRORS = metrics.REGISTRY.counter(
+    "ads_mcp_gaql_errors",
+    "Errors returned by GAQL search_stream calls, retried or not.",
+    ("error_code",),
+)
+
+
+class QueryStream:
+  """The formatted rows of a `search_stream` call, read on demand.
+
+  Only the stream batch being read is held in memory, so reading a large
+  report page by page keeps memory bounded by the page and batch size rather
+  than by the size of the report.
+
+  When the stream can be opened again, transient failures are retried. A
+  stream failing after some rows were read resumes after these rows if its
+  rows come in a stable order, see `has_stable_order`, and a full read
+  starts over otherwise. A read suspended for quota or before a retry, see
+  `run_admitted`, keeps the rows it had read and goes on when called again.
+  """
+
+  def __init__(
+      self,
+      batches: Any,
+      field_metadata: Mapping[str, dict[str, Any]] | None = None,
+      convert_micros: bool = False,
+      open_batches: Callable[[], Any] | None = None,
+      resumable: bool = False,
+      customer_id: str | None = None,
+      cancellation: _Cancellation | None = None,
+  ):
+    """Initializes the stream.
+
+    Args:
+        batches: The batches of the stream, or None to open them with
+            `open_batches` on first read.
+        field_metadata: (Optional) The view metadata of the columns.
+        convert_micros: Whether `*_micros` amounts are converted to currency.
+        open_batches: (Optional) A function opening the stream again, to
+            retry transient failures.
+        resumable: Whether the rows come in the same order every time the
+            stream is opened, so that a retry can skip the rows read.
+        customer_id: (Optional) The ID of the customer being queried, for
+            traces.
+        cancellation: (Optional) The cancellation of the call reading the
+            stream, which cancels the stream.
+    """
+    self.columns: list[str] = []
+    self._batches = batches
+    self._field_metadata = field_metadata
+    self._convert_micros = convert_micros
+    self._open_batches = open_batches
+    self._resumable = resumable
+    self._attempts = 1
+    self._retry_delay = 0.0
+    self._failed = False
+    self._delivered = 0
+    self._customer_id = customer_id or ""
+    self._started_at = time.perf_counter()
+    self._first_batch_seen = False
+    self._format_seconds = 0.0
+    self._rows_received = 0
+    self._span = metrics.TRACER.start_span(
+        "ads_mcp.gaql.search_stream",
+        attributes={"ads_mcp.customer_id": self._customer_id},
+    )
+    self._finished = False
+    # The rows read from the current attempt, and those of them to skip.
+    self._read = 0
+    self._skip = 0
+    self._rows = self._iter_rows()
+    # The rows read ahead of the caller.
+    self._pending: list[list[Any]] = []
+    self._cancelled = threading.Event()
+    self.watch(cancellation)
+
+  def watch(self, cancellation: _Cancellation | None):
+    """Cancels the stream with the call reading it."""
+    if cancellation is not None:
+      cancellation.add_callback(self.cancel)
+
+  def _retry(self, error: Exception, resumed: bool = False) -> bool:
+    """Opens the stream again after a delay, if the error is transient."""
+    if (
+        self._failed
+        or self._cancelled.is_set()
+        or self._open_batches is None
+        or not _RETRY_POLICY.should_retry(error, self._attempts)
+    ):
+      self._failed = True
+      return False
+    self._retry_delay = _RETRY_POLICY.next_delay(self._attempts, resumed)
+    self._attempts += 1
+    self._batches = None
+    return True
+
+  def _wait_to_retry(self):
+    """Waits the delay before a retry, on the event loop if suspendable."""
+    delay, self._retry_delay = self._retry_delay, 0.0
+    if not delay:
+      return
+    if _CALL_STATE.get() is not None:
+      raise _BackoffNeeded(delay)
+    self._cancelled.wait(delay)
+
+  def _restart_rows(self):
+    self._read = 0
+    self._skip = 0
+    self._pending = []
+    self._rows = self._iter_rows()
+
+  def _iter_rows(self) -> Iterator[list[Any]]:
+    while True:
+      try:
+        if self._batches is None:
+          try:
+            self._wait_to_retry()
+            self._check_cancelled()
+            self._batches = self._open_batches()
+          except _Suspended:
+            # Rows are read from a new generator once the call goes on.
+            self._rows = self._iter_rows()
+            raise
+          # Batches opened while the call was cancelled are cancelled here.
+          self._check_cancelled()
+        for batch in self._batches:
+          self._check_cancelled()
+          if not self._first_batch_seen:
+            self._first_batch_seen = True
+            _GAQL_FIRST_BATCH_SECONDS.observe(
+                time.perf_counter() - self._started_at
+            )
+            self._span.add_event("first_batch")
+          paths = list(batch.field_mask.paths)
+          if not self.columns:
+            self.columns = paths
+          format_row = compile_row_formatter(
+              paths, self._field_metadata, self._convert_micros
+          )
+          results = batch.results
+          if self._skip:
+            skipped = min(self._skip, len(results))
+            self._skip -= skipped
+            results = itertools.islice(results, skipped, None)
+          formatted_at = time.perf_counter()
+          rows = list(map(format_row, results))
+          self._format_seconds += time.perf_counter() - formatted_at
+          self._rows_received += len(rows)
+          for row in rows:
+            yield row
+            self._read += 1
+        self._finish()
+        return
+      except _api_errors() as e:
+        for code in _error_codes(e):
+          _GAQL_ERRORS.inc(error_code=code)
+        if self._read and not self._resumable:
+          raise
+        if not self._retry(e, resumed=self._read > 0):
+          raise
+        self._skip = self._read
+
+  def _check_cancelled(self):
+    if self._cancelled.is_set():
+      self._cancel_batches()
+      error = RuntimeError("The query was cancelled.")
+      self._finish(error)
+      raise error
+
+  def _finish(self, error: Exception | None = None):
+    """Records the metrics and the trace span of the stream, once."""
+    if self._finished:
+      return
+    self._finished = True
+    _GAQL_STREAM_SECONDS.observe(time.perf_counter() - self._started_at)
+    _GAQL_FORMAT_SECONDS.observe(self._format_seconds)
+    _GAQL_ROWS.inc(self._rows_received)
+    self._span.set_attribute("ads_mcp.rows", self._rows_received)
+    if error is not None:
+      metrics.set_span_error(self._span, error)
+    self._span.end()
+
+  def _read_all(self) -> list[list[Any]]:
+    # No rows were returned yet, so a stream failing partway can start over.
+    while True:
+      try:
+        self._pending.extend(self._rows)
+        rows, self._pending = self._pending, []
+        return rows
+      except _api_errors() as e:
+        if not self._retry(e):
+          raise
+        self._restart_rows()
+
+  def consume(
+      self,
+      consumer: Callable[[list[str], list[list[Any]]], None],
+      restart: Callable[[], None],
+      chunk_size: int = 10_000,
+  ):
+    """Passes all the rows of the stream to a consumer, chunk by chunk.
+
+    Only a chunk of rows is held at a time. A stream failing partway that
+    cannot resume is read again from the start, once `restart` has undone
+    what the consumer got.
+
+    Args:
+        consumer: A function called with the columns and the formatted values
+            of each chunk of rows.
+        restart: A function undoing the calls to `consumer`.
+        chunk_size: The maximum number of rows per chunk.
+
+    Raises:
+        RuntimeError: If the Google Ads API request fails.
+    """
+    try:
+      while True:
+        try:
+          while True:
+            self._pending.extend(
+                itertools.islice(self._rows, chunk_size - len(self._pending))
+            )
+            if not self._pending:
+              return
+            rows, self._pending = self._pending, []
+            self._delivered += len(rows)
+            consumer(self.columns, rows)
+        except _api_errors() as e:
+          if not self._retry(e):
+            raise
+          restart()
+          self._restart_rows()
+    except _api_errors() as e:
+      self._finish(e)
+      raise RuntimeError(_error_message(e)) from e
+
+  def read(self, size: int | None = None) -> list[list[Any]]:
+    """Reads the next rows of the stream.
+
+    Args:
+        size: (Optional) The maximum number of rows to read. All remaining
+            rows are read if not set.
+
+    Returns:
+        The formatted values of each row read.
+
+    Raises:
+        RuntimeError: If the Google Ads API request fails.
+    """
+    if size is None and not self._delivered:
+      try:
+        rows = self._read_all()
+      except _api_errors() as e:
+        self._finish(e)
+        raise RuntimeError(_error_message(e)) from e
+    else:
+      self.prefetch(size)
+      rows = self._pending[:size]
+      del self._pending[: len(rows)]
+    self._delivered += len(rows)
+    return rows
+
+  def prefetch(self, size: int | None = None):
+    """Reads rows ahead, for the next calls to `read` or `has_more`.
+
+    Args:
+        size: (Optional) The number of rows to read ahead of the caller. All
+            remaining rows are read if not set.
+
+    Raises:
+        RuntimeError: If the Google Ads API request fails.
+    """
+    try:
+      if size is None:
+        self._pending.extend(self._rows)
+      else:
+        self._pending.extend(
+            itertools.islice(self._rows, max(0, size - len(self._pending)))
+        )
+    except _api_errors() as e:
+      self._finish(e)
+      raise RuntimeError(_error_message(e)) from e
+
+  def has_more(self) -> bool:
+    """Checks if there are rows left to read, waiting for the next batch."""
+    self.prefetch(1)
+    return bool(self._pending)
+
+  def close(self):
+    """Stops the stream, cancelling the API request if still running."""
+    self._rows.close()
+    self._finish()
+    self._cancel_batches()
+
+  def cancel(self):
+    """Cancels the API request from any thread, failing the reads."""
+    self._cancelled.set()
+    self._cancel_batches()
+
+  def _cancel_batches(self):
+    cancel = getattr(self._batches, "cancel", None)
+    if cancel is not None:
+      cancel()
+
+
+CURSOR_TTL_SECONDS = float(os.environ.get("ADS_MCP_CURSOR_TTL_SECONDS", "300"))
+MAX_CURSORS = int(os.environ.get("ADS_MCP_MAX_CURSORS", "100"))
+_CURSORS = cursors.CursorStore(CURSOR_TTL_SECONDS, MAX_CURSORS)
+
+
+class _PagedQuery:
+  """The state of a paginated query held behind a cursor."""
+
+  def __init__(
+      self,
+      stream: QueryStream,
+      page_size: int,
+      result_format: ResultFormat,
+  ):
+    self.stream = stream
+    self.page_size = page_size
+    self.result_format = result_format
+
+  def close(self):
+    self.stream.close()
+
+
+def _read_page(
+    paged_query: _PagedQuery, cursor_id: str | None
+) -> dict[str, Any]:
+  """Reads the next page of a paginated query.
+
+  The cursor is released once the last page is read. When `cursor_id` is
+  None, a new cursor is created if there are rows left after this page.
+  """
+  stream = paged_query.stream
+  # Read one row past the page first, so that no row read is lost if the
+  # call is suspended.
+  stream.prefetch(paged_query.page_size + 1)
+  rows = stream.read(paged_query.page_size)
+  has_more = stream.has_more()
+  if not has_more:
+    if cursor_id is not None:
+      _CURSORS.release(cursor_id)
+    else:
+      stream.close()
+    cursor_id = None
+  elif cursor_id is None:
+    cursor_id = _CURSORS.add(paged_query, owner=get_credentials_id())
+
+  if paged_query.result_format == "columnar":
+    page = build_response(stream.columns, rows, "columnar")
+  else:
+    page = {"rows": build_response(stream.columns, rows, "rows")}
+  page["next_cursor"] = cursor_id
+  return page
+
+
 @mcp.tool()
-def execute_gaql(
+async def execute_gaql(
     query: str,
     customer_id: str,
     login_customer_id: str | None = None,
-) -> list[dict[str, Any]]:
+    format: ResultFormat = "rows",  # pylint: disable=redefined-builtin
+    convert_micros: bool = False,
+    page_size: int | None = None,
+    derived_metrics: list[str] | None = None,
+    having: str | None = None,
+) -> list[dict[str, Any]] | dict[str, Any]:
   """Executes a Google Ads Query Language (GAQL) query to get reporting data.
 
   Args:
@@ -123,29 +1206,692 @@ def execute_gaql(
           Usually, it is the MCC on top of the target customer account.
           It is only digits.
           In most cases, a default account is set, it could be optional.
+      format: (Optional) "rows" (default) returns an array of objects, one
+          per row. "columnar" returns `{"columns": [...], "rows": [[...]]}`
+          with the field names listed once, which is much smaller for large
+          reports.
+      convert_micros: (Optional) If true, amounts in `*_micros` fields, such
+          as `metrics.cost_micros`, are returned in currency units instead of
+          micros.
+      page_size: (Optional) If set, only the first `page_size` rows are
+          returned, in an object with the `rows` and a `next_cursor`. Pass
+          the cursor to `fetch_gaql_page` to get the next page. The cursor is
+          null on the last page, and expires when left unused.
+      derived_metrics: (Optional) Metrics computed from the selected fields
+          and added as columns: "ctr" (clicks / impressions), "cpc" (cost /
+          clicks), "cpa" (cost / conversions) and "cost", in currency units.
+          They are null when their denominator is zero. The query must
+          select the metrics they use, e.g. `metrics.cost_micros` and
+          `metrics.clicks` for "cpc".
+      having: (Optional) Conditions the returned rows meet, checked after
+          the query on the result columns including `derived_metrics`,
+          joined by AND, e.g. "cpa > 50 AND metrics.conversions >= 1".
+          Amounts are compared in the unit they are returned in.
 
   Returns:
-      An array of object, each object representing a row of the query results.
+      An array of object, each object representing a row of the query results,
+      or a columnar table when `format` is "columnar". A page of the results
+      when `page_size` is set.
   """
-  query = preprocess_gaql(query)
-  ads_client = get_ads_client()
-  if login_customer_id:
-    ads_client.login_customer_id = login_customer_id
-  ads_service: GoogleAdsServiceClient = ads_client.get_service(
-      "GoogleAdsService"
+  if derived_metrics or having:
+    if page_size is not None:
+      raise ValueError(
+          "derived_metrics and having cannot be used with page_size."
+      )
+    tables.check_derived_metrics(
+        derived_metrics or [], formatters.get_selected_fields(query)
+    )
+    table = await run_admitted(
+        customer_id,
+        _execute_gaql_table,
+        query,
+        customer_id,
+        login_customer_id,
+        tables.ColumnTable(),
+        convert_micros,
+        derived_metrics or [],
+        having,
+    )
+    return build_response(table.columns, table.rows(), format)
+
+  if page_size is not None:
+    if page_size < 1:
+      raise ValueError("page_size must be a positive number.")
+    return await run_admitted(
+        customer_id,
+        _start_paged_query,
+        query,
+        customer_id,
+        login_customer_id,
+        format,
+        convert_micros,
+        page_size,
+    )
+
+  columns, rows = await _run_gaql(
+      query, customer_id, login_customer_id, convert_micros
   )
+  return build_response(columns, rows, format)
+
+
+@mcp.tool()
+async def fetch_gaql_page(cursor: str) -> dict[str, Any]:
+  """Fetches the next page of a paginated `execute_gaql` query.
+
+  Args:
+      cursor: The `next_cursor` returned by `execute_gaql` or by the previous
+          call to this tool.
+
+  Returns:
+      The next page, in the format of the first page, with the cursor of the
+      page after it, or a null `next_cursor` on the last page.
+  """
+  return await run_admitted(None, _fetch_gaql_page, cursor, admit_first=False)
+
+
+def _fetch_gaql_page(cursor_id: str) -> dict[str, Any]:
+  """Blocking implementation of `fetch_gaql_page`."""
   try:
-    query_res = ads_service.search_stream(query=query, customer_id=customer_id)
-    output = []
-    for batch in query_res:
-      for row in batch.results:
-        output.append(
-            {
-                i: format_value(get_nested_attr(row, i))
-                for i in batch.field_mask.paths
-            }
+    cursor = _CURSORS.checkout(cursor_id, owner=get_credentials_id())
+  except KeyError as e:
+    raise ValueError(
+        "The cursor is not found or has expired. Run the query again."
+    ) from e
+  with cursor.lock:
+    # The stream was opened by an earlier call, and is cancelled with this
+    # one from now on.
+    cursor.value.stream.watch(_CANCELLATION.get())
+    return _read_page(cursor.value, cursor_id)
+
+
+def _open_query_stream(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None = None,
+    convert_micros: bool = False,
+) -> QueryStream:
+  """Starts a `search_stream` call for a GAQL query.
+
+  A suspended call gets back the stream it was reading.
+  """
+  state = _CALL_STATE.get()
+  key = (query, customer_id, login_customer_id, convert_micros)
+  if state is not None and key in state.streams:
+    stream = state.streams[key]
+    stream.watch(_CANCELLATION.get())
+    return stream
+  view = formatters.get_query_view(query)
+  field_metadata = DOCS_INDEX.get_view_fields(view) if view else None
+  query = preprocess_gaql(query)
+  ads_service: "GoogleAdsServiceClient" = get_ads_service(
+      "GoogleAdsService", login_customer_id
+  )
+
+  def open_batches() -> Any:
+    _admit(customer_id)
+    return ads_service.search_stream(query=query, customer_id=customer_id)
+
+  stream = QueryStream(
+      None,
+      field_metadata,
+      convert_micros,
+      open_batches=open_batches,
+      resumable=has_stable_order(query),
+      customer_id=customer_id,
+      cancellation=_CANCELLATION.get(),
+  )
+  if state is not None:
+    state.streams[key] = stream
+  return stream
+
+
+def _read_query(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None = None,
+    convert_micros: bool = False,
+) -> tuple[list[str], list[list[Any]]]:
+  """Reads all the rows of a GAQL query.
+
+  A suspended call reuses the results of the queries it had read.
+
+  Returns:
+      The field mask paths of the query and the formatted values of each row.
+  """
+  state = _CALL_STATE.get()
+  key = (query, customer_id, login_customer_id, convert_micros)
+  if state is not None and key in state.results:
+    return state.results[key]
+  stream = _open_query_stream(
+      query, customer_id, login_customer_id, convert_micros
+  )
+  rows = stream.read()
+  result = stream.columns, rows
+  if state is not None:
+    del state.streams[key]
+    state.results[key] = result
+  return result
+
+
+def _start_paged_query(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None,
+    format: ResultFormat,  # pylint: disable=redefined-builtin
+    convert_micros: bool,
+    page_size: int,
+) -> dict[str, Any]:
+  """Blocking implementation of paginated `execute_gaql` calls."""
+  stream = _open_query_stream(
+      query, customer_id, login_customer_id, convert_micros
+  )
+  return _read_page(_PagedQuery(stream, page_size, format), None)
+
+
+RESULT_CACHE_MAX_BYTES = int(
+    os.environ.get("ADS_MCP_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+# Results of queries reading metrics or dates go stale quickly, while the
+# account structure, such as the list of campaigns, rarely changes.
+RESULT_CACHE_TTL_SECONDS = float(
+    os.environ.get("ADS_MCP_RESULT_CACHE_TTL_SECONDS", "60")
+)
+RESULT_CACHE_STRUCTURE_TTL_SECONDS = float(
+    os.environ.get("ADS_MCP_RESULT_CACHE_STRUCTURE_TTL_SECONDS", "900")
+)
+_RESULT_CACHE = result_cache.ResultCache(RESULT_CACHE_MAX_BYTES)
+_IN_FLIGHT = result_cache.SingleFlight()
+
+
+REPORT_CACHE_DIR = os.environ.get("ADS_MCP_REPORT_CACHE_DIR")
+REPORT_CACHE_LAG_DAYS = int(
+    os.environ.get("ADS_MCP_REPORT_CACHE_LAG_DAYS", "3")
+)
+_REPORT_CACHE: report_cache.ReportCache | None = (
+    report_cache.ReportCache(REPORT_CACHE_DIR, REPORT_CACHE_LAG_DAYS)
+    if REPORT_CACHE_DIR
+    else None
+)
+
+
+@mcp.resource("resource://stats/result_cache", mime_type="application/json")
+def get_result_cache_stats() -> dict[str, int]:
+  """Get the hit and miss counters and the size of the GAQL result cache."""
+  return {**_RESULT_CACHE.stats(), "coalesced": _IN_FLIGHT.coalesced}
+
+
+_export_stats(
+    "ads_mcp_result_cache",
+    get_result_cache_stats,
+    {
+        "hits": "GAQL queries answered from the result cache.",
+        "misses": "GAQL queries not found in the result cache.",
+        "evictions": "Results evicted from the result cache to make room.",
+        "coalesced": "GAQL queries sharing the API call of an identical one.",
+    },
+    {
+        "entries": "Results in the result cache.",
+        "bytes": "Size of the results in the result cache, in JSON bytes.",
+    },
+)
+
+
+def _result_cache_key(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None,
+    credentials_id: str | None,
+    convert_micros: bool,
+) -> tuple[Any, ...]:
+  return (
+      result_cache.normalize_query(preprocess_gaql(query)),
+      customer_id,
+      login_customer_id,
+      credentials_id,
+      convert_micros,
+  )
+
+
+async def _run_gaql(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None = None,
+    convert_micros: bool = False,
+) -> tuple[list[str], list[list[Any]]]:
+  """Runs a GAQL query in the query pool, unless its results are cached.
+
+  Identical queries for the same customer and credentials are answered from
+  the result cache until their time to live has passed. Identical queries
+  running at the same time share a single run, awaited on the event loop so
+  that the duplicates do not hold threads of the query pool.
+
+  Returns:
+      The field mask paths of the query and the formatted values of each row.
+  """
+  credentials_id = get_credentials_id()
+  cache_key = _result_cache_key(
+      query, customer_id, login_customer_id, credentials_id, convert_micros
+  )
+  cached = _RESULT_CACHE.get(cache_key)
+  if cached is not None:
+    return cached
+  args = (query, customer_id, login_customer_id, convert_micros)
+  # The report cache may answer without any request.
+  admit_first = _get_date_range_query(query, credentials_id) is None
+  run = functools.partial(
+      run_admitted, customer_id, _execute_gaql, *args, admit_first=admit_first
+  )
+  return await _IN_FLIGHT.run(cache_key, run)
+
+
+def _get_date_range_query(
+    query: str, credentials_id: str | None
+) -> report_cache.DateRangeQuery | None:
+  """Parses a query the report cache can answer, if it is configured."""
+  # The report cache is shared by every user of the server, so it is only
+  # used with the server credentials.
+  if _REPORT_CACHE is None or credentials_id is not None:
+    return None
+  return report_cache.parse_date_range_query(query)
+
+
+def _execute_gaql(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None = None,
+    convert_micros: bool = False,
+) -> tuple[list[str], list[list[Any]]]:
+  """Blocking implementation of `execute_gaql`.
+
+  The results are stored in the result cache. With the server credentials,
+  days of `segments.date BETWEEN` reports older than the lag window are read
+  from the on-disk report cache when it is configured.
+
+  Returns:
+      The field mask paths of the query and the formatted values of each row.
+  """
+  credentials_id = get_credentials_id()
+
+  def fetch(query: str) -> tuple[list[str], list[list[Any]]]:
+    return _read_query(query, customer_id, login_customer_id, convert_micros)
+
+  date_range_query = _get_date_range_query(query, credentials_id)
+  if date_range_query is not None:
+    columns, rows = _REPORT_CACHE.execute(
+        date_range_query,
+        customer_id,
+        fetch,
+        report_cache.earliest_today(),
+        key_extra=(convert_micros,),
+    )
+  else:
+    columns, rows = fetch(query)
+
+  if result_cache.is_structural_query(query):
+    ttl_seconds = RESULT_CACHE_STRUCTURE_TTL_SECONDS
+  else:
+    ttl_seconds = RESULT_CACHE_TTL_SECONDS
+  _RESULT_CACHE.put(
+      _result_cache_key(
+          query, customer_id, login_customer_id, credentials_id, convert_micros
+      ),
+      columns,
+      rows,
+      ttl_seconds,
+  )
+  return columns, rows
+
+
+MULTI_QUERY_TIMEOUT_SECONDS = float(
+    os.environ.get("ADS_MCP_MULTI_QUERY_TIMEOUT_SECONDS", "120")
+)
+MAX_CONCURRENT_BATCH_QUERIES = max(1, MAX_CONCURRENT_QUERIES // 2)
+# Shared by all fan-outs, so that concurrent calls of `execute_gaql_multi`
+# together leave threads of the query pool to interactive queries.
+_BATCH_QUERY_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_BATCH_QUERIES)
+
+
+@mcp.tool()
+async def execute_gaql_multi(
+    query: str,
+    customer_ids: list[str],
+    login_customer_id: str | None = None,
+    format: ResultFormat = "rows",  # pylint: disable=redefined-builtin
+    convert_micros: bool = False,
+    ctx: Context | None = None,
+) -> dict[str, Any]:
+  """Executes the same GAQL query for many customers in parallel.
+
+  Use it instead of calling `execute_gaql` once per customer, for example to
+  build a report across all accounts of a manager account.
+
+  Args:
+      query: The GAQL query to execute for each customer.
+      customer_ids: The IDs of the customers being queried. They are only
+          digits.
+      login_customer_id: (Optional) The ID of the customer being logged in.
+          Usually, it is the MCC on top of the target customer accounts.
+          It is only digits.
+      format: (Optional) "rows" (default) or "columnar", as in
+          `execute_gaql`.
+      convert_micros: (Optional) If true, amounts in `*_micros` fields are
+          returned in currency units instead of micros.
+
+  Returns:
+      An object with the merged `rows` of all customers, each tagged with its
+      `customer_id`, and the `errors` of the customers whose query failed or
+      timed out. With the "columnar" format, `customer_id` is the first of
+      the `columns`.
+  """
+  customer_ids = list(dict.fromkeys(customer_ids))
+  # The timeout of each customer starts once its query holds one of the batch
+  # slots, and a query timing out is cancelled and keeps its slot until its
+  # thread has stopped.
+  completed = 0
+
+  async def run(
+      customer_id: str,
+  ) -> tuple[list[str], list[list[Any]]]:
+    nonlocal completed
+    _PRIORITY.set(scheduler.Priority.BATCH)
+    async with _BATCH_QUERY_SLOTS:
+      try:
+        return await asyncio.wait_for(
+            _run_gaql(query, customer_id, login_customer_id, convert_micros),
+            MULTI_QUERY_TIMEOUT_SECONDS,
         )
-  except GoogleAdsException as e:
-    raise RuntimeError("\n".join(str(i) for i in e.failure.errors)) from e
+      finally:
+        completed += 1
+        if ctx is not None:
+          await ctx.report_progress(completed, len(customer_ids))
+
+  results = await asyncio.gather(
+      *(run(customer_id) for customer_id in customer_ids),
+      return_exceptions=True,
+  )
+
+  columns: list[str] = []
+  rows: list[list[Any]] = []
+  errors = []
+  for customer_id, result in zip(customer_ids, results):
+    if isinstance(result, TimeoutError):
+      errors.append(
+          {
+              "customer_id": customer_id,
+              "error": (
+                  f"Timed out after {MULTI_QUERY_TIMEOUT_SECONDS:g} seconds."
+              ),
+          }
+      )
+    elif isinstance(result, Exception):
+      errors.append({"customer_id": customer_id, "error": str(result)})
+    elif isinstance(result, BaseException):
+      raise result
+    else:
+      customer_columns, customer_rows = result
+      columns = columns or customer_columns
+      rows.extend([customer_id, *row] for row in customer_rows)
+
+  response = build_response(["customer_id", *columns], rows, format)
+  if format == "rows":
+    response = {"rows": response}
+  response["errors"] = errors
+  return response
+
+
+def _consume_query(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None,
+    consumer: Callable[[list[str], list[list[Any]]], None],
+    restart: Callable[[], None],
+    convert_micros: bool = False,
+) -> list[str]:
+  """Passes the rows of a query to a consumer, chunk by chunk.
+
+  The rows of a query already in the result cache are read from there
+  instead of calling the API again.
+
+  Args:
+      query: The GAQL query to execute.
+      customer_id: The ID of the customer being queried.
+      login_customer_id: (Optional) The ID of the customer being logged in.
+      consumer: A function called with the columns and the formatted values
+          of each chunk of rows.
+      restart: A function undoing the calls to `consumer`, before the rows
+          of a failed stream are passed again.
+      convert_micros: Whether `*_micros` amounts are converted to currency.
+
+  Returns:
+      The columns of the query, empty if the stream had no batch.
+  """
+  cached = _RESULT_CACHE.get(
+      _result_cache_key(
+          query,
+          customer_id,
+          login_customer_id,
+          get_credentials_id(),
+          convert_micros,
+      )
+  )
+  if cached is not None:
+    consumer(*cached)
+    return cached[0]
+  stream = _open_query_stream(
+      query, customer_id, login_customer_id, convert_micros
+  )
+  try:
+    stream.consume(consumer, restart)
+  except _Suspended:
+    raise  # The consumer gets the next rows once the call goes on.
+  except BaseException:
+    stream.close()
+    raise
+  stream.close()
+  return stream.columns
+
+
+def _execute_gaql_table(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None,
+    table: tables.ColumnTable,
+    convert_micros: bool,
+    derived_metrics: list[str],
+    having: str | None,
+) -> tables.ColumnTable:
+  """Reads the rows of a query into column buffers and post-processes them.
+
+  Derived metrics are computed from amounts in micros, which are converted
+  afterwards if requested, then the rows are filtered. A stream without any
+  batch has the columns of the SELECT clause.
+  """
+  columns = _consume_query(
+      query, customer_id, login_customer_id, table.append, table.reset
+  )
+  table.append(columns or formatters.get_selected_fields(query), [])
+  for name in derived_metrics:
+    table.add_derived_metric(name)
+  if convert_micros:
+    table.convert_micros()
+  if having:
+    table.filter(having)
+  return table
+
+
+# The maximum number of groups an `aggregate_gaql` call holds in memory.
+MAX_AGGREGATE_GROUPS = int(
+    os.environ.get("ADS_MCP_MAX_AGGREGATE_GROUPS", "100000")
+)
+
+
+@mcp.tool()
+async def aggregate_gaql(
+    query: str,
+    customer_id: str,
+    group_by: list[str],
+    metrics: list[str],  # pylint: disable=redefined-outer-name
+    order_by: str | None = None,
+    limit: int | None = 100,
+    login_customer_id: str | None = None,
+    format: ResultFormat = "rows",  # pylint: disable=redefined-builtin
+    convert_micros: bool = False,
+) -> dict[str, Any]:
+  """Executes a GAQL query and returns its rows grouped and aggregated.
+
+  Use it instead of `execute_gaql` to total, average or rank many rows, for
+  example the cost per campaign or the top search terms by clicks. Rows are
+  aggregated on the server as they are streamed, and only the groups are
+  returned.
+
+  Args:
+      query: The GAQL query to execute. It must select the `group_by` fields
+          and the aggregated fields.
+      customer_id: The ID of the customer being queried. It is only digits.
+      group_by: The fields to group rows by, e.g. ["campaign.name"]. All
+          rows form a single group if empty.
+      metrics: The aggregates of each group, written `function(field)` with
+          one of the functions sum, avg, min, max, count or count_distinct,
+          e.g. "sum(metrics.cost_micros)". A bare field is summed, and
+          "count(*)" counts the rows of each group.
+      order_by: (Optional) The columns to sort the groups by, each followed
+          by ASC or DESC, e.g. "sum(metrics.clicks) DESC, campaign.name".
+          By default, the first of the `metrics` in descending order.
+      limit: (Optional) The maximum number of groups returned, 100 by
+          default. Null to return all groups.
+      login_customer_id: (Optional) The ID of the customer being logged in.
+          Usually, it is the MCC on top of the target customer account.
+          It is only digits.
+      format: (Optional) "rows" (default) or "columnar", as in
+          `execute_gaql`. The columns are the `group_by` fields then the
+          `metrics`.
+      convert_micros: (Optional) If true, aggregated amounts of `*_micros`
+          fields are returned in currency units instead of micros.
+
+  Returns:
+      An object with the `rows` of the top groups, the number of `groups`
+      and the number of `rows_read` from the API.
+  """
+  aggregator = aggregation.Aggregation(
+      group_by, metrics, order_by, limit, MAX_AGGREGATE_GROUPS
+  )
+  aggregator.check_fields(formatters.get_selected_fields(query))
+  rows = await run_admitted(
+      customer_id,
+      _aggregate_gaql,
+      query,
+      customer_id,
+      login_customer_id,
+      aggregator,
+      convert_micros,
+  )
+  response = build_response(aggregator.columns, rows, format)
+  if format == "rows":
+    response = {"rows": response}
+  response["groups"] = aggregator.group_count
+  response["rows_read"] = aggregator.rows_read
+  return response
+
+
+def _aggregate_gaql(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None,
+    aggregator: aggregation.Aggregation,
+    convert_micros: bool,
+) -> list[list[Any]]:
+  """Blocking implementation of `aggregate_gaql`."""
+  _consume_query(
+      query, customer_id, login_customer_id, aggregator.add, aggregator.reset
+  )
+  return aggregator.result(convert_micros)
+
+
+# The directory `export_gaql` writes files to, the `exports` directory in the
+# working directory of the server if not set, away from its configuration.
+EXPORT_DIR = os.environ.get("ADS_MCP_EXPORT_DIR")
 
-  return output
+
+def _get_export_dir() -> str:
+  """Gets the directory the exports of the request credentials are written to.
+
+  Each OAuth access token has its own subdirectory, named after its hash,
+  so that clients cannot replace the exports of others. Exports with the
+  credentials of the YAML file go to the `server` subdirectory.
+  """
+  root = EXPORT_DIR or os.path.join(os.getcwd(), "exports")
+  return os.path.join(root, get_credentials_id() or "server")
+
+
+@mcp.tool()
+async def export_gaql(
+    query: str,
+    customer_id: str,
+    path: str,
+    format: exports.ExportFormat = "parquet",  # pylint: disable=redefined-builtin
+    login_customer_id: str | None = None,
+    convert_micros: bool = False,
+) -> dict[str, Any]:
+  """Executes a GAQL query and writes all its rows to a file on the server.
+
+  Use it instead of `execute_gaql` for large reports, e.g. a year of daily
+  search terms, that are analyzed outside of the conversation. Rows are
+  written as they are streamed and only a summary of the file is returned.
+
+  Args:
+      query: The GAQL query to execute.
+      customer_id: The ID of the customer being queried. It is only digits.
+      path: The path of the file written, relative to the export directory
+          of the caller on the server. It must end with the extension of the
+          format, e.g. `.csv`. An existing file is replaced.
+      format: (Optional) "parquet" (default), "arrow" for an Arrow IPC
+          file, "csv", or "jsonl" for one JSON object per line. Parquet and
+          Arrow need the pyarrow package on the server.
+      login_customer_id: (Optional) The ID of the customer being logged in.
+          Usually, it is the MCC on top of the target customer account.
+          It is only digits.
+      convert_micros: (Optional) If true, amounts in `*_micros` fields are
+          written in currency units instead of micros.
+
+  Returns:
+      The absolute `path` of the file, its `format`, the number of `rows`,
+      the type of each column in `schema` and the size of the file in
+      `bytes`.
+  """
+  exporter = exports.Exporter(
+      exports.resolve_path(path, _get_export_dir()), format
+  )
+  return await run_admitted(
+      customer_id,
+      _export_gaql,
+      query,
+      customer_id,
+      login_customer_id,
+      exporter,
+      convert_micros,
+  )
+
+
+def _export_gaql(
+    query: str,
+    customer_id: str,
+    login_customer_id: str | None,
+    exporter: exports.Exporter,
+    convert_micros: bool,
+) -> dict[str, Any]:
+  """Blocking implementation of `export_gaql`."""
+  try:
+    columns = _consume_query(
+        query,
+        customer_id,
+        login_customer_id,
+        exporter.write,
+        exporter.reset,
+        convert_micros,
+    )
+    return exporter.finish(columns)
+  except _Suspended:
+    raise
+  except BaseException:
+    exporter.abort()
+    raise
@@ -14,10 +14,23 @@
 
 """This module provides tools for accessing Google Ads API documentation."""
 
-import os
+from typing import Any, Literal
 
 from ads_mcp.coordinator import mcp_server as mcp
-from ads_mcp.utils import MODULE_DIR
+from ads_mcp.docs_index import DOCS_INDEX
+from ads_mcp.field_index import FIELD_INDEX
+
+
+def _read_doc(relative_path: str) -> str:
+  """Gets the text of a bundled doc file.
+
+  Raises:
+      FileNotFoundError: If the doc file is missing.
+  """
+  text = DOCS_INDEX.read_text(relative_path)
+  if text is None:
+    raise FileNotFoundError(f"The doc file {relative_path} is not found.")
+  return text
 
 
 @mcp.tool()
@@ -29,11 +42,7 @@ def get_gaql_doc() -> str:
 @mcp.resource("resource://Google_Ads_Query_Language")
 def get_gaql_doc_resource() -> str:
   """Get Google Ads Query Language (GAQL) guides."""
-  with open(
-      os.path.join(MODULE_DIR, "context/GAQL.md"), "r", encoding="utf-8"
-  ) as f:
-    data = f.read()
-  return data
+  return _read_doc("GAQL.md")
 
 
 @mcp.tool()
@@ -56,13 +65,7 @@ def get_reporting_view_doc(view: str | None) -> str:
 @mcp.resource("resource://Google_Ads_API_Reporting_Views")
 def get_reporting_doc() -> str:
   """Get Google Ads API reporting view docs."""
-  with open(
-      os.path.join(MODULE_DIR, "context/Google_Ads_API_Reporting_Views.md"),
-      "r",
-      encoding="utf-8",
-  ) as f:
-    data = f.read()
-  return data
+  return _read_doc("Google_Ads_API_Reporting_Views.md")
 
 
 @mcp.resource("resource://views/{view}")
@@ -74,13 +77,44 @@ def get_view_doc(view: str) -> str:
   Args:
       view: The name of the view resource.
   """
-  try:
-    with open(
-        os.path.join(MODULE_DIR, f"context/views/{view}.yaml"),
-        "r",
-        encoding="utf-8",
-    ) as f:
-      data = f.read()
-  except FileNotFoundError:
+  data = DOCS_INDEX.get_view_text(view)
+  if data is None:
     return "No view resource with that name was found."
   return data
+
+
+@mcp.tool()
+def search_fields(
+    query: str,
+    view: str | None = None,
+    category: Literal["attributes", "segments", "metrics"] | None = None,
+    filterable: bool | None = None,
+    limit: int = 20,
+) -> list[dict[str, Any]]:
+  """Search Google Ads API fields by name and description.
+
+  Use this to find the fields to select, filter or sort on without reading
+  whole reporting view docs.
+
+  Args:
+      query: The words to search for, e.g. "search impression share" or a
+          field name like "metrics.clicks".
+      view: (Optional) Only return fields selectable in this view resource.
+      category: (Optional) Only return attributes, segments or metrics.
+      filterable: (Optional) Only return fields that can (True) or cannot
+          (False) be used in a WHERE clause.
+      limit: The maximum number of fields to return, best matches first.
+
+  Returns:
+      The matching fields with their category, data type, description and
+      whether they are filterable and sortable.
+  """
+  if limit < 1:
+    raise ValueError("limit must be at least 1.")
+  return FIELD_INDEX.search(
+      query,
+      view=view,
+      category=category,
+      filterable=filterable,
+      limit=limit,
+  )
@@ -15,6 +15,54 @@
 """Utility functions for the Google Ads API MCP."""
 
 import os
+import threading
+from typing import Any, IO
+
+import yaml
+
+try:
+  from yaml import CSafeDumper as SafeDumper
+  from yaml import CSafeLoader as SafeLoader
+except ImportError:
+  from yaml import SafeDumper
+  from yaml import SafeLoader
+
+ADS_API_VERSION = "v21"
 
 MODULE_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.dirname(MODULE_DIR)
+
+
+def load_yaml(stream: str | IO[str]) -> Any:
+  """Parses YAML like `yaml.safe_load`, with libyaml when it is available."""
+  return yaml.load(stream, Loader=SafeLoader)
+
+
+def dump_yaml(data: Any, stream: IO[str] | None = None, **kwargs) -> Any:
+  """Serializes YAML like `yaml.safe_dump`, with libyaml when available."""
+  return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+
+
+_YAML_FILES: dict[str, tuple[tuple[int, int], Any]] = {}
+_YAML_FILES_LOCK = threading.Lock()
+
+
+def load_yaml_file(path: str) -> Any:
+  """Loads a YAML file, parsed again only when the file changes.
+
+  Args:
+      path: The path of the YAML file.
+
+  Returns:
+      The parsed content of the file. It is shared and must not be modified.
+  """
+  stat = os.stat(path)
+  version = (stat.st_mtime_ns, stat.st_size)
+  cached = _YAML_FILES.get(path)
+  if cached is not None and cached[0] == version:
+    return cached[1]
+  with open(path, "r", encoding="utf-8") as f:
+    data = load_yaml(f)
+  with _YAML_FILES_LOCK:
+    _YAML_FILES[path] = (version, data)
+  return data
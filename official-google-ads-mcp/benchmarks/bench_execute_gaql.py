@@ -0,0 +1,220 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the `execute_gaql` result pipeline on synthetic streams.
+
+Times each stage between the `search_stream` batches and the JSON sent to
+the client, for reports of 10k to 1M rows:
+
+- stream: reading and formatting the rows with `QueryStream`,
+- build_<format>: building the response with `build_response`,
+- serialize_<format>: serializing the response to JSON as FastMCP does,
+
+and measures the peak memory of the whole pipeline for each format. The
+results are written as JSON with `--output`. With `--baseline`, the run
+fails if a stage got slower than in a previous results file.
+
+Usage:
+  uv run -m benchmarks.bench_execute_gaql [--rows 10000 100000]
+      [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+from collections.abc import Callable
+import datetime
+import gc
+import importlib.metadata
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from ads_mcp.tools import api
+from benchmarks.synthetic import BATCH_SIZE
+from benchmarks.synthetic import FIELD_METADATA
+from benchmarks.synthetic import make_stream
+import pydantic_core
+
+FORMATS = ("rows", "columnar")
+# Slowdowns smaller than this are timer noise, not regressions.
+_MIN_REGRESSION_SECONDS = 0.005
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+  """Runs a function several times, returning its best time and result."""
+  best = float("inf")
+  result = None
+  for _ in range(repeat):
+    result = None
+    gc.collect()
+    started_at = time.perf_counter()
+    result = func()
+    best = min(best, time.perf_counter() - started_at)
+  return best, result
+
+
+def _read_stream(batches: list[Any]) -> tuple[list[str], list[list[Any]]]:
+  stream = api.QueryStream(iter(batches), FIELD_METADATA)
+  rows = stream.read()
+  return stream.columns, rows
+
+
+def _peak_memory(batches: list[Any], result_format: str) -> int:
+  """Measures the peak memory allocated by the whole pipeline."""
+  gc.collect()
+  tracemalloc.start()
+  try:
+    columns, rows = _read_stream(batches)
+    response = api.build_response(columns, rows, result_format)
+    pydantic_core.to_json(response)
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+
+def run(rows: int, repeat: int, batch_size: int = BATCH_SIZE) -> list[dict]:
+  """Benchmarks the pipeline on a stream of synthetic rows.
+
+  Args:
+      rows: The number of rows of the stream.
+      repeat: The number of runs of each stage, the best one is kept.
+      batch_size: The number of rows per stream batch.
+
+  Returns:
+      The results of each stage.
+  """
+  # The batches are built before timing, they stand for the API response.
+  batches = list(make_stream(rows, batch_size))
+  results = []
+
+  def add(stage: str, seconds: float, **extra: Any):
+    results.append(
+        {
+            "stage": stage,
+            "rows": rows,
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(rows / seconds) if seconds else None,
+            **extra,
+        }
+    )
+
+  seconds, (columns, formatted) = _best_time(
+      lambda: _read_stream(batches), repeat
+  )
+  add("stream", seconds)
+  for result_format in FORMATS:
+    seconds, response = _best_time(
+        lambda f=result_format: api.build_response(columns, formatted, f),
+        repeat,
+    )
+    add(f"build_{result_format}", seconds)
+    seconds, payload = _best_time(
+        lambda r=response: pydantic_core.to_json(r), repeat
+    )
+    add(
+        f"serialize_{result_format}",
+        seconds,
+        payload_bytes=len(payload),
+        peak_memory_bytes=_peak_memory(batches, result_format),
+    )
+    del response, payload
+  return results
+
+
+def find_regressions(
+    results: list[dict], baseline: list[dict], tolerance: float
+) -> list[str]:
+  """Lists the stages slower than in the baseline beyond a tolerance."""
+  baseline_seconds = {
+      (result["stage"], result["rows"]): result["seconds"]
+      for result in baseline
+  }
+  regressions = []
+  for result in results:
+    previous = baseline_seconds.get((result["stage"], result["rows"]))
+    seconds = result["seconds"]
+    if (
+        previous
+        and seconds > previous * (1 + tolerance)
+        and seconds - previous > _MIN_REGRESSION_SECONDS
+    ):
+      stage, rows = result["stage"], result["rows"]
+      regressions.append(
+          f"{stage} with {rows} rows: {seconds:.3f}s, was {previous:.3f}s"
+      )
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+  )
+  parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+  parser.add_argument("--output", help="File to write the results to.")
+  parser.add_argument("--baseline", help="Results of a previous run.")
+  parser.add_argument(
+      "--tolerance",
+      type=float,
+      default=0.2,
+      help="Slowdown allowed against the baseline, 0.2 for 20%%.",
+  )
+  args = parser.parse_args()
+
+  results = []
+  for rows in args.rows:
+    for result in run(rows, args.repeat, args.batch_size):
+      results.append(result)
+      stage = result["stage"]
+      seconds = result["seconds"]
+      memory = result.get("peak_memory_bytes")
+      print(
+          f"{stage:>18} {rows:>9} rows: {seconds * 1e3:9.1f} ms"
+          f" {seconds / rows * 1e6:6.2f} us/row"
+          + (f" {memory / 2**20:8.1f} MiB peak" if memory else "")
+      )
+
+  if args.output:
+    with open(args.output, "w", encoding="utf-8") as f:
+      json.dump(
+          {
+              "created_at": datetime.datetime.now(
+                  datetime.timezone.utc
+              ).isoformat(),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "google_ads": importlib.metadata.version("google-ads"),
+              "repeat": args.repeat,
+              "batch_size": args.batch_size,
+              "results": results,
+          },
+          f,
+          indent=2,
+      )
+
+  if args.baseline:
+    with open(args.baseline, "r", encoding="utf-8") as f:
+      baseline = json.load(f)["results"]
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for regression in regressions:
+      print(f"Regression: {regression}", file=sys.stderr)
+    if regressions:
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
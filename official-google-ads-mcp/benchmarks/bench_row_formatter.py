@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Micro-benchmark of the per-row cost of formatting GoogleAdsRow messages.
+
+Compares walking each dotted path with `get_nested_attr` and `format_value`
+for every cell against the accessors compiled once per stream batch by
+`compile_row_formatter`, with and without view metadata.
+
+Usage:
+  uv run -m benchmarks.bench_row_formatter [--rows 20000]
+"""
+
+import argparse
+import functools
+import timeit
+
+from ads_mcp.tools import api
+from benchmarks.synthetic import FIELD_METADATA
+from benchmarks.synthetic import make_rows
+from benchmarks.synthetic import PATHS
+from google.ads.googleads.util import get_nested_attr
+from google.ads.googleads.v21.services.types.google_ads_service import GoogleAdsRow
+
+
+def format_per_cell(rows: list[GoogleAdsRow]) -> list[list]:
+  """Formats rows the way execute_gaql did before compiled accessors."""
+  return [
+      [api.format_value(get_nested_attr(row, path)) for path in PATHS]
+      for row in rows
+  ]
+
+
+def format_compiled(rows: list[GoogleAdsRow]) -> list[list]:
+  """Formats rows with accessors compiled once for the batch."""
+  format_row = api.compile_row_formatter(PATHS)
+  return [format_row(row) for row in rows]
+
+
+def format_with_metadata(rows: list[GoogleAdsRow]) -> list[list]:
+  """Formats rows with converters selected from the view metadata."""
+  format_row = api.compile_row_formatter(PATHS, FIELD_METADATA)
+  return [format_row(row) for row in rows]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--rows", type=int, default=20_000)
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args()
+
+  rows = make_rows(args.rows)
+  assert format_per_cell(rows) == format_compiled(rows)
+  assert format_per_cell(rows) == format_with_metadata(rows)
+
+  for name, func in (
+      ("get_nested_attr", format_per_cell),
+      ("compiled", format_compiled),
+      ("view metadata", format_with_metadata),
+  ):
+    best = min(
+        timeit.repeat(
+            functools.partial(func, rows), number=1, repeat=args.repeat
+        )
+    )
+    print(
+        f"{name:>16}: {best * 1e3:8.1f} ms total,"
+        f" {best / args.rows * 1e6:6.2f} us/row"
+    )
+
+
+if __name__ == "__main__":
+  main()
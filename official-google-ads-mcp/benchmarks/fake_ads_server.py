@@ -0,0 +1,645 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local stand-in for the Google Ads API, to load-test the MCP server.
+
+Serves `GoogleAdsService.SearchStream` and
+`CustomerService.ListAccessibleCustomers` over gRPC with TLS, so that the
+Google Ads API client library talks to it as it does to the real API.
+
+Rows are generated for the fields selected by the query. The field metadata
+of the reporting views in `context/views` decides the values of each field,
+e.g. dates or the enum values of the view, and queries selecting fields
+their view does not have fail as they would on the API. Views without docs
+get values from the field types of `GoogleAdsRow`. The latency, batch size
+and errors of the streams are configurable.
+
+Usage:
+  uv run -m benchmarks.fake_ads_server [--port 50051] [--config-dir DIR]
+      [--latency 0.05] [--batch-size 10000]
+      [--error internal_error.TRANSIENT_ERROR:0.1]
+
+The MCP server is pointed at the fake API by the environment variables
+printed on start, see `benchmarks.run_load_test`.
+"""
+
+import argparse
+from collections.abc import Callable, Iterator, Sequence
+from concurrent import futures
+import datetime
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from typing import Any
+import uuid
+
+from ads_mcp.docs_index import DOCS_INDEX
+from ads_mcp.docs_index import DocsIndex
+from ads_mcp.utils import ADS_API_VERSION
+from ads_mcp.utils import dump_yaml
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from google.ads.googleads.v21.errors.types import errors
+from google.ads.googleads.v21.services.types import customer_service
+from google.ads.googleads.v21.services.types import google_ads_service
+from google.protobuf import descriptor
+import grpc
+
+_SERVICES = f"google.ads.googleads.{ADS_API_VERSION}.services"
+FAILURE_KEY = (
+    f"google.ads.googleads.{ADS_API_VERSION}.errors.googleadsfailure-bin"
+)
+# The file names of the client configuration written for the MCP server.
+CREDENTIALS_FILE = "google-ads.yaml"
+CERTIFICATE_FILE = "localhost.pem"
+
+_QUERY = re.compile(
+    r"^\s*SELECT\s+(?P<fields>.+?)\s+FROM\s+(?P<view>\w+)"
+    r"(?:.*?\bLIMIT\s+(?P<limit>\d+))?",
+    re.IGNORECASE | re.DOTALL,
+)
+_ROW_DESCRIPTOR = google_ads_service.GoogleAdsRow.pb().DESCRIPTOR
+# Field names holding dates as strings when the view has no docs.
+_DATE_FIELDS = frozenset(("date", "week", "month", "quarter"))
+_FIRST_DATE = datetime.date(2025, 1, 1)
+# Distinct full batches generated per query, streamed again in turn.
+_DISTINCT_BATCHES = 4
+# The gRPC status of the failures of each error code field, INVALID_ARGUMENT
+# for the others.
+_ERROR_STATUS = {
+    "authentication_error": grpc.StatusCode.UNAUTHENTICATED,
+    "authorization_error": grpc.StatusCode.PERMISSION_DENIED,
+    "internal_error": grpc.StatusCode.INTERNAL,
+    "quota_error": grpc.StatusCode.RESOURCE_EXHAUSTED,
+}
+
+
+class FakeApiError(Exception):
+  """A failure returned by the fake API."""
+
+  def __init__(self, error_code: str, message: str):
+    """Initializes the error.
+
+    Args:
+        error_code: The error code, e.g. "internal_error.TRANSIENT_ERROR",
+            or "status.<gRPC status code>" for errors without failure
+            details, e.g. "status.UNAVAILABLE".
+        message: The message of the error.
+    """
+    super().__init__(message)
+    self.error_code = error_code
+    self.message = message
+
+
+class ErrorRule:
+  """Fails a share of the streams with an error."""
+
+  def __init__(self, error_code: str, rate: float, after_batches: int = 0):
+    """Initializes the rule.
+
+    Args:
+        error_code: The error code returned, see `FakeApiError`.
+        rate: The share of the streams failing, between 0 and 1.
+        after_batches: The number of batches streamed before failing.
+    """
+    self.error_code = error_code
+    self.rate = rate
+    self.after_batches = after_batches
+
+  @classmethod
+  def parse(cls, text: str) -> "ErrorRule":
+    """Parses a rule written as `ERROR_CODE:RATE[:AFTER_BATCHES]`."""
+    error_code, rate, *after_batches = text.split(":")
+    if "." not in error_code:
+      raise ValueError(f"Invalid error code {error_code!r}.")
+    return cls(
+        error_code, float(rate), int(after_batches[0]) if after_batches else 0
+    )
+
+
+def _resolve(path: str) -> list[descriptor.FieldDescriptor]:
+  """Gets the fields of `GoogleAdsRow` along a GAQL field path.
+
+  Raises:
+      KeyError: If the path is not a field of `GoogleAdsRow`.
+  """
+  message = _ROW_DESCRIPTOR
+  fields = []
+  for name in path.split("."):
+    field = message.fields_by_name.get(name) if message else None
+    if field is None:
+      raise KeyError(path)
+    fields.append(field)
+    message = field.message_type
+  return fields
+
+
+def _resource_name(path: str, cardinality: int) -> Callable[[int], str]:
+  resource = path.split(".")[0]
+  collection = re.sub(r"_(\w)", lambda m: m.group(1).upper(), resource) + "s"
+  return lambda i: f"customers/1234567890/{collection}/{i % cardinality}"
+
+
+def value_generator(
+    path: str,
+    field: descriptor.FieldDescriptor,
+    metadata: dict[str, Any] | None,
+    cardinality: int,
+) -> Callable[[int], Any] | None:
+  """Gets the generator of the values of a field.
+
+  Args:
+      path: The GAQL path of the field, e.g. "campaign.id".
+      field: The protobuf field at the end of the path.
+      metadata: (Optional) The metadata of the field in its view doc.
+      cardinality: The number of distinct values of ids and names.
+
+  Returns:
+      A function returning the value of the field in the i-th row, or None
+      for message fields, which are left empty.
+  """
+  metadata = metadata or {}
+  data_type = metadata.get("data_type")
+  name = path.rsplit(".", 1)[-1]
+  if field.type == field.TYPE_MESSAGE:
+    return None
+  if field.type == field.TYPE_ENUM:
+    values_by_name = field.enum_type.values_by_name
+    numbers = [
+        values_by_name[value].number
+        for value in metadata.get("enum_values") or ()
+        if value in values_by_name and values_by_name[value].number > 1
+    ] or [value.number for value in field.enum_type.values if value.number > 1]
+    return lambda i: numbers[i % len(numbers)] if numbers else 0
+  if field.type == field.TYPE_BOOL:
+    return lambda i: i % 2 == 0
+  if field.type in (field.TYPE_DOUBLE, field.TYPE_FLOAT):
+    return lambda i: i * 37 % 1000 / 10
+  if field.cpp_type in (
+      field.CPPTYPE_INT32,
+      field.CPPTYPE_INT64,
+      field.CPPTYPE_UINT32,
+      field.CPPTYPE_UINT64,
+  ):
+    if name == "id" or name.endswith("_id"):
+      return lambda i: 1000 + i % cardinality
+    if name.endswith("_micros"):
+      return lambda i: i * 37 % 1000 * 10_000
+    return lambda i: i * 37 % 1000
+  if data_type == "DATE" or (data_type is None and name in _DATE_FIELDS):
+    return lambda i: (
+        _FIRST_DATE + datetime.timedelta(days=i % 30)
+    ).isoformat()
+  if data_type == "RESOURCE_NAME" or name == "resource_name":
+    return _resource_name(path, cardinality)
+  prefix = path.replace(".", " ").replace("_", " ")
+  return lambda i: f"{prefix} {i % cardinality}"
+
+
+class _Column:
+  """The generated values of a selected field."""
+
+  def __init__(
+      self,
+      fields: list[descriptor.FieldDescriptor],
+      generate: Callable[[int], Any] | None,
+  ):
+    self.parents = [field.name for field in fields[:-1]]
+    self.field = fields[-1]
+    self.generate = generate
+
+  def set(self, row: Any, i: int):
+    message = row
+    for name in self.parents:
+      message = getattr(message, name)
+    if self.generate is None:
+      getattr(message, self.field.name).SetInParent()
+    elif self.field.is_repeated:
+      getattr(message, self.field.name).append(self.generate(i))
+    else:
+      setattr(message, self.field.name, self.generate(i))
+
+
+class FakeGoogleAdsApi:
+  """The fake `GoogleAdsService` and `CustomerService` handlers."""
+
+  def __init__(
+      self,
+      rows: int = 1000,
+      batch_size: int = 10_000,
+      latency: float = 0.0,
+      batch_latency: float = 0.0,
+      cardinality: int = 100,
+      error_rules: Sequence[ErrorRule] = (),
+      customer_ids: Sequence[str] = ("1234567890",),
+      docs: DocsIndex = DOCS_INDEX,
+      seed: int | None = None,
+  ):
+    """Initializes the fake API.
+
+    Args:
+        rows: The number of rows of queries without a LIMIT.
+        batch_size: The number of rows per streamed batch.
+        latency: The seconds before the first batch of a stream.
+        batch_latency: The seconds between two batches of a stream.
+        cardinality: The number of distinct values of ids and names.
+        error_rules: The errors injected in streams.
+        customer_ids: The accessible customers.
+        docs: The docs of the reporting views.
+        seed: (Optional) The seed of the error injection.
+    """
+    self.rows = rows
+    self.batch_size = batch_size
+    self.latency = latency
+    self.batch_latency = batch_latency
+    self.cardinality = cardinality
+    self.error_rules = list(error_rules)
+    self.customer_ids = list(customer_ids)
+    self._docs = docs
+    self._random = random.Random(seed)
+    self._batches: dict[tuple[Any, ...], bytes] = {}
+    self._lock = threading.Lock()
+    self.requests = 0
+    self.rows_sent = 0
+    self.errors = 0
+
+  def _columns(self, view: str, paths: list[str]) -> list[_Column]:
+    """Gets the columns of the selected fields of a view.
+
+    Raises:
+        FakeApiError: If a field is not selectable in the view.
+    """
+    view_fields = self._docs.get_view_fields(view)
+    columns = []
+    for path in paths:
+      if view_fields and path not in view_fields:
+        raise FakeApiError(
+            "query_error.UNRECOGNIZED_FIELD",
+            f"Unrecognized field in the query: '{path}'.",
+        )
+      try:
+        fields = _resolve(path)
+      except KeyError:
+        raise FakeApiError(
+            "query_error.UNRECOGNIZED_FIELD",
+            f"Unrecognized field in the query: '{path}'.",
+        ) from None
+      generate = value_generator(
+          path, fields[-1], view_fields.get(path), self.cardinality
+      )
+      columns.append(_Column(fields, generate))
+    return columns
+
+  def _batch(
+      self, view: str, paths: list[str], start: int, size: int
+  ) -> bytes:
+    """Gets a serialized batch of generated rows, built once per query."""
+    key = (view, tuple(paths), start, size)
+    batch = self._batches.get(key)
+    if batch is not None:
+      return batch
+    columns = self._columns(view, paths)
+    response = google_ads_service.SearchGoogleAdsStreamResponse.pb()()
+    response.field_mask.paths.extend(paths)
+    for i in range(start, start + size):
+      row = response.results.add()
+      for column in columns:
+        column.set(row, i)
+    batch = response.SerializeToString()
+    with self._lock:
+      self._batches[key] = batch
+    return batch
+
+  def _pick_error(self) -> ErrorRule | None:
+    with self._lock:
+      for rule in self.error_rules:
+        if self._random.random() < rule.rate:
+          return rule
+    return None
+
+  def stream_batches(self, query: str) -> Iterator[bytes]:
+    """Streams the serialized batches of the response to a query.
+
+    Raises:
+        FakeApiError: If the query is invalid or an error is injected.
+    """
+    match = _QUERY.match(query)
+    if match is None:
+      raise FakeApiError(
+          "query_error.PROHIBITED_CLAUSE_IN_SELECT_CLAUSE",
+          f"Cannot parse the query: {query!r}.",
+      )
+    view = match.group("view").lower()
+    paths = [path.strip() for path in match.group("fields").split(",")]
+    self._columns(view, paths)
+    rows = self.rows
+    if match.group("limit"):
+      rows = int(match.group("limit"))
+    error = self._pick_error()
+
+    with self._lock:
+      self.requests += 1
+    if self.latency:
+      time.sleep(self.latency)
+    full_batches = rows // self.batch_size
+    sizes = [self.batch_size] * full_batches
+    if rows % self.batch_size or not rows:
+      sizes.append(rows % self.batch_size)
+    for index, size in enumerate(sizes):
+      if error is not None and index == error.after_batches:
+        raise FakeApiError(error.error_code, "Injected error.")
+      if index and self.batch_latency:
+        time.sleep(self.batch_latency)
+      start = (index % _DISTINCT_BATCHES) * self.batch_size
+      yield self._batch(view, paths, start, size)
+      with self._lock:
+        self.rows_sent += size
+    if error is not None and error.after_batches >= len(sizes):
+      raise FakeApiError(error.error_code, "Injected error.")
+
+  def _abort(self, context: grpc.ServicerContext, error: FakeApiError):
+    with self._lock:
+      self.errors += 1
+    field, code = error.error_code.split(".", 1)
+    request_id = uuid.uuid4().hex
+    metadata = [("request-id", request_id)]
+    if field == "status":
+      status = grpc.StatusCode[code]
+    else:
+      status = _ERROR_STATUS.get(field, grpc.StatusCode.INVALID_ARGUMENT)
+      failure = errors.GoogleAdsFailure(
+          errors=[
+              errors.GoogleAdsError(
+                  error_code=errors.ErrorCode(**{field: code}),
+                  message=error.message,
+              )
+          ],
+          request_id=request_id,
+      )
+      metadata.append(
+          (FAILURE_KEY, errors.GoogleAdsFailure.serialize(failure))
+      )
+    context.set_trailing_metadata(tuple(metadata))
+    context.abort(status, error.message)
+
+  def search_stream(
+      self, request: Any, context: grpc.ServicerContext
+  ) -> Iterator[bytes]:
+    """Handles `GoogleAdsService.SearchStream`."""
+    try:
+      yield from self.stream_batches(request.query)
+    except FakeApiError as e:
+      self._abort(context, e)
+
+  def list_accessible_customers(
+      self, request: Any, context: grpc.ServicerContext
+  ) -> Any:
+    """Handles `CustomerService.ListAccessibleCustomers`."""
+    del request, context  # Unused.
+    with self._lock:
+      self.requests += 1
+    response = customer_service.ListAccessibleCustomersResponse.pb()()
+    response.resource_names.extend(
+        f"customers/{customer_id}" for customer_id in self.customer_ids
+    )
+    return response
+
+  def handlers(self) -> list[grpc.GenericRpcHandler]:
+    """Gets the gRPC handlers of the fake services."""
+    search_request = google_ads_service.SearchGoogleAdsStreamRequest.pb()
+    list_request = customer_service.ListAccessibleCustomersRequest.pb()
+    list_response = customer_service.ListAccessibleCustomersResponse.pb()
+    return [
+        grpc.method_handlers_generic_handler(
+            f"{_SERVICES}.GoogleAdsService",
+            {
+                "SearchStream": grpc.unary_stream_rpc_method_handler(
+                    self.search_stream,
+                    request_deserializer=search_request.FromString,
+                ),
+            },
+        ),
+        grpc.method_handlers_generic_handler(
+            f"{_SERVICES}.CustomerService",
+            {
+                "ListAccessibleCustomers": grpc.unary_unary_rpc_method_handler(
+                    self.list_accessible_customers,
+                    request_deserializer=list_request.FromString,
+                    response_serializer=list_response.SerializeToString,
+                ),
+            },
+        ),
+    ]
+
+  def stats(self) -> dict[str, int]:
+    """Gets the request counters of the fake API."""
+    with self._lock:
+      return {
+          "requests": self.requests,
+          "rows": self.rows_sent,
+          "errors": self.errors,
+      }
+
+
+def make_certificate(host: str = "localhost") -> tuple[bytes, bytes]:
+  """Makes a self-signed TLS certificate.
+
+  Returns:
+      The PEM encoded private key and certificate.
+  """
+  key = ec.generate_private_key(ec.SECP256R1())
+  name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host)])
+  now = datetime.datetime.now(datetime.timezone.utc)
+  certificate = (
+      x509.CertificateBuilder()
+      .subject_name(name)
+      .issuer_name(name)
+      .public_key(key.public_key())
+      .serial_number(x509.random_serial_number())
+      .not_valid_before(now - datetime.timedelta(days=1))
+      .not_valid_after(now + datetime.timedelta(days=30))
+      .add_extension(
+          x509.SubjectAlternativeName([x509.DNSName(host)]), critical=False
+      )
+      .add_extension(
+          x509.BasicConstraints(ca=True, path_length=None), critical=True
+      )
+      .sign(key, hashes.SHA256())
+  )
+  return (
+      key.private_bytes(
+          serialization.Encoding.PEM,
+          serialization.PrivateFormat.PKCS8,
+          serialization.NoEncryption(),
+      ),
+      certificate.public_bytes(serialization.Encoding.PEM),
+  )
+
+
+class FakeAdsServer:
+  """Serves a fake Google Ads API over gRPC with TLS on localhost."""
+
+  def __init__(
+      self, api: FakeGoogleAdsApi, port: int = 0, max_workers: int = 64
+  ):
+    """Initializes the server.
+
+    Args:
+        api: The fake API served.
+        port: The port to listen on, any free port if 0.
+        max_workers: The maximum number of concurrent requests.
+    """
+    self.api = api
+    self._private_key, self.certificate = make_certificate()
+    self._server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        handlers=api.handlers(),
+    )
+    self.port = self._server.add_secure_port(
+        f"localhost:{port}",
+        grpc.ssl_server_credentials([(self._private_key, self.certificate)]),
+    )
+
+  @property
+  def endpoint(self) -> str:
+    return f"localhost:{self.port}"
+
+  def start(self):
+    self._server.start()
+
+  def stop(self, grace: float | None = None):
+    self._server.stop(grace).wait()
+
+  def write_client_config(self, directory: str) -> dict[str, str]:
+    """Writes the configuration of a client of the fake API.
+
+    Args:
+        directory: The directory of the credentials and the certificate.
+
+    Returns:
+        The environment variables pointing the MCP server at the fake API.
+    """
+    certificate_path = os.path.join(directory, CERTIFICATE_FILE)
+    with open(certificate_path, "wb") as f:
+      f.write(self.certificate)
+    credentials_path = os.path.join(directory, CREDENTIALS_FILE)
+    with open(credentials_path, "w", encoding="utf-8") as f:
+      f.write(
+          dump_yaml(
+              {
+                  # Requests authenticated with OAuth access tokens are sent
+                  # as is, the fake API does not check them.
+                  "developer_token": "fake-developer-token",
+                  "client_id": "fake-client-id",
+                  "client_secret": "fake-client-secret",
+                  "refresh_token": "fake-refresh-token",
+                  "endpoint": self.endpoint,
+                  "use_proto_plus": True,
+              }
+          )
+      )
+    return {
+        "GOOGLE_ADS_CREDENTIALS": credentials_path,
+        "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": certificate_path,
+    }
+
+
+def add_api_arguments(parser: argparse.ArgumentParser):
+  """Adds the command line flags configuring the fake API."""
+  parser.add_argument(
+      "--rows",
+      type=int,
+      default=1000,
+      help="Rows returned by queries without a LIMIT.",
+  )
+  parser.add_argument("--batch-size", type=int, default=10_000)
+  parser.add_argument(
+      "--latency",
+      type=float,
+      default=0.05,
+      help="Seconds before the first batch of a stream.",
+  )
+  parser.add_argument(
+      "--batch-latency",
+      type=float,
+      default=0.0,
+      help="Seconds between two batches of a stream.",
+  )
+  parser.add_argument(
+      "--cardinality",
+      type=int,
+      default=100,
+      help="Distinct values of ids and names.",
+  )
+  parser.add_argument(
+      "--error",
+      action="append",
+      type=ErrorRule.parse,
+      default=[],
+      metavar="ERROR_CODE:RATE[:AFTER_BATCHES]",
+      help=(
+          "Fails a share of the streams, e.g."
+          " internal_error.TRANSIENT_ERROR:0.1 or status.UNAVAILABLE:0.05:1."
+      ),
+  )
+  parser.add_argument("--seed", type=int, default=None)
+
+
+def api_from_arguments(args: argparse.Namespace) -> FakeGoogleAdsApi:
+  return FakeGoogleAdsApi(
+      rows=args.rows,
+      batch_size=args.batch_size,
+      latency=args.latency,
+      batch_latency=args.batch_latency,
+      cardinality=args.cardinality,
+      error_rules=args.error,
+      seed=args.seed,
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--port", type=int, default=50051)
+  parser.add_argument(
+      "--config-dir",
+      default=None,
+      help="Directory of the client configuration, a new one by default.",
+  )
+  add_api_arguments(parser)
+  args = parser.parse_args()
+
+  server = FakeAdsServer(api_from_arguments(args), args.port)
+  config_dir = args.config_dir or tempfile.mkdtemp(prefix="fake-ads-")
+  env = server.write_client_config(config_dir)
+  server.start()
+  print(f"Fake Google Ads API listening on {server.endpoint}.")
+  print("Point the MCP server at it with:")
+  for name, value in env.items():
+    print(f"  export {name}={value}")
+  try:
+    while True:
+      time.sleep(10)
+      print(server.api.stats())
+  except KeyboardInterrupt:
+    server.stop()
+
+
+if __name__ == "__main__":
+  main()
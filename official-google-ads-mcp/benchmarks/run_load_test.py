@@ -0,0 +1,313 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load test of the MCP server over streamable HTTP.
+
+Starts the fake Google Ads API of `benchmarks.fake_ads_server` and the MCP
+server of `ads_mcp/server.py` in a subprocess pointed at it, then runs
+concurrent MCP clients each calling a tool in a loop. Reports the throughput
+and the latency percentiles of the tool calls, and the requests the fake API
+received. With `--url`, an MCP server already running is tested instead.
+
+Each call queries one of `--customers` customers in turn, so that the
+result cache and the per-customer quotas see several customers. The
+`ADS_MCP_*` environment variables of the load test apply to the server.
+
+Usage:
+  uv run -m benchmarks.run_load_test [--clients 16] [--calls 50]
+      [--query "SELECT ..."] [--rows 1000] [--latency 0.05]
+      [--error internal_error.TRANSIENT_ERROR:0.1] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+from benchmarks import fake_ads_server
+from fastmcp import Client
+
+# The OAuth access token the clients send. The server started by the load
+# test accepts it, and the fake API does not check it.
+TOKEN = "load-test-token"
+DEFAULT_QUERY = (
+    "SELECT campaign.id, campaign.name, campaign.status, segments.date,"
+    " metrics.impressions, metrics.clicks, metrics.cost_micros"
+    " FROM campaign WHERE segments.date DURING LAST_30_DAYS"
+)
+_SERVER_START_TIMEOUT_SECONDS = 60.0
+
+
+def serve():
+  """Runs the MCP server, accepting the access token of the load test."""
+  # pylint: disable=import-outside-toplevel
+  from ads_mcp import server
+  from fastmcp.server.auth.providers.jwt import StaticTokenVerifier
+
+  # pylint: enable=import-outside-toplevel
+  server.mcp_server.auth = StaticTokenVerifier(
+      tokens={TOKEN: {"client_id": "load-test", "scopes": []}}
+  )
+  server.main()
+
+
+def _free_port() -> int:
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def _run_server(env: dict[str, str], log_path: str):
+  """Runs the MCP server in a subprocess, yielding its URL."""
+  port = _free_port()
+  with open(log_path, "w", encoding="utf-8") as log:
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "benchmarks.run_load_test", "--serve"],
+        env={
+            **os.environ,
+            **env,
+            "FASTMCP_HOST": "127.0.0.1",
+            "FASTMCP_PORT": str(port),
+            "ADS_MCP_VIEWS_REFRESH": "off",
+        },
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+  try:
+    yield f"http://127.0.0.1:{port}/mcp", process
+  finally:
+    process.terminate()
+    try:
+      process.wait(10)
+    except subprocess.TimeoutExpired:
+      process.kill()
+
+
+async def _wait_for_server(url: str, process: subprocess.Popen | None):
+  """Waits until the MCP server answers `initialize`."""
+  deadline = time.monotonic() + _SERVER_START_TIMEOUT_SECONDS
+  while True:
+    if process is not None and process.poll() is not None:
+      raise RuntimeError(f"The MCP server exited with {process.returncode}.")
+    try:
+      async with Client(url, auth=TOKEN, init_timeout=5):
+        return
+    except Exception:  # pylint: disable=broad-exception-caught
+      if time.monotonic() > deadline:
+        raise
+      await asyncio.sleep(0.2)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+  """Gets the nearest-rank percentile of sorted values."""
+  if not sorted_values:
+    return 0.0
+  rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+  return sorted_values[rank - 1]
+
+
+async def _run_client(
+    url: str,
+    tool: str,
+    arguments: list[dict[str, Any]],
+    offset: int,
+    calls: int,
+    latencies: list[float],
+    failures: list[str],
+):
+  """Calls a tool in a loop from a single MCP session."""
+  async with Client(url, auth=TOKEN) as client:
+    for i in range(calls):
+      call_arguments = arguments[(offset + i) % len(arguments)]
+      started_at = time.perf_counter()
+      try:
+        result = await client.call_tool(
+            tool, call_arguments, raise_on_error=False
+        )
+        error = result.content[0].text if result.is_error else None
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        error = f"{type(e).__name__}: {e}"
+      latencies.append(time.perf_counter() - started_at)
+      if error is not None:
+        failures.append(error)
+
+
+async def run_load(
+    url: str,
+    clients: int,
+    calls: int,
+    tool: str,
+    arguments: list[dict[str, Any]],
+) -> dict[str, Any]:
+  """Runs concurrent MCP clients calling a tool.
+
+  Args:
+      url: The streamable HTTP URL of the MCP server.
+      clients: The number of concurrent clients, each with its own session.
+      calls: The number of calls per client.
+      tool: The name of the tool called.
+      arguments: The arguments of the calls, used in turn.
+
+  Returns:
+      The number of calls and errors, the throughput and the latency
+      percentiles of the calls.
+  """
+  # One call first, so that the server loads the client libraries before
+  # the timed calls.
+  await _run_client(url, tool, arguments, 0, 1, [], [])
+  latencies: list[float] = []
+  failures: list[str] = []
+  started_at = time.perf_counter()
+  await asyncio.gather(
+      *(
+          _run_client(
+              url, tool, arguments, i * calls, calls, latencies, failures
+          )
+          for i in range(clients)
+      )
+  )
+  seconds = time.perf_counter() - started_at
+  latencies.sort()
+  return {
+      "clients": clients,
+      "calls": len(latencies),
+      "errors": len(failures),
+      "first_error": failures[0] if failures else None,
+      "seconds": round(seconds, 3),
+      "calls_per_second": round(len(latencies) / seconds, 1),
+      **{
+          f"p{p}_ms": round(percentile(latencies, p) * 1e3, 1)
+          for p in (50, 90, 99)
+      },
+      "max_ms": round(latencies[-1] * 1e3, 1) if latencies else 0.0,
+  }
+
+
+def _format_result(result: dict[str, Any]) -> str:
+  clients, calls, errors = result["clients"], result["calls"], result["errors"]
+  seconds, throughput = result["seconds"], result["calls_per_second"]
+  p50, p90, p99 = result["p50_ms"], result["p90_ms"], result["p99_ms"]
+  slowest = result["max_ms"]
+  return (
+      f"{clients:>4} clients: {calls} calls, {errors} errors in"
+      f" {seconds:.1f} s, {throughput:.1f} calls/s, p50 {p50:.0f} ms,"
+      f" p90 {p90:.0f} ms, p99 {p99:.0f} ms, max {slowest:.0f} ms"
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+  )
+  parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+  parser.add_argument(
+      "--url", help="URL of a running MCP server, started otherwise."
+  )
+  parser.add_argument("--clients", type=int, nargs="+", default=[16])
+  parser.add_argument(
+      "--calls", type=int, default=50, help="Calls per client."
+  )
+  parser.add_argument("--tool", default="execute_gaql")
+  parser.add_argument("--query", default=DEFAULT_QUERY)
+  parser.add_argument("--customers", type=int, default=10)
+  parser.add_argument(
+      "--arguments",
+      type=json.loads,
+      help="JSON arguments of the tool, instead of --query and --customers.",
+  )
+  parser.add_argument("--output", help="File to write the results to.")
+  fake_ads_server.add_api_arguments(parser)
+  args = parser.parse_args()
+  if args.serve:
+    serve()
+    return
+
+  if args.arguments is not None:
+    arguments = [args.arguments]
+  else:
+    arguments = [
+        {"query": args.query, "customer_id": str(1_000_000_000 + i)}
+        for i in range(args.customers)
+    ]
+
+  with contextlib.ExitStack() as stack:
+    fake_server = None
+    process = None
+    url = args.url
+    if url is None:
+      fake_server = fake_ads_server.FakeAdsServer(
+          fake_ads_server.api_from_arguments(args)
+      )
+      config_dir = stack.enter_context(tempfile.TemporaryDirectory())
+      env = fake_server.write_client_config(config_dir)
+      fake_server.start()
+      stack.callback(fake_server.stop)
+      log_path = os.path.join(config_dir, "server.log")
+      url, process = stack.enter_context(_run_server(env, log_path))
+      try:
+        asyncio.run(_wait_for_server(url, process))
+      except Exception:
+        with open(log_path, encoding="utf-8") as f:
+          print(f.read()[-4000:], file=sys.stderr)
+        raise
+
+    results = []
+    for clients in args.clients:
+      api_stats = fake_server.api.stats() if fake_server else None
+      result = asyncio.run(
+          run_load(url, clients, args.calls, args.tool, arguments)
+      )
+      if fake_server is not None:
+        after = fake_server.api.stats()
+        result["api"] = {key: after[key] - api_stats[key] for key in after}
+      results.append(result)
+      print(_format_result(result))
+      if result["first_error"]:
+        first_error = result["first_error"][:200]
+        print(f"  first error: {first_error}")
+      if "api" in result:
+        api_stats = result["api"]
+        print(f"  fake API: {api_stats}")
+
+  if args.output:
+    with open(args.output, "w", encoding="utf-8") as f:
+      json.dump(
+          {
+              "created_at": datetime.datetime.now(
+                  datetime.timezone.utc
+              ).isoformat(),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "tool": args.tool,
+              "arguments": arguments,
+              "results": results,
+          },
+          f,
+          indent=2,
+      )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,123 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Synthetic Google Ads API results for the benchmarks.
+
+Rows look like search term report rows: ids, names, enums, a nested keyword
+info message, dates, micros and other metrics. Batches are built once and
+reused, so that a stream of a million rows neither takes long to generate
+nor holds a million messages in memory.
+"""
+
+from collections.abc import Iterator
+import itertools
+
+from google.ads.googleads.v21.enums.types.campaign_status import CampaignStatusEnum
+from google.ads.googleads.v21.enums.types.keyword_match_type import KeywordMatchTypeEnum
+from google.ads.googleads.v21.services.types.google_ads_service import GoogleAdsRow
+from google.ads.googleads.v21.services.types.google_ads_service import SearchGoogleAdsStreamResponse
+
+PATHS = [
+    "campaign.id",
+    "campaign.name",
+    "campaign.status",
+    "ad_group.id",
+    "search_term_view.search_term",
+    "segments.keyword.info",
+    "segments.date",
+    "metrics.impressions",
+    "metrics.clicks",
+    "metrics.cost_micros",
+    "metrics.conversions",
+]
+
+FIELD_METADATA = {
+    "campaign.id": {"data_type": "INT64", "is_repeated": False},
+    "campaign.name": {"data_type": "STRING", "is_repeated": False},
+    "campaign.status": {"data_type": "ENUM", "is_repeated": False},
+    "ad_group.id": {"data_type": "INT64", "is_repeated": False},
+    "search_term_view.search_term": {
+        "data_type": "STRING",
+        "is_repeated": False,
+    },
+    "segments.keyword.info": {"data_type": "MESSAGE", "is_repeated": False},
+    "segments.date": {"data_type": "DATE", "is_repeated": False},
+    "metrics.impressions": {"data_type": "INT64", "is_repeated": False},
+    "metrics.clicks": {"data_type": "INT64", "is_repeated": False},
+    "metrics.cost_micros": {"data_type": "INT64", "is_repeated": False},
+    "metrics.conversions": {"data_type": "DOUBLE", "is_repeated": False},
+}
+
+# The Google Ads API streams up to 10,000 rows per batch.
+BATCH_SIZE = 10_000
+# Distinct batches built for a stream, reused in turn.
+_DISTINCT_BATCHES = 4
+
+
+def make_row(i: int) -> GoogleAdsRow:
+  """Builds a synthetic search term row."""
+  row = GoogleAdsRow()
+  row.campaign.id = 1000 + i % 20
+  row.campaign.name = f"Campaign {i % 20}"
+  row.campaign.status = CampaignStatusEnum.CampaignStatus.ENABLED
+  row.ad_group.id = 5000 + i % 300
+  row.search_term_view.search_term = f"moving company near me {i}"
+  row.segments.keyword.info.text = f"movers {i % 50}"
+  row.segments.keyword.info.match_type = (
+      KeywordMatchTypeEnum.KeywordMatchType.PHRASE
+  )
+  row.segments.date = f"2025-01-{1 + i % 28:02d}"
+  row.metrics.impressions = i * 7
+  row.metrics.clicks = i
+  row.metrics.cost_micros = i * 1_250_000
+  row.metrics.conversions = i / 10
+  return row
+
+
+def make_rows(count: int) -> list[GoogleAdsRow]:
+  """Builds synthetic search term rows."""
+  return [make_row(i) for i in range(count)]
+
+
+def make_batch(
+    start: int, size: int, paths: list[str] | None = None
+) -> SearchGoogleAdsStreamResponse:
+  """Builds a `search_stream` batch of synthetic rows."""
+  batch = SearchGoogleAdsStreamResponse()
+  batch.results.extend(make_row(i) for i in range(start, start + size))
+  batch.field_mask.paths.extend(paths or PATHS)
+  return batch
+
+
+def make_stream(
+    rows: int, batch_size: int = BATCH_SIZE
+) -> Iterator[SearchGoogleAdsStreamResponse]:
+  """Builds the batches of a `search_stream` call returning some rows.
+
+  Args:
+      rows: The number of rows of the stream.
+      batch_size: The number of rows per batch, but the last one.
+
+  Returns:
+      An iterator over the batches. Full batches are built once and yielded
+      again in turn, so they must not be modified.
+  """
+  batches = [
+      make_batch(i * batch_size, batch_size)
+      for i in range(min(_DISTINCT_BATCHES, rows // batch_size))
+  ]
+  full_batches = itertools.islice(itertools.cycle(batches), rows // batch_size)
+  yield from full_batches
+  if rows % batch_size:
+    yield make_batch(rows - rows % batch_size, rows % batch_size)
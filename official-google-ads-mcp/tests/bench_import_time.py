@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the import time of the MCP server entry points.
+
+Runs `python -X importtime` on a fresh interpreter for each entry point and
+reports the total import time and the slowest top-level imports. Clients
+such as Claude Desktop start the stdio server for every session, so its
+import time is paid before every `initialize`.
+
+Usage:
+  uv run -m tests.bench_import_time [--module ads_mcp.stdio] [--runs 5]
+"""
+
+import argparse
+import collections
+import statistics
+import subprocess
+import sys
+
+
+def import_times(module: str) -> dict[str, int]:
+  """Imports a module in a fresh interpreter.
+
+  Args:
+      module: The module to import.
+
+  Returns:
+      The cumulative import time of each imported module, in microseconds.
+  """
+  result = subprocess.run(
+      [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+      capture_output=True,
+      check=True,
+      text=True,
+  )
+  times = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith("import time:") or "[us]" in line:
+      continue
+    _, cumulative, name = line.removeprefix("import time:").split("|")
+    name = name.removeprefix(" ")
+    depth = (len(name) - len(name.lstrip())) // 2
+    # Keep the module and the modules it imports directly.
+    if depth == 1 or name == module:
+      times[name.strip()] = int(cumulative)
+  return times
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--module", default="ads_mcp.stdio")
+  parser.add_argument("--runs", type=int, default=5)
+  parser.add_argument("--top", type=int, default=10)
+  args = parser.parse_args()
+
+  totals = []
+  by_import = collections.defaultdict(list)
+  for _ in range(args.runs):
+    times = import_times(args.module)
+    totals.append(times.pop(args.module))
+    for name, cumulative in times.items():
+      by_import[name].append(cumulative)
+
+  print(
+      f"{args.module}: median {statistics.median(totals) / 1000:.1f} ms,"
+      f" min {min(totals) / 1000:.1f} ms over {args.runs} runs"
+  )
+  slowest = sorted(
+      by_import.items(),
+      key=lambda item: statistics.median(item[1]),
+      reverse=True,
+  )
+  for name, cumulative in slowest[: args.top]:
+    print(f"  {statistics.median(cumulative) / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+  main()
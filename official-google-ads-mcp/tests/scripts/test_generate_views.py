@@ -13,14 +13,20 @@
 # limitations under the License.
 
 """Tests for the view generation script."""
+
+import json
+import pathlib
 from unittest import mock
 
+from ads_mcp.docs_index import DocsIndex
+from ads_mcp.scripts import generate_views
 from ads_mcp.scripts.generate_views import get_fields_obj
-from ads_mcp.scripts.generate_views import get_view_json
 from ads_mcp.scripts.generate_views import get_view_json_url
 from ads_mcp.scripts.generate_views import save_view_yaml
 from ads_mcp.scripts.generate_views import update_views_yaml
+import httpx
 import pytest
+import yaml
 
 
 def test_get_view_json_url():
@@ -31,16 +37,6 @@ def test_get_view_json_url():
   )
 
 
-@pytest.mark.asyncio
-@mock.patch("httpx.AsyncClient.get", new_callable=mock.AsyncMock)
-async def test_get_view_json(mock_get):
-  """Tests the get_view_json function."""
-  mock_response = mock.MagicMock()
-  mock_response.json.return_value = {"name": "campaign"}
-  mock_get.return_value = mock_response
-  assert await get_view_json("campaign") == {"name": "campaign"}
-
-
 def test_get_fields_obj():
   """Tests the get_fields_obj function."""
   view_json = {
@@ -77,59 +73,281 @@ def test_get_fields_obj():
   assert get_fields_obj(view_json, "attributes") == expected
 
 
+VIEW_JSON = {
+    "display_name": "Campaign",
+    "name": "campaign",
+    "description": "A campaign.",
+    "attributes": ["campaign.id"],
+    "segments": [],
+    "metrics": [],
+    "fields": {
+        "campaign.id": {
+            "field_details": {
+                "name": "campaign.id",
+                "description": "The ID of the campaign.",
+                "category": "ATTRIBUTE",
+                "data_type": "INT64",
+                "is_repeated": False,
+                "enum_values": [],
+                "filterable": True,
+                "sortable": True,
+            }
+        }
+    },
+}
+
+
+def _response(status_code, json_data=None, headers=None):
+  return httpx.Response(
+      status_code,
+      json=json_data,
+      headers=headers,
+      request=httpx.Request("GET", "https://example.com"),
+  )
+
+
+@pytest.mark.asyncio
+@mock.patch("asyncio.sleep", new_callable=mock.AsyncMock)
+@mock.patch("httpx.AsyncClient.get", new_callable=mock.AsyncMock)
+async def test_fetch_view_json_retries_transient_errors(mock_get, mock_sleep):
+  """Tests that server errors and transport errors are retried."""
+  mock_get.side_effect = [
+      _response(503),
+      httpx.ConnectError("Connection refused."),
+      _response(200, {"name": "campaign"}, {"ETag": '"abc"'}),
+  ]
+
+  view_json, validators = await generate_views.fetch_view_json("campaign")
+
+  assert view_json == {"name": "campaign"}
+  assert validators == {"etag": '"abc"'}
+  assert mock_get.call_count == 3
+  assert mock_sleep.call_count == 2
+
+
+@pytest.mark.asyncio
+@mock.patch("asyncio.sleep", new_callable=mock.AsyncMock)
+@mock.patch("httpx.AsyncClient.get", new_callable=mock.AsyncMock)
+async def test_fetch_view_json_gives_up(mock_get, _):
+  """Tests that the last error is raised once retries are exhausted."""
+  mock_get.return_value = _response(502)
+
+  with pytest.raises(httpx.HTTPStatusError):
+    await generate_views.fetch_view_json("campaign")
+  assert mock_get.call_count == generate_views.MAX_FETCH_ATTEMPTS
+
+
+@pytest.mark.asyncio
+@mock.patch("httpx.AsyncClient.get", new_callable=mock.AsyncMock)
+async def test_fetch_view_json_not_modified(mock_get):
+  """Tests that validators are sent as conditional request headers."""
+  mock_get.return_value = _response(304)
+
+  with pytest.raises(generate_views.ViewNotModified):
+    await generate_views.fetch_view_json(
+        "campaign",
+        {"etag": '"abc"', "last_modified": "Wed, 01 Oct 2025 00:00:00 GMT"},
+    )
+  assert mock_get.call_args.kwargs["headers"] == {
+      "If-None-Match": '"abc"',
+      "If-Modified-Since": "Wed, 01 Oct 2025 00:00:00 GMT",
+  }
+
+
 @pytest.mark.asyncio
 @mock.patch(
-    "ads_mcp.scripts.generate_views.get_view_json", new_callable=mock.AsyncMock
+    "ads_mcp.scripts.generate_views.fetch_view_json",
+    new_callable=mock.AsyncMock,
 )
-@mock.patch("builtins.open", new_callable=mock.mock_open)
-@mock.patch("yaml.safe_dump")
-async def test_save_view_yaml(mock_safe_dump, mock_open, mock_get_view_json):
+async def test_save_view_yaml(mock_fetch_view_json, tmp_path):
   """Tests the save_view_yaml function."""
-  mock_get_view_json.return_value = {
-      "display_name": "Campaign",
-      "name": "campaign",
-      "description": "A campaign.",
-      "attributes": ["campaign.id"],
-      "segments": [],
-      "metrics": [],
-      "fields": {
-          "campaign.id": {
-              "field_details": {
-                  "name": "campaign.id",
-                  "description": "The ID of the campaign.",
-                  "category": "ATTRIBUTE",
-                  "data_type": "INT64",
-                  "is_repeated": False,
-                  "enum_values": [],
-                  "filterable": True,
-                  "sortable": True,
-              }
-          }
+  mock_fetch_view_json.return_value = (VIEW_JSON, {"etag": '"abc"'})
+
+  validators = await save_view_yaml("campaign", path=str(tmp_path))
+
+  assert validators == {"etag": '"abc"'}
+  assert [p.name for p in tmp_path.iterdir()] == ["campaign.yaml"]
+  view_data = yaml.safe_load((tmp_path / "campaign.yaml").read_text())
+  assert view_data["name"] == "campaign"
+  assert list(view_data["attributes"]) == ["campaign.id"]
+
+
+@pytest.mark.asyncio
+@mock.patch(
+    "ads_mcp.scripts.generate_views.fetch_view_json",
+    new_callable=mock.AsyncMock,
+)
+async def test_save_view_yaml_not_modified(mock_fetch_view_json, tmp_path):
+  """Tests that an unchanged view is left as is."""
+  (tmp_path / "campaign.yaml").write_text("name: campaign\n")
+  mock_fetch_view_json.side_effect = generate_views.ViewNotModified()
+
+  validators = await save_view_yaml(
+      "campaign", path=str(tmp_path), validators={"etag": '"abc"'}
+  )
+
+  assert validators == {"etag": '"abc"'}
+  assert (tmp_path / "campaign.yaml").read_text() == "name: campaign\n"
+  mock_fetch_view_json.assert_called_once_with("campaign", {"etag": '"abc"'})
+
+
+@pytest.fixture(name="context_path")
+def fixture_context_path(tmp_path):
+  (tmp_path / "views").mkdir()
+  (tmp_path / "views.yaml").write_text("- campaign\n- ad_group\n")
+  with mock.patch.multiple(
+      generate_views,
+      CONTEXT_PATH=str(tmp_path),
+      VIEWS_PATH=str(tmp_path / "views"),
+      STAGING_PATH=str(tmp_path / ".views-staging"),
+      BUNDLE_PATH=str(tmp_path / "views-v21.json"),
+      DOCS_INDEX=DocsIndex(root=str(tmp_path), check_interval=0),
+  ):
+    yield tmp_path
+
+
+async def _fake_save_view_yaml(view, path=".", validators=None):
+  del validators  # Unused.
+  (pathlib.Path(path) / f"{view}.yaml").write_text(f"name: {view}\n")
+  return {"etag": f'"{view}"'}
+
+
+@pytest.mark.asyncio
+@mock.patch(
+    "ads_mcp.scripts.generate_views.save_view_yaml",
+    new_callable=mock.AsyncMock,
+)
+async def test_update_views_yaml(mock_save_view_yaml, context_path):
+  """Tests the update_views_yaml function."""
+  mock_save_view_yaml.side_effect = _fake_save_view_yaml
+
+  assert not await update_views_yaml()
+
+  assert mock_save_view_yaml.call_count == 2
+  assert (context_path / ".api-version").read_text() == "v21"
+  manifest = json.loads(
+      (context_path / "views" / ".manifest.json").read_text()
+  )
+  assert manifest == {
+      "api_version": "v21",
+      "completed": ["ad_group", "campaign"],
+      "views": {
+          "campaign": {"etag": '"campaign"'},
+          "ad_group": {"etag": '"ad_group"'},
       },
   }
-  await save_view_yaml("campaign", path="/fake/dir")
-  mock_open.assert_called_with(
-      "/fake/dir/campaign.yaml", "w", encoding="utf-8"
-  )
-  mock_safe_dump.assert_called_once()
+
+  bundle = json.loads((context_path / "views-v21.json").read_text())
+  assert bundle["api_version"] == "v21"
+  assert sorted(bundle["views"]) == ["ad_group", "campaign"]
+
+  # Up to date for this API version, nothing is fetched.
+  (context_path / ".api-version").unlink()
+  assert not await update_views_yaml()
+  assert mock_save_view_yaml.call_count == 2
 
 
 @pytest.mark.asyncio
-@mock.patch("os.path.isfile")
-@mock.patch("builtins.open", new_callable=mock.mock_open)
-@mock.patch("yaml.safe_load")
 @mock.patch(
     "ads_mcp.scripts.generate_views.save_view_yaml",
     new_callable=mock.AsyncMock,
 )
-async def test_update_views_yaml(
-    mock_save_view_yaml, mock_safe_load, mock_open, mock_isfile
+async def test_update_views_yaml_resumes_after_failure(
+    mock_save_view_yaml, context_path
 ):
-  """Tests the update_views_yaml function."""
-  mock_isfile.return_value = False
-  mock_safe_load.return_value = ["campaign", "ad_group"]
+  """Tests that only the views that failed are fetched again."""
+
+  async def fail_ad_group(view, path=".", validators=None):
+    if view == "ad_group":
+      raise httpx.ConnectError("Connection refused.")
+    return await _fake_save_view_yaml(view, path, validators)
+
+  mock_save_view_yaml.side_effect = fail_ad_group
+  assert await update_views_yaml() == ["ad_group"]
+  assert not (context_path / ".api-version").exists()
+
+  mock_save_view_yaml.reset_mock()
+  mock_save_view_yaml.side_effect = _fake_save_view_yaml
+  assert not await update_views_yaml()
+
+  assert [c.args[0] for c in mock_save_view_yaml.call_args_list] == [
+      "ad_group"
+  ]
+  assert (context_path / ".api-version").read_text() == "v21"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("context_path")
+@mock.patch(
+    "ads_mcp.scripts.generate_views.save_view_yaml",
+    new_callable=mock.AsyncMock,
+)
+async def test_update_views_yaml_force(mock_save_view_yaml):
+  """Tests that a forced update sends the validators of every view."""
+  mock_save_view_yaml.side_effect = _fake_save_view_yaml
   await update_views_yaml()
-  assert mock_save_view_yaml.call_count == 2
-  mock_open.assert_any_call(
-      mock.ANY, "w", encoding="utf-8"
-  )  # Check for write call
+  mock_save_view_yaml.reset_mock()
+
+  assert not await update_views_yaml(force=True)
+
+  assert sorted(
+      (c.args[0], c.args[2]) for c in mock_save_view_yaml.call_args_list
+  ) == [
+      ("ad_group", {"etag": '"ad_group"'}),
+      ("campaign", {"etag": '"campaign"'}),
+  ]
+
+
+@pytest.mark.asyncio
+@mock.patch(
+    "ads_mcp.scripts.generate_views.save_view_yaml",
+    new_callable=mock.AsyncMock,
+)
+async def test_update_views_yaml_staged(mock_save_view_yaml, context_path):
+  """Tests that staged views are swapped in once all of them are saved."""
+  docs_index = generate_views.DOCS_INDEX
+  (context_path / "views" / "campaign.yaml").write_text("name: old\n")
+  assert docs_index.get_view("campaign") == {"name": "old"}
+
+  async def fail_ad_group(view, path=".", validators=None):
+    if view == "ad_group":
+      raise httpx.ConnectError("Connection refused.")
+    return await _fake_save_view_yaml(view, path, validators)
+
+  mock_save_view_yaml.side_effect = fail_ad_group
+  assert await update_views_yaml(staged=True) == ["ad_group"]
+  assert docs_index.get_view("campaign") == {"name": "old"}
+  assert docs_index.get_view("ad_group") is None
+
+  mock_save_view_yaml.side_effect = _fake_save_view_yaml
+  assert not await update_views_yaml(staged=True)
+
+  assert mock_save_view_yaml.call_count == 3
+  assert docs_index.get_view("campaign")["name"] == "campaign"
+  assert docs_index.get_view("ad_group")["name"] == "ad_group"
+  assert not (context_path / ".views-staging").exists()
+  assert not (context_path / "views.old").exists()
+  assert (context_path / ".api-version").read_text() == "v21"
+
+
+@mock.patch(
+    "ads_mcp.scripts.generate_views.update_views_yaml",
+    new_callable=mock.AsyncMock,
+)
+def test_start_views_refresh(mock_update_views_yaml):
+  """Tests the refresh modes of the server startup."""
+  mock_update_views_yaml.return_value = []
+
+  thread = generate_views.start_views_refresh("background")
+  thread.join(timeout=5)
+  assert not thread.is_alive()
+  mock_update_views_yaml.assert_called_once_with(staged=True)
+
+  assert generate_views.start_views_refresh("startup") is None
+  assert mock_update_views_yaml.call_count == 2
+
+  assert generate_views.start_views_refresh("off") is None
+  assert mock_update_views_yaml.call_count == 2
+
+  with pytest.raises(ValueError):
+    generate_views.start_views_refresh("sometimes")
@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the aggregation of GAQL results."""
+
+from ads_mcp import aggregation
+import pytest
+
+_COLUMNS = ["campaign.name", "segments.date", "metrics.cost_micros"]
+_ROWS = [
+    ["a", "2025-01-01", 1_000_000],
+    ["b", "2025-01-01", 3_000_000],
+    ["a", "2025-01-02", 2_500_000],
+    ["c", "2025-01-02", None],
+]
+
+
+@pytest.mark.parametrize(
+    ("text", "name"),
+    [
+        ("sum(metrics.clicks)", "sum(metrics.clicks)"),
+        ("AVG( metrics.ctr )", "avg(metrics.ctr)"),
+        ("metrics.clicks", "sum(metrics.clicks)"),
+        ("count(*)", "count(*)"),
+    ],
+)
+def test_parse_aggregate(text, name):
+  assert aggregation.Aggregate.parse(text).name == name
+
+
+@pytest.mark.parametrize(
+    "text", ["median(metrics.clicks)", "sum(*)", "sum(metrics.clicks"]
+)
+def test_parse_invalid_aggregate(text):
+  with pytest.raises(ValueError):
+    aggregation.Aggregate.parse(text)
+
+
+def test_aggregation():
+  aggregator = aggregation.Aggregation(
+      ["campaign.name"],
+      [
+          "sum(metrics.cost_micros)",
+          "count(*)",
+          "count(metrics.cost_micros)",
+          "avg(metrics.cost_micros)",
+          "max(segments.date)",
+          "count_distinct(segments.date)",
+      ],
+  )
+
+  aggregator.add(_COLUMNS, _ROWS[:2])
+  aggregator.add(_COLUMNS, _ROWS[2:])
+
+  assert aggregator.columns[:3] == [
+      "campaign.name",
+      "sum(metrics.cost_micros)",
+      "count(*)",
+  ]
+  assert aggregator.result(convert_micros=True) == [
+      ["a", 3.5, 2, 2, 1.75, "2025-01-02", 2],
+      ["b", 3.0, 1, 1, 3.0, "2025-01-01", 1],
+      ["c", 0.0, 1, 0, None, "2025-01-02", 1],
+  ]
+  assert aggregator.group_count == 3
+  assert aggregator.rows_read == 4
+
+
+def test_aggregation_order_and_limit():
+  aggregator = aggregation.Aggregation(
+      ["campaign.name"],
+      ["metrics.cost_micros", "count(*)"],
+      order_by="count(*) DESC, campaign.name DESC",
+      limit=2,
+  )
+  aggregator.add(_COLUMNS, _ROWS)
+
+  assert aggregator.result() == [["a", 3_500_000, 2], ["c", 0, 1]]
+
+  aggregator = aggregation.Aggregation(
+      ["campaign.name"],
+      ["max(metrics.cost_micros)"],
+      "max(metrics.cost_micros) ASC",
+      2,
+  )
+  aggregator.add(_COLUMNS, _ROWS)
+
+  assert aggregator.result() == [["a", 2_500_000], ["b", 3_000_000]]
+
+
+def test_aggregation_without_groups():
+  aggregator = aggregation.Aggregation([], ["sum(metrics.cost_micros)"])
+  aggregator.add(_COLUMNS, _ROWS)
+  aggregator.reset()
+  aggregator.add(_COLUMNS, _ROWS)
+
+  assert aggregator.result() == [[6_500_000]]
+  assert aggregator.rows_read == 4
+
+
+def test_aggregation_errors():
+  with pytest.raises(ValueError, match="Cannot order by"):
+    aggregation.Aggregation(["campaign.name"], ["count(*)"], "segments.date")
+
+  aggregator = aggregation.Aggregation(["campaign.id"], ["count(*)"])
+  with pytest.raises(ValueError, match="does not select campaign.id"):
+    aggregator.add(_COLUMNS, _ROWS)
+
+  aggregator = aggregation.Aggregation([], ["sum(campaign.name)"])
+  with pytest.raises(ValueError, match="not numbers"):
+    aggregator.add(_COLUMNS, _ROWS)
+
+  aggregator = aggregation.Aggregation(
+      ["campaign.name"], ["count(*)"], max_groups=2
+  )
+  with pytest.raises(ValueError, match="more than 2 groups"):
+    aggregator.add(_COLUMNS, _ROWS)
@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the server-held cursors."""
+
+import time
+from unittest import mock
+
+from ads_mcp import cursors
+import pytest
+
+
+class FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+def test_checkout_extends_ttl():
+  """Tests that using a cursor keeps it alive."""
+  clock = FakeClock()
+  store = cursors.CursorStore(ttl_seconds=10, max_cursors=5, clock=clock)
+  value = mock.Mock()
+  cursor_id = store.add(value)
+  clock.now = 8
+  assert store.checkout(cursor_id).value is value
+  clock.now = 16
+  assert store.checkout(cursor_id).value is value
+  value.close.assert_not_called()
+
+
+def test_idle_cursor_expires():
+  """Tests that idle cursors expire and their value is closed."""
+  clock = FakeClock()
+  store = cursors.CursorStore(ttl_seconds=10, max_cursors=5, clock=clock)
+  value = mock.Mock()
+  cursor_id = store.add(value)
+  clock.now = 11
+  with pytest.raises(KeyError):
+    store.checkout(cursor_id)
+  value.close.assert_called_once()
+  assert not store
+
+
+def test_abandoned_cursor_swept():
+  """Tests that idle cursors are closed without further cursor activity."""
+  clock = FakeClock()
+  store = cursors.CursorStore(
+      ttl_seconds=10, max_cursors=5, clock=clock, sweep_seconds=0.01
+  )
+  value = mock.Mock()
+  store.add(value)
+  clock.now = 11
+  deadline = time.monotonic() + 5
+  while not value.close.called and time.monotonic() < deadline:
+    time.sleep(0.01)
+  value.close.assert_called_once()
+  assert not store
+
+
+def test_oldest_cursor_evicted():
+  """Tests that the number of cursors is bounded."""
+  store = cursors.CursorStore(ttl_seconds=10, max_cursors=2)
+  values = [mock.Mock() for _ in range(3)]
+  cursor_ids = [store.add(value) for value in values]
+  assert len(store) == 2
+  values[0].close.assert_called_once()
+  with pytest.raises(KeyError):
+    store.checkout(cursor_ids[0])
+  assert store.checkout(cursor_ids[2]).value is values[2]
+
+
+def test_checkout_checks_owner():
+  """Tests that a cursor can only be used by its owner."""
+  store = cursors.CursorStore(ttl_seconds=10, max_cursors=2)
+  cursor_id = store.add(mock.Mock(), owner="a")
+  with pytest.raises(KeyError):
+    store.checkout(cursor_id, owner="b")
+  with pytest.raises(KeyError):
+    store.checkout(cursor_id)
+  assert store.checkout(cursor_id, owner="a")
+
+
+def test_release():
+  """Tests that released cursors are closed and removed."""
+  store = cursors.CursorStore(ttl_seconds=10, max_cursors=2)
+  value = mock.Mock()
+  cursor_id = store.add(value)
+  store.release(cursor_id)
+  value.close.assert_called_once()
+  with pytest.raises(KeyError):
+    store.checkout(cursor_id)
+  store.release(cursor_id)  # Releasing twice is a no-op.
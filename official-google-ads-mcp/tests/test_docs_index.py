@@ -0,0 +1,204 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the in-memory docs index."""
+
+import json
+import os
+
+from ads_mcp import docs_index
+from ads_mcp.docs_index import DocsIndex
+import yaml
+
+
+class FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+def _write(path, text, mtime_ns):
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(text, encoding="utf-8")
+  os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_read_text_is_cached_until_the_file_changes(tmp_path):
+  clock = FakeClock()
+  index = DocsIndex(root=str(tmp_path), check_interval=1.0, clock=clock)
+  _write(tmp_path / "GAQL.md", "v1", 1_000_000_000)
+
+  assert index.read_text("GAQL.md") == "v1"
+
+  _write(tmp_path / "GAQL.md", "v2", 2_000_000_000)
+  assert index.read_text("GAQL.md") == "v1"  # Not checked again yet.
+
+  clock.now = 1.0
+  assert index.read_text("GAQL.md") == "v2"
+
+
+def test_read_text_missing_file(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=0)
+
+  assert index.read_text("missing.md") is None
+
+  _write(tmp_path / "missing.md", "found", 1_000_000_000)
+  assert index.read_text("missing.md") == "found"
+
+
+def test_get_view_fields(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=0)
+  _write(
+      tmp_path / "views" / "campaign.yaml",
+      "attributes:\n"
+      "  campaign.status:\n"
+      "    data_type: ENUM\n"
+      "segments:\n"
+      "  segments.date:\n"
+      "    data_type: DATE\n"
+      "metrics:\n"
+      "  metrics.cost_micros:\n"
+      "    data_type: INT64\n",
+      1_000_000_000,
+  )
+
+  fields = index.get_view_fields("campaign")
+
+  assert fields == {
+      "campaign.status": {"data_type": "ENUM"},
+      "segments.date": {"data_type": "DATE"},
+      "metrics.cost_micros": {"data_type": "INT64"},
+  }
+  assert index.get_view_fields("campaign") is fields
+
+
+def test_get_view_fields_reloads_changed_view(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=0)
+  view_path = tmp_path / "views" / "campaign.yaml"
+  _write(view_path, "metrics:\n  metrics.clicks: {}\n", 1_000_000_000)
+  assert list(index.get_view_fields("campaign")) == ["metrics.clicks"]
+
+  _write(view_path, "metrics:\n  metrics.impressions: {}\n", 2_000_000_000)
+
+  assert list(index.get_view_fields("campaign")) == ["metrics.impressions"]
+
+
+def test_get_view_unknown_or_invalid_name(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=0)
+  _write(tmp_path / "secret.yaml", "attributes: {}\n", 1_000_000_000)
+
+  assert index.get_view("campaign") is None
+  assert index.get_view_text("../secret") is None
+  assert index.get_view_fields("../secret") == {}
+
+
+def test_invalidate(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=3600)
+  _write(tmp_path / "GAQL.md", "v1", 1_000_000_000)
+  assert index.read_text("GAQL.md") == "v1"
+  _write(tmp_path / "GAQL.md", "v2", 2_000_000_000)
+
+  index.invalidate()
+
+  assert index.read_text("GAQL.md") == "v2"
+
+
+def test_replace_views(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=3600)
+  _write(tmp_path / "views" / "campaign.yaml", "name: old\n", 1_000_000_000)
+  assert index.get_view("campaign") == {"name": "old"}
+  version, _ = index.list_views()
+  _write(tmp_path / "new" / "campaign.yaml", "name: new\n", 1_000_000_000)
+  _write(tmp_path / "new" / "ad_group.yaml", "name: new\n", 1_000_000_000)
+
+  index.replace_views(str(tmp_path / "new"))
+
+  assert index.get_view("campaign") == {"name": "new"}
+  new_version, views = index.list_views()
+  assert new_version != version
+  assert views == ("ad_group", "campaign")
+  assert sorted(p.name for p in tmp_path.iterdir()) == ["views"]
+
+
+def _campaign_view(name_description):
+  return {
+      "name": "campaign",
+      "attributes": {
+          "campaign.name": {"data_type": "STRING"},
+          "customer.descriptive_name": {"description": name_description},
+      },
+      "segments": {},
+      "metrics": {"metrics.clicks": {"data_type": "INT64"}},
+  }
+
+
+def test_build_bundle_shares_field_metadata():
+  ad_group_view = {
+      "name": "ad_group",
+      "attributes": {
+          "customer.descriptive_name": {"description": "Other."},
+      },
+      "metrics": {"metrics.clicks": {"data_type": "INT64"}},
+  }
+
+  bundle = docs_index.build_bundle(
+      {"campaign": _campaign_view("Name."), "ad_group": ad_group_view}
+  )
+
+  assert bundle["fields"] == {
+      "customer.descriptive_name": {"description": "Other."},
+      "metrics.clicks": {"data_type": "INT64"},
+      "campaign.name": {"data_type": "STRING"},
+  }
+  assert bundle["views"]["campaign"]["attributes"] == [
+      "campaign.name",
+      {"customer.descriptive_name": {"description": "Name."}},
+  ]
+  assert bundle["views"]["campaign"]["metrics"] == ["metrics.clicks"]
+
+
+def test_views_are_served_from_bundle(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=0)
+  _write(tmp_path / "views" / "stale.yaml", "name: stale\n", 1_000_000_000)
+  view = _campaign_view("Name.")
+  _write(
+      tmp_path / docs_index.bundle_file_name(),
+      json.dumps(docs_index.build_bundle({"campaign": view})),
+      1_000_000_000,
+  )
+
+  assert index.list_views()[1] == ("campaign",)
+  assert index.get_view("campaign") == view
+  assert index.get_view("stale") is None
+  assert yaml.safe_load(index.get_view_text("campaign")) == view
+  assert list(index.get_view_fields("campaign")) == [
+      "campaign.name",
+      "customer.descriptive_name",
+      "metrics.clicks",
+  ]
+
+
+def test_bundle_of_other_api_version_is_ignored(tmp_path):
+  index = DocsIndex(root=str(tmp_path), check_interval=0)
+  _write(tmp_path / "views" / "campaign.yaml", "name: yaml\n", 1_000_000_000)
+  _write(
+      tmp_path / docs_index.bundle_file_name(),
+      json.dumps(docs_index.build_bundle({}, api_version="v1")),
+      1_000_000_000,
+  )
+
+  assert index.get_view("campaign") == {"name": "yaml"}
@@ -0,0 +1,131 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the export of GAQL results to files."""
+
+import json
+import os
+
+from ads_mcp import exports
+import pytest
+
+_COLUMNS = ["campaign.id", "campaign.name", "campaign.labels"]
+_ROWS = [
+    [1, "a", ["x"]],
+    [2, None, []],
+]
+
+
+def test_resolve_path(tmp_path):
+  root = str(tmp_path)
+
+  assert exports.resolve_path("a/b.csv", root) == str(tmp_path / "a" / "b.csv")
+  assert exports.resolve_path(str(tmp_path / "c.csv"), root) == str(
+      tmp_path / "c.csv"
+  )
+  for path in ("../d.csv", "/etc/passwd", "."):
+    with pytest.raises(ValueError, match="ADS_MCP_EXPORT_DIR"):
+      exports.resolve_path(path, root)
+
+
+def test_export_csv(tmp_path):
+  path = str(tmp_path / "reports" / "campaigns.csv")
+  exporter = exports.Exporter(path, "csv")
+  exporter.write(_COLUMNS, _ROWS[:1])
+  exporter.write(_COLUMNS, _ROWS[1:])
+  summary = exporter.finish(_COLUMNS)
+
+  with open(path, encoding="utf-8") as f:
+    assert f.read().splitlines() == [
+        "campaign.id,campaign.name,campaign.labels",
+        '1,a,"[""x""]"',
+        "2,,[]",
+    ]
+  assert summary == {
+      "path": path,
+      "format": "csv",
+      "rows": 2,
+      "schema": {
+          "campaign.id": "int64",
+          "campaign.name": "string",
+          "campaign.labels": "list",
+      },
+      "bytes": os.path.getsize(path),
+  }
+  assert os.listdir(tmp_path / "reports") == ["campaigns.csv"]
+
+
+def test_export_jsonl_after_reset(tmp_path):
+  path = str(tmp_path / "campaigns.jsonl")
+  exporter = exports.Exporter(path, "jsonl")
+  exporter.write(_COLUMNS, _ROWS)
+  exporter.reset()
+  exporter.write(_COLUMNS, _ROWS[1:])
+  summary = exporter.finish(_COLUMNS)
+
+  with open(path, encoding="utf-8") as f:
+    lines = f.read().splitlines()
+  assert [json.loads(line) for line in lines] == [
+      {"campaign.id": 2, "campaign.name": None, "campaign.labels": []}
+  ]
+  assert summary["rows"] == 1
+  assert os.listdir(tmp_path) == ["campaigns.jsonl"]
+
+
+def test_export_without_rows(tmp_path):
+  path = str(tmp_path / "campaigns.csv")
+  summary = exports.Exporter(path, "csv").finish(_COLUMNS)
+
+  assert summary["rows"] == 0
+  assert summary["schema"] == dict.fromkeys(_COLUMNS, "null")
+  with open(path, encoding="utf-8") as f:
+    assert f.read().splitlines() == [",".join(_COLUMNS)]
+
+
+def test_export_abort(tmp_path):
+  path = tmp_path / "campaigns.csv"
+  path.write_text("previous export", encoding="utf-8")
+  exporter = exports.Exporter(str(path), "csv")
+  exporter.write(_COLUMNS, _ROWS)
+  exporter.abort()
+
+  assert os.listdir(tmp_path) == ["campaigns.csv"]
+  assert path.read_text(encoding="utf-8") == "previous export"
+
+
+def test_export_unsupported_format(tmp_path):
+  with pytest.raises(ValueError, match="Unsupported export format"):
+    exports.Exporter(str(tmp_path / "campaigns.xlsx"), "xlsx")
+  with pytest.raises(ValueError, match="must end with .csv"):
+    exports.Exporter(str(tmp_path / "campaigns.jsonl"), "csv")
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_export_arrow(tmp_path, monkeypatch, file_format):
+  pa = pytest.importorskip("pyarrow")
+  monkeypatch.setattr(exports, "ROW_GROUP_SIZE", 2)
+  path = str(tmp_path / f"campaigns.{file_format}")
+  exporter = exports.Exporter(path, file_format)
+  exporter.write(["campaign.id", "campaign.name"], [[1, "a"], [2, "b"]])
+  exporter.write(["campaign.id", "campaign.name"], [[3, "a"]])
+  summary = exporter.finish(["campaign.id", "campaign.name"])
+
+  if file_format == "parquet":
+    table = pa.parquet.read_table(path)
+  else:
+    table = pa.ipc.open_file(path).read_all()
+  assert table.column("campaign.id").to_pylist() == [1, 2, 3]
+  assert table.column("campaign.name").to_pylist() == ["a", "b", "a"]
+  assert summary["rows"] == 3
+  assert summary["schema"]["campaign.id"] == "int64"
@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the fake Google Ads API of the load test."""
+
+from ads_mcp.docs_index import DocsIndex
+from benchmarks import fake_ads_server
+from google.ads.googleads.v21.services.types.google_ads_service import SearchGoogleAdsStreamResponse
+import pytest
+
+
+def _read(api, query):
+  return [
+      SearchGoogleAdsStreamResponse.deserialize(batch)
+      for batch in api.stream_batches(query)
+  ]
+
+
+def test_stream_batches(tmp_path):
+  views = tmp_path / "views"
+  views.mkdir()
+  (views / "campaign.yaml").write_text(
+      "attributes:\n"
+      "  campaign.id:\n"
+      "    data_type: INT64\n"
+      "  campaign.status:\n"
+      "    data_type: ENUM\n"
+      "    enum_values: [UNSPECIFIED, PAUSED]\n"
+      "segments:\n"
+      "  segments.date:\n"
+      "    data_type: DATE\n",
+      encoding="utf-8",
+  )
+  api = fake_ads_server.FakeGoogleAdsApi(
+      rows=5, batch_size=2, cardinality=3, docs=DocsIndex(root=str(tmp_path))
+  )
+
+  batches = _read(
+      api, "SELECT campaign.id, campaign.status, segments.date FROM campaign"
+  )
+
+  assert [len(batch.results) for batch in batches] == [2, 2, 1]
+  assert list(batches[0].field_mask.paths) == [
+      "campaign.id",
+      "campaign.status",
+      "segments.date",
+  ]
+  rows = [row for batch in batches for row in batch.results]
+  assert [row.campaign.id for row in rows] == [1000, 1001, 1002, 1000, 1001]
+  assert {row.campaign.status.name for row in rows} == {"PAUSED"}
+  assert rows[1].segments.date == "2025-01-02"
+  assert api.stats() == {"requests": 1, "rows": 5, "errors": 0}
+
+  with pytest.raises(fake_ads_server.FakeApiError) as e:
+    _read(api, "SELECT campaign.name FROM campaign")
+  assert e.value.error_code == "query_error.UNRECOGNIZED_FIELD"
+
+
+def test_stream_batches_limit_without_view_docs(tmp_path):
+  api = fake_ads_server.FakeGoogleAdsApi(docs=DocsIndex(root=str(tmp_path)))
+
+  batches = _read(api, "SELECT ad_group.name FROM ad_group LIMIT 3")
+
+  assert [row.ad_group.name for row in batches[0].results] == [
+      "ad group name 0",
+      "ad group name 1",
+      "ad group name 2",
+  ]
+
+
+def test_stream_batches_injects_errors(tmp_path):
+  api = fake_ads_server.FakeGoogleAdsApi(
+      rows=4,
+      batch_size=2,
+      error_rules=[
+          fake_ads_server.ErrorRule.parse("internal_error.TRANSIENT_ERROR:1:1")
+      ],
+      docs=DocsIndex(root=str(tmp_path)),
+  )
+
+  stream = api.stream_batches("SELECT campaign.id FROM campaign")
+  next(stream)
+  with pytest.raises(fake_ads_server.FakeApiError) as e:
+    next(stream)
+  assert e.value.error_code == "internal_error.TRANSIENT_ERROR"
@@ -0,0 +1,161 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the field search index."""
+
+import os
+
+from ads_mcp.docs_index import DocsIndex
+from ads_mcp.field_index import FieldIndex
+import pytest
+import yaml
+
+
+def _field(category, data_type, description, filterable=True):
+  return {
+      "category": category,
+      "data_type": data_type,
+      "description": description,
+      "filterable": filterable,
+      "sortable": filterable,
+  }
+
+
+CAMPAIGN_VIEW = {
+    "name": "campaign",
+    "attributes": {
+        "campaign.name": _field(
+            "ATTRIBUTE", "STRING", "The name of the campaign."
+        ),
+    },
+    "segments": {
+        "segments.date": _field(
+            "SEGMENT", "DATE", "Date to which metrics apply."
+        ),
+    },
+    "metrics": {
+        "metrics.search_impression_share": _field(
+            "METRIC",
+            "DOUBLE",
+            "The impressions received on the Search Network divided by the"
+            " estimated number of impressions you were eligible to receive.",
+        ),
+        "metrics.impressions": _field(
+            "METRIC", "INT64", "Count of how often your ad has appeared."
+        ),
+        "metrics.clicks": _field("METRIC", "INT64", "The number of clicks."),
+    },
+}
+AD_GROUP_VIEW = {
+    "name": "ad_group",
+    "attributes": {
+        "ad_group.name": _field(
+            "ATTRIBUTE", "STRING", "The name of the ad group.", False
+        ),
+    },
+    "metrics": {
+        "metrics.clicks": _field("METRIC", "INT64", "The number of clicks."),
+    },
+}
+
+
+def _write_view(views_path, view_data, mtime_ns=None):
+  name = view_data["name"]
+  path = views_path / f"{name}.yaml"
+  path.write_text(yaml.safe_dump(view_data), encoding="utf-8")
+  if mtime_ns is not None:
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture(name="views_path")
+def fixture_views_path(tmp_path):
+  views_path = tmp_path / "views"
+  views_path.mkdir()
+  _write_view(views_path, CAMPAIGN_VIEW)
+  _write_view(views_path, AD_GROUP_VIEW)
+  return views_path
+
+
+@pytest.fixture(name="index")
+def fixture_index(views_path):
+  return FieldIndex(DocsIndex(root=str(views_path.parent), check_interval=0))
+
+
+def _names(results):
+  return [field["name"] for field in results]
+
+
+def test_search_ranks_name_matches_first(index):
+  results = index.search("search impression share")
+
+  assert _names(results)[:2] == [
+      "metrics.search_impression_share",
+      "metrics.impressions",
+  ]
+  assert results[0] == {
+      "name": "metrics.search_impression_share",
+      "category": "metrics",
+      "data_type": "DOUBLE",
+      "is_repeated": False,
+      "filterable": True,
+      "sortable": True,
+      "description": CAMPAIGN_VIEW["metrics"][
+          "metrics.search_impression_share"
+      ]["description"],
+  }
+
+
+def test_search_exact_field_name(index):
+  assert _names(index.search("metrics.clicks"))[0] == "metrics.clicks"
+
+
+def test_search_matches_name_prefixes(index):
+  assert _names(index.search("impr")) == [
+      "metrics.impressions",
+      "metrics.search_impression_share",
+  ]
+
+
+def test_search_filters(index):
+  assert _names(index.search("name", view="ad_group")) == ["ad_group.name"]
+  assert _names(index.search("name", filterable=True)) == ["campaign.name"]
+  assert _names(index.search("date", category="segments")) == ["segments.date"]
+  assert not index.search("name", view="unknown_view")
+
+
+def test_search_limit(index):
+  assert len(index.search("metrics", limit=2)) == 2
+
+
+def test_search_no_match(index):
+  assert not index.search("the of")
+  assert not index.search("nonexistent")
+
+
+def test_search_rebuilds_when_views_change(index, views_path):
+  assert not index.search("conversions")
+
+  _write_view(
+      views_path,
+      {
+          "name": "customer",
+          "metrics": {
+              "metrics.conversions": _field(
+                  "METRIC", "DOUBLE", "The number of conversions."
+              ),
+          },
+      },
+  )
+
+  assert _names(index.search("conversions")) == ["metrics.conversions"]
@@ -0,0 +1,168 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the query result formatters."""
+
+import json
+
+from ads_mcp import formatters
+from google.ads.googleads.v21.common.types.ad_asset import AdTextAsset
+from google.ads.googleads.v21.common.types.criteria import KeywordInfo
+from google.ads.googleads.v21.common.types.value import Value
+from google.ads.googleads.v21.enums.types.campaign_status import CampaignStatusEnum
+from google.ads.googleads.v21.enums.types.keyword_match_type import KeywordMatchTypeEnum
+from google.ads.googleads.v21.resources.types.ad import Ad
+from google.ads.googleads.v21.services.types.google_ads_service import GoogleAdsRow
+import proto
+import pytest
+
+
+def _make_ad() -> Ad:
+  ad = Ad(id=123456789012, name="Ad", final_urls=["https://example.com"])
+  ad.responsive_search_ad.headlines.append(AdTextAsset(text="Movers"))
+  ad.responsive_search_ad.headlines.append(AdTextAsset(text="Storage"))
+  ad.responsive_search_ad.path1 = "moving"
+  return ad
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        KeywordInfo(),
+        KeywordInfo(
+            text="movers",
+            match_type=KeywordMatchTypeEnum.KeywordMatchType.PHRASE,
+        ),
+        _make_ad(),
+        GoogleAdsRow(),
+        Value(float_value=0.9),
+    ],
+)
+def test_message_to_dict_matches_to_dict(message):
+  """Tests that message_to_dict has the same output as to_dict."""
+  expected = proto.Message.to_dict(message)
+  actual = formatters.message_to_dict(message)
+  assert actual == expected
+  assert json.dumps(actual) == json.dumps(expected)  # Same key order.
+
+
+def test_message_to_dict_special_floats():
+  """Tests that non-finite floats are converted like to_dict does."""
+  row = GoogleAdsRow()
+  row.metrics.ctr = float("inf")
+  assert formatters.message_to_dict(row.metrics)["ctr"] == "Infinity"
+  value = Value(float_value=float("nan"))
+  assert formatters.message_to_dict(value) == {"float_value": "NaN"}
+
+
+@pytest.mark.parametrize(
+    ("field", "metadata", "convert_micros", "value", "expected"),
+    [
+        (
+            "campaign.status",
+            {"data_type": "ENUM", "is_repeated": False},
+            False,
+            CampaignStatusEnum.CampaignStatus.ENABLED,
+            "ENABLED",
+        ),
+        (
+            "segments.keyword.info",
+            {"data_type": "MESSAGE", "is_repeated": False},
+            False,
+            KeywordInfo(text="movers"),
+            {"text": "movers", "match_type": 0},
+        ),
+        (
+            "campaign.labels",
+            {"data_type": "RESOURCE_NAME", "is_repeated": True},
+            False,
+            ("customers/1/labels/2",),
+            ["customers/1/labels/2"],
+        ),
+        (
+            "metrics.cost_micros",
+            {"data_type": "INT64", "is_repeated": False},
+            True,
+            1_250_000,
+            1.25,
+        ),
+    ],
+)
+def test_select_converter(field, metadata, convert_micros, value, expected):
+  """Tests the select_converter function."""
+  converter = formatters.select_converter(field, metadata, convert_micros)
+  assert converter(value) == expected
+
+
+def test_select_converter_raw_protobuf():
+  """Tests that raw protobuf values are converted like to_dict does."""
+  keyword = KeywordInfo(
+      text="movers", match_type=KeywordMatchTypeEnum.KeywordMatchType.PHRASE
+  )
+  enum_metadata = {"data_type": "ENUM", "is_repeated": False}
+  message_metadata = {"data_type": "MESSAGE", "is_repeated": False}
+  raw_keyword = KeywordInfo.pb(keyword)
+  assert formatters.select_converter("campaign.status", enum_metadata)(3) == 3
+  assert formatters.select_converter("ad.info", message_metadata)(
+      raw_keyword
+  ) == proto.Message.to_dict(keyword)
+  assert (
+      formatters.select_converter_from_value("ad.info", raw_keyword)
+      is formatters.message_to_dict
+  )
+
+
+def test_select_converter_identity():
+  """Tests that scalars are returned unchanged."""
+  metadata = {"data_type": "INT64", "is_repeated": False}
+  assert formatters.select_converter("metrics.cost_micros", metadata) is None
+  assert formatters.select_converter("campaign.id", metadata, True) is None
+
+
+def test_select_converter_from_value():
+  """Tests the select_converter_from_value function."""
+  assert (
+      formatters.select_converter_from_value(
+          "campaign.status", CampaignStatusEnum.CampaignStatus.PAUSED
+      )(CampaignStatusEnum.CampaignStatus.PAUSED)
+      == "PAUSED"
+  )
+  assert (
+      formatters.select_converter_from_value(
+          "segments.keyword.info", KeywordInfo()
+      )
+      is formatters.message_to_dict
+  )
+  assert formatters.select_converter_from_value("campaign.id", 1) is None
+  assert (
+      formatters.select_converter_from_value("metrics.cost_micros", 1, True)
+      is formatters.micros_to_currency
+  )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("SELECT campaign.id FROM campaign", "campaign"),
+        (
+            "select search_term_view.search_term from search_term_view"
+            " where segments.date during LAST_7_DAYS",
+            "search_term_view",
+        ),
+        ("SELECT campaign.id", None),
+    ],
+)
+def test_get_query_view(query, expected):
+  """Tests the get_query_view function."""
+  assert formatters.get_query_view(query) == expected
@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests that the server entry points do not import heavy modules."""
+
+import subprocess
+import sys
+
+import pytest
+
+from tests import bench_import_time
+
+_LAZY_MODULES = (
+    "google.ads.googleads",
+    "google.oauth2",
+    "fastmcp.server.auth.providers.google",
+    "google.protobuf",
+    "proto",
+)
+
+
+@pytest.mark.parametrize("module", ["ads_mcp.stdio", "ads_mcp.server"])
+def test_entry_point_imports_are_lazy(module):
+  result = subprocess.run(
+      [
+          sys.executable,
+          "-c",
+          f"import sys, {module}; print('\\n'.join(sys.modules))",
+      ],
+      capture_output=True,
+      check=True,
+      text=True,
+  )
+  imported = result.stdout.splitlines()
+
+  assert not [
+      name
+      for name in imported
+      if any(
+          name == lazy or name.startswith(f"{lazy}.") for lazy in _LAZY_MODULES
+      )
+  ]
+
+
+def test_import_times():
+  times = bench_import_time.import_times("ads_mcp.utils")
+
+  assert times["ads_mcp.utils"] > 0
+  assert "yaml" in times
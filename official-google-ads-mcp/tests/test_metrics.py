@@ -0,0 +1,144 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the metrics of the server."""
+
+from ads_mcp import metrics
+from ads_mcp import server
+import fastmcp
+from fastmcp.exceptions import ToolError
+import pytest
+from starlette.testclient import TestClient
+
+
+def test_counter():
+  registry = metrics.Registry()
+  counter = registry.counter("requests", "Requests.", ("tool",))
+  counter.inc(tool="a")
+  counter.inc(2, tool="a")
+  counter.inc(tool="b")
+
+  assert registry.get_sample("requests_total", tool="a") == 3
+  assert registry.get_sample("requests_total", tool="b") == 1
+  with pytest.raises(ValueError, match="Expected the labels"):
+    counter.inc(other="a")
+
+
+def test_histogram():
+  registry = metrics.Registry()
+  histogram = registry.histogram("latency", "Latency.", buckets=(0.1, 1.0))
+  for value in (0.05, 0.5, 0.5, 5.0):
+    histogram.observe(value)
+
+  assert registry.get_sample("latency_bucket", le="0.1") == 1
+  assert registry.get_sample("latency_bucket", le="1") == 3
+  assert registry.get_sample("latency_bucket", le="+Inf") == 4
+  assert registry.get_sample("latency_count") == 4
+  assert registry.get_sample("latency_sum") == 6.05
+
+
+def test_render():
+  registry = metrics.Registry()
+  registry.counter("errors", "Errors.", ("code",)).inc(code='a"b')
+  registry.collected("queued", "Queued requests.", lambda: [({}, 2)])
+  registry.collected(
+      "hits", "Cache hits.", lambda: [({}, 1.5)], kind="counter"
+  )
+
+  assert registry.render() == (
+      "# HELP errors Errors.\n"
+      "# TYPE errors counter\n"
+      'errors_total{code="a\\"b"} 1\n'
+      "# HELP hits Cache hits.\n"
+      "# TYPE hits counter\n"
+      "hits_total 1.5\n"
+      "# HELP queued Queued requests.\n"
+      "# TYPE queued gauge\n"
+      "queued 2\n"
+  )
+
+
+def test_register_twice():
+  registry = metrics.Registry()
+  registry.counter("requests", "Requests.")
+  with pytest.raises(ValueError, match="already registered"):
+    registry.counter("requests", "Requests.")
+
+
+def test_tracer_without_opentelemetry(monkeypatch):
+  monkeypatch.setattr(metrics, "trace", None)
+  tracer = metrics._NoOpTracer()  # pylint: disable=protected-access
+  span = tracer.start_span("ads_mcp.test", attributes={"ads_mcp.rows": 1})
+  span.add_event("first_batch")
+  span.set_attribute("ads_mcp.rows", 2)
+  metrics.set_span_error(span, RuntimeError("failed"))
+  span.end()
+
+
+@pytest.mark.asyncio
+async def test_metrics_middleware():
+  mcp = fastmcp.FastMCP(middleware=[metrics.MetricsMiddleware()])
+
+  @mcp.tool()
+  def echo(text: str) -> str:
+    return text
+
+  @mcp.tool()
+  def fail() -> str:
+    raise ValueError("Failed.")
+
+  def sample(name, **labels):
+    return metrics.REGISTRY.get_sample(name, **labels) or 0
+
+  calls = sample("ads_mcp_tool_call_seconds_count", tool="echo", status="ok")
+  failures = sample(
+      "ads_mcp_tool_call_seconds_count", tool="fail", status="error"
+  )
+  response_bytes = sample("ads_mcp_tool_response_bytes_sum", tool="echo")
+  async with fastmcp.Client(mcp) as client:
+    await client.call_tool("echo", {"text": "héllo"})
+    with pytest.raises(ToolError):
+      await client.call_tool("fail", {})
+
+  assert (
+      sample("ads_mcp_tool_call_seconds_count", tool="echo", status="ok")
+      == calls + 1
+  )
+  assert (
+      sample("ads_mcp_tool_call_seconds_count", tool="fail", status="error")
+      == failures + 1
+  )
+  assert (
+      sample("ads_mcp_tool_response_bytes_sum", tool="echo")
+      == response_bytes + 6
+  )
+
+
+def test_metrics_endpoint():
+  server.add_metrics_route("/test-metrics")
+  with TestClient(server.mcp_server.http_app()) as client:
+    response = client.get("/test-metrics")
+
+  assert response.status_code == 200
+  assert response.headers["content-type"].startswith("text/plain")
+  assert "# TYPE ads_mcp_gaql_stream_seconds histogram" in response.text
+  assert "ads_mcp_result_cache_hits_total" in response.text
+
+
+def test_metrics_endpoint_disabled_by_default():
+  if server.METRICS_PATH:
+    pytest.skip("ADS_MCP_METRICS_PATH is set.")
+
+  with TestClient(server.mcp_server.http_app()) as client:
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,192 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the on-disk report cache."""
+
+import datetime
+import re
+
+from ads_mcp import report_cache
+import pytest
+
+COLUMNS = ["campaign.id", "segments.date", "metrics.clicks"]
+TODAY = datetime.date(2025, 1, 31)
+QUERY = (
+    "SELECT campaign.id, segments.date, metrics.clicks FROM campaign"
+    " WHERE segments.date BETWEEN '{start}' AND '{end}'"
+)
+
+
+class FakeApi:
+  """Answers queries with one row per day and records the queried ranges."""
+
+  def __init__(self):
+    self.ranges = []
+
+  def __call__(self, query):
+    start, end = re.search(r"'(.*)' AND '(.*)'", query).groups()
+    self.ranges.append((start, end))
+    start = datetime.date.fromisoformat(start)
+    end = datetime.date.fromisoformat(end)
+    rows = []
+    while start <= end:
+      rows.append([1, start.isoformat(), start.day])
+      start += datetime.timedelta(days=1)
+    return COLUMNS, rows
+
+
+@pytest.fixture(name="cache")
+def fixture_cache(tmp_path):
+  return report_cache.ReportCache(str(tmp_path), lag_days=3)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT campaign.id FROM campaign WHERE segments.date BETWEEN"
+        " '2025-01-01' AND '2025-01-05'",
+        "SELECT campaign.id, segments.date FROM campaign WHERE segments.date"
+        " DURING LAST_7_DAYS",
+        QUERY.format(start="2025-01-01", end="2025-01-05") + " LIMIT 10",
+        QUERY.format(start="2025-01-01", end="2025-01-05")
+        + " ORDER BY metrics.clicks DESC",
+        QUERY.format(start="2025-01-05", end="2025-01-01"),
+    ],
+)
+def test_parse_date_range_query_unsupported(query):
+  """Tests that queries that cannot be partitioned are rejected."""
+  assert report_cache.parse_date_range_query(query) is None
+
+
+def test_parse_date_range_query():
+  """Tests the parse_date_range_query function."""
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-01", end="2025-01-05")
+  )
+  assert query.start == datetime.date(2025, 1, 1)
+  assert query.end == datetime.date(2025, 1, 5)
+  assert query.with_range(
+      datetime.date(2025, 1, 2), datetime.date(2025, 1, 3)
+  ) == QUERY.format(start="2025-01-02", end="2025-01-03")
+  assert (
+      query.template
+      == report_cache.parse_date_range_query(
+          QUERY.format(start="2024-12-01", end="2024-12-05")
+      ).template
+  )
+
+
+def test_execute_fetches_only_missing_days(cache):
+  """Tests that a wider range only fetches the days not stored."""
+  api = FakeApi()
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-10", end="2025-01-20")
+  )
+  columns, rows = cache.execute(query, "123", api, TODAY)
+  assert columns == COLUMNS
+  assert len(rows) == 11
+
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-01", end="2025-01-30")
+  )
+  columns, rows = cache.execute(query, "123", api, TODAY)
+  assert [row[1] for row in rows] == [
+      f"2025-01-{day:02d}" for day in range(1, 31)
+  ]
+  # Days after 2025-01-28 are within the lag window and fetched again.
+  assert api.ranges[1:] == [
+      ("2025-01-01", "2025-01-09"),
+      ("2025-01-21", "2025-01-30"),
+  ]
+
+  cache.execute(query, "123", api, TODAY)
+  assert api.ranges[3:] == [("2025-01-29", "2025-01-30")]
+
+
+def test_execute_keys_by_customer_and_options(cache):
+  """Tests that partitions are not shared across customers or options."""
+  api = FakeApi()
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-01", end="2025-01-02")
+  )
+  cache.execute(query, "123", api, TODAY)
+  cache.execute(query, "456", api, TODAY)
+  cache.execute(query, "123", api, TODAY, key_extra=(True,))
+  cache.execute(query, "123", api, TODAY)
+  assert len(api.ranges) == 3
+
+
+def test_execute_stores_empty_days(cache):
+  """Tests that days without rows are not fetched again."""
+  calls = []
+
+  def fetch(query):
+    calls.append(query)
+    return [], []
+
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-01", end="2025-01-02")
+  )
+  assert cache.execute(query, "123", fetch, TODAY) == ([], [])
+  assert cache.execute(query, "123", fetch, TODAY) == ([], [])
+  assert len(calls) == 1
+
+
+def test_execute_rows_without_dates(cache):
+  """Tests that rows without their date are used, without fetching twice."""
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-02", end="2025-01-02")
+  )
+  cache.execute(query, "123", FakeApi(), TODAY)
+  ranges = []
+
+  def fetch(query):
+    ranges.append(re.search(r"'(.*)' AND '(.*)'", query).groups())
+    # The API left segments.date out.
+    return ["campaign.id", "metrics.clicks"], [[1, 5]]
+
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-01", end="2025-01-03")
+  )
+  assert cache.execute(query, "123", fetch, TODAY) == (
+      ["campaign.id", "metrics.clicks"],
+      [[1, 5], [1, 2], [1, 5]],
+  )
+  # The stored day is not fetched, nor the fetched days again.
+  assert ranges == [("2025-01-01", "2025-01-01"), ("2025-01-03", "2025-01-03")]
+
+
+def test_execute_lag_window_from_today(cache):
+  """Tests that the lag window ends on the date given by the caller."""
+  api = FakeApi()
+  query = report_cache.parse_date_range_query(
+      QUERY.format(start="2025-01-27", end="2025-01-28")
+  )
+  cache.execute(query, "123", api, datetime.date(2025, 1, 30))
+  cache.execute(query, "123", api, datetime.date(2025, 1, 31))
+  cache.execute(query, "123", api, datetime.date(2025, 1, 31))
+  # 2025-01-28 is only closed 3 days after it.
+  assert api.ranges == [
+      ("2025-01-27", "2025-01-28"),
+      ("2025-01-28", "2025-01-28"),
+  ]
+
+
+def test_earliest_today():
+  """Tests that no time zone is on a later day than earliest_today."""
+  utc_today = datetime.datetime.now(datetime.timezone.utc).date()
+  assert report_cache.earliest_today() in (
+      utc_today,
+      utc_today - datetime.timedelta(days=1),
+  )
@@ -0,0 +1,229 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the GAQL result cache."""
+
+import asyncio
+import json
+from unittest import mock
+
+from ads_mcp import result_cache
+import pytest
+
+
+class FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("SELECT campaign.id, campaign.name FROM campaign", True),
+        ("SELECT campaign.id, metrics.clicks FROM campaign", False),
+        (
+            "SELECT campaign.id FROM campaign WHERE segments.date DURING"
+            " LAST_7_DAYS",
+            False,
+        ),
+    ],
+)
+def test_is_structural_query(query, expected):
+  """Tests the is_structural_query function."""
+  assert result_cache.is_structural_query(query) == expected
+
+
+def test_normalize_query():
+  """Tests the normalize_query function."""
+  assert (
+      result_cache.normalize_query(" SELECT\n  campaign.id\tFROM campaign ")
+      == "SELECT campaign.id FROM campaign"
+  )
+
+
+def test_get_and_put():
+  """Tests that results are cached and counted."""
+  cache = result_cache.ResultCache(max_bytes=1000)
+  assert cache.get(("q",)) is None
+  cache.put(("q",), ["campaign.id"], [[1]], ttl_seconds=10)
+  assert cache.get(("q",)) == (["campaign.id"], [[1]])
+  stats = cache.stats()
+  assert stats["hits"] == 1
+  assert stats["misses"] == 1
+  assert stats["entries"] == 1
+  assert stats["bytes"] == result_cache.estimate_size(["campaign.id"], [[1]])
+
+
+def test_entries_expire():
+  """Tests that results expire after their time to live."""
+  clock = FakeClock()
+  cache = result_cache.ResultCache(max_bytes=1000, clock=clock)
+  cache.put(("q",), ["campaign.id"], [[1]], ttl_seconds=10)
+  clock.now = 10
+  assert cache.get(("q",)) is None
+  assert cache.stats()["bytes"] == 0
+
+
+def test_eviction_by_bytes():
+  """Tests that the least recently used results are evicted by size."""
+  columns = ["campaign.id"]
+  rows = [[1]]
+  size = result_cache.estimate_size(columns, rows)
+  cache = result_cache.ResultCache(max_bytes=size * 4)
+  for key in "abcd":
+    cache.put((key,), columns, rows, ttl_seconds=10)
+  assert cache.get(("a",)) is not None  # "b" is now the oldest.
+  cache.put(("e",), columns, rows, ttl_seconds=10)
+  assert cache.get(("b",)) is None
+  assert cache.get(("a",)) is not None
+  stats = cache.stats()
+  assert stats["evictions"] == 1
+  assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_large_results_are_not_cached():
+  """Tests that results above a quarter of the cache size are skipped."""
+  cache = result_cache.ResultCache(max_bytes=100)
+  cache.put(("q",), ["campaign.name"], [["x" * 50]], ttl_seconds=10)
+  assert cache.get(("q",)) is None
+
+
+@pytest.mark.parametrize(
+    "rows", [[], [[1, "a"]], [[i, "a"] for i in range(2500)]]
+)
+def test_estimate_size(rows):
+  """Tests that the estimate is the size of the result as JSON."""
+  columns = ["campaign.id", "campaign.name"]
+  size = len(json.dumps([columns, rows]))
+  assert result_cache.estimate_size(columns, rows) == size
+  assert result_cache.estimate_size(columns, rows, limit=size) == size
+
+
+def test_estimate_size_stops_past_limit():
+  """Tests that large results are not serialized in full."""
+  with mock.patch.object(
+      result_cache.json, "dumps", wraps=json.dumps
+  ) as mock_dumps:
+    many_rows = [[i] for i in range(100_000)]
+    assert result_cache.estimate_size(["c"], many_rows, limit=1000) > 1000
+    assert mock_dumps.call_count == 1  # Only the columns.
+
+    mock_dumps.reset_mock()
+    large_rows = [["x" * 1000]] * 5000
+    assert (
+        result_cache.estimate_size(["c"], large_rows, limit=100_000) > 100_000
+    )
+    assert mock_dumps.call_count == 2  # The columns and the first rows.
+
+
+def test_disabled_cache():
+  """Tests that a cache without capacity keeps nothing."""
+  cache = result_cache.ResultCache(max_bytes=0)
+  cache.put(("q",), ["campaign.id"], [[1]], ttl_seconds=10)
+  assert cache.get(("q",)) is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result():
+  single_flight = result_cache.SingleFlight()
+  release = asyncio.Event()
+  calls = []
+
+  async def slow_call():
+    calls.append(1)
+    await release.wait()
+    return "result"
+
+  runs = [
+      asyncio.ensure_future(single_flight.run(("key",), slow_call))
+      for _ in range(4)
+  ]
+  await asyncio.sleep(0)
+  release.set()
+
+  assert await asyncio.gather(*runs) == ["result"] * 4
+  assert len(calls) == 1
+  assert single_flight.coalesced == 3
+
+  async def next_call():
+    return "next"
+
+  # The next call runs again.
+  assert await single_flight.run(("key",), next_call) == "next"
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exception():
+  single_flight = result_cache.SingleFlight()
+  release = asyncio.Event()
+
+  async def failing_call():
+    await release.wait()
+    raise RuntimeError("failed")
+
+  runs = [
+      asyncio.ensure_future(single_flight.run(("key",), failing_call))
+      for _ in range(2)
+  ]
+  await asyncio.sleep(0)
+  release.set()
+  for run in runs:
+    with pytest.raises(RuntimeError, match="failed"):
+      await run
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_caller():
+  single_flight = result_cache.SingleFlight()
+  release = asyncio.Event()
+
+  async def slow_call():
+    await release.wait()
+    return "result"
+
+  leader = asyncio.ensure_future(single_flight.run(("key",), slow_call))
+  follower = asyncio.ensure_future(single_flight.run(("key",), slow_call))
+  await asyncio.sleep(0)
+  leader.cancel()
+  release.set()
+
+  assert await follower == "result"
+  with pytest.raises(asyncio.CancelledError):
+    await leader
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_abandoned_call():
+  single_flight = result_cache.SingleFlight()
+  cancelled = []
+
+  async def slow_call():
+    try:
+      await asyncio.Event().wait()
+    except asyncio.CancelledError:
+      cancelled.append(1)
+      raise
+
+  run = asyncio.ensure_future(single_flight.run(("key",), slow_call))
+  await asyncio.sleep(0)
+  run.cancel()
+
+  with pytest.raises(asyncio.CancelledError):
+    await run
+  # The call has stopped by the time its last caller is cancelled.
+  assert cancelled == [1]
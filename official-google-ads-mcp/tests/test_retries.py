@@ -0,0 +1,177 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the retries of transient Google Ads API failures."""
+
+from ads_mcp import retries
+from google.ads.googleads.errors import GoogleAdsException
+from google.ads.googleads.v21.errors.types import errors
+from google.api_core import exceptions
+import grpc
+import pytest
+
+
+def _failure(*error_codes):
+  return errors.GoogleAdsFailure(
+      errors=[
+          errors.GoogleAdsError(error_code=errors.ErrorCode(**error_code))
+          for error_code in error_codes
+      ]
+  )
+
+
+class _RpcError(grpc.RpcError):
+  """A gRPC error as raised by the client library for some status codes."""
+
+  def __init__(self, code, failure=None):
+    super().__init__()
+    self._code = code
+    self._failure = failure
+
+  def code(self):
+    return self._code
+
+  def trailing_metadata(self):
+    if self._failure is None:
+      return ()
+    return (
+        (
+            "google.ads.googleads.v21.errors.googleadsfailure-bin",
+            errors.GoogleAdsFailure.serialize(self._failure),
+        ),
+    )
+
+
+def test_get_error_codes():
+  failure = _failure(
+      {"internal_error": "TRANSIENT_ERROR"},
+      {"query_error": "PROHIBITED_FIELD_IN_SELECT_CLAUSE"},
+  )
+  assert retries.get_error_codes(failure) == [
+      ("internal_error", "TRANSIENT_ERROR"),
+      ("query_error", "PROHIBITED_FIELD_IN_SELECT_CLAUSE"),
+  ]
+
+
+@pytest.mark.parametrize(
+    ("error_codes", "expected"),
+    [
+        ([{"internal_error": "INTERNAL_ERROR"}], True),
+        ([{"internal_error": "DEADLINE_EXCEEDED"}], True),
+        ([{"quota_error": "RESOURCE_TEMPORARILY_EXHAUSTED"}], True),
+        ([{"quota_error": "RESOURCE_EXHAUSTED"}], False),
+        (
+            [
+                {"internal_error": "TRANSIENT_ERROR"},
+                {"authorization_error": "USER_PERMISSION_DENIED"},
+            ],
+            False,
+        ),
+        ([], False),
+    ],
+)
+def test_is_retryable(error_codes, expected):
+  assert retries.is_retryable(_failure(*error_codes)) == expected
+
+
+def test_is_retryable_without_error_codes():
+  assert not retries.is_retryable(None)
+  assert not retries.is_retryable(errors.GoogleAdsFailure(errors=[{}]))
+
+
+def test_get_failure():
+  failure = _failure({"internal_error": "INTERNAL_ERROR"})
+
+  assert (
+      retries.get_failure(GoogleAdsException(None, None, failure, None))
+      is failure
+  )
+  assert (
+      retries.get_failure(_RpcError(grpc.StatusCode.INTERNAL, failure))
+      == failure
+  )
+  assert (
+      retries.get_failure(
+          exceptions.InternalServerError(
+              "Internal error.",
+              response=_RpcError(grpc.StatusCode.INTERNAL, failure),
+          )
+      )
+      == failure
+  )
+  assert retries.get_failure(_RpcError(grpc.StatusCode.INTERNAL)) is None
+  assert retries.get_failure(ValueError()) is None
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (
+            _RpcError(
+                grpc.StatusCode.INTERNAL,
+                _failure({"internal_error": "INTERNAL_ERROR"}),
+            ),
+            True,
+        ),
+        (
+            _RpcError(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                _failure({"quota_error": "RESOURCE_EXHAUSTED"}),
+            ),
+            False,
+        ),
+        (
+            exceptions.ResourceExhausted(
+                "Quota exceeded.",
+                response=_RpcError(
+                    grpc.StatusCode.RESOURCE_EXHAUSTED,
+                    _failure(
+                        {"quota_error": "RESOURCE_TEMPORARILY_EXHAUSTED"}
+                    ),
+                ),
+            ),
+            True,
+        ),
+        (_RpcError(grpc.StatusCode.UNAVAILABLE), True),
+        (exceptions.ServiceUnavailable("Unavailable."), True),
+        (_RpcError(grpc.StatusCode.PERMISSION_DENIED), False),
+        (exceptions.PermissionDenied("Permission denied."), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_retryable_error(error, expected):
+  assert retries.is_retryable_error(error) == expected
+
+
+def test_backoff_delay():
+  for attempt, delay in ((1, 0.5), (2, 1.0), (3, 2.0), (10, 8.0)):
+    assert delay / 2 <= retries.backoff_delay(attempt, 0.5, 8.0) <= delay
+
+
+def test_retry_policy():
+  policy = retries.RetryPolicy(max_attempts=2, base_delay=1.0)
+  transient = GoogleAdsException(
+      None, None, _failure({"internal_error": "TRANSIENT_ERROR"}), None
+  )
+  invalid = GoogleAdsException(
+      None, None, _failure({"query_error": "LIMIT_VALUE_TOO_LOW"}), None
+  )
+
+  assert policy.should_retry(transient, 1)
+  delay = policy.next_delay(1, resumed=True)
+  assert not policy.should_retry(transient, 2)
+  assert not policy.should_retry(invalid, 1)
+
+  assert 0.5 <= delay <= 1.0
+  assert policy.stats() == {"retries": 1, "resumed": 1, "exhausted": 1}
@@ -0,0 +1,196 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the quota-aware request scheduler."""
+
+import asyncio
+import threading
+import time
+
+from ads_mcp.scheduler import Priority
+from ads_mcp.scheduler import QuotaScheduler
+from ads_mcp.scheduler import TokenBucket
+import pytest
+
+
+def test_token_bucket_refill():
+  bucket = TokenBucket(rate=2.0, burst=4.0, now=0.0)
+  bucket.tokens = 0.0
+
+  bucket.refill(1.0)
+  assert bucket.tokens == 2.0
+  assert bucket.time_until(3.0) == 0.5
+
+  bucket.refill(10.0)
+  assert bucket.tokens == 4.0
+
+
+def test_admit_within_burst_does_not_wait():
+  scheduler = QuotaScheduler(developer_rate=10, customer_rate=1)
+
+  assert scheduler.admit("dev", "1") == 0.0
+  assert scheduler.admit("dev", "1") == 0.0
+  assert scheduler.admit("dev", "2") == 0.0
+  assert scheduler.stats() == {
+      "admitted": 3,
+      "throttled": 0,
+      "timeouts": 0,
+      "wait_seconds": 0.0,
+      "queued": 0,
+  }
+
+
+def test_admit_throttles_customer_smoothly():
+  scheduler = QuotaScheduler(
+      developer_rate=0, customer_rate=20, burst_seconds=0.05
+  )
+  start = time.monotonic()
+
+  for _ in range(5):
+    scheduler.admit("dev", "1")
+
+  # One token is available right away, the next ones every 50 ms.
+  assert time.monotonic() - start >= 0.18
+  assert scheduler.stats()["throttled"] == 4
+
+
+def test_admit_times_out():
+  scheduler = QuotaScheduler(
+      developer_rate=1, customer_rate=0, burst_seconds=1
+  )
+  scheduler.admit("dev")
+
+  with pytest.raises(RuntimeError, match="Timed out waiting"):
+    scheduler.admit("dev", timeout=0.05)
+  assert scheduler.stats()["timeouts"] == 1
+  assert scheduler.stats()["queued"] == 0
+
+
+def test_waiting_customer_does_not_block_others():
+  scheduler = QuotaScheduler(
+      developer_rate=0, customer_rate=2, burst_seconds=0.5
+  )
+  scheduler.admit("dev", "busy")
+  thread = threading.Thread(target=scheduler.admit, args=("dev", "busy"))
+  thread.start()
+  time.sleep(0.05)
+
+  assert scheduler.admit("dev", "idle", timeout=0.1) == 0.0
+  thread.join()
+
+
+def test_interactive_requests_are_admitted_first():
+  scheduler = QuotaScheduler(
+      developer_rate=20, customer_rate=0, burst_seconds=0.05
+  )
+  scheduler.admit("dev")
+  order = []
+  lock = threading.Lock()
+
+  def admit(name, priority):
+    scheduler.admit("dev", priority=priority)
+    with lock:
+      order.append(name)
+
+  threads = [
+      threading.Thread(target=admit, args=(f"batch{i}", Priority.BATCH))
+      for i in range(3)
+  ]
+  for thread in threads:
+    thread.start()
+  time.sleep(0.01)
+  interactive = threading.Thread(
+      target=admit, args=("interactive", Priority.INTERACTIVE)
+  )
+  interactive.start()
+  for thread in [*threads, interactive]:
+    thread.join()
+
+  assert order.index("interactive") <= 1
+  assert [name for name in order if name != "interactive"] == [
+      "batch0",
+      "batch1",
+      "batch2",
+  ]
+
+
+def test_try_admit():
+  scheduler = QuotaScheduler(developer_rate=0, customer_rate=1)
+
+  assert scheduler.try_admit("dev", "1")
+  assert scheduler.try_admit("dev", "1")
+  assert not scheduler.try_admit("dev", "1")
+  assert scheduler.try_admit("dev", "2")
+  assert scheduler.stats()["admitted"] == 3
+  assert scheduler.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admit_async():
+  scheduler = QuotaScheduler(
+      developer_rate=0, customer_rate=20, burst_seconds=0.05
+  )
+  start = time.monotonic()
+
+  await asyncio.gather(*(scheduler.admit_async("dev", "1") for _ in range(3)))
+
+  assert time.monotonic() - start >= 0.08
+  assert scheduler.stats()["throttled"] == 2
+  with pytest.raises(RuntimeError, match="Timed out waiting"):
+    await asyncio.gather(
+        *(scheduler.admit_async("dev", "1", timeout=0.01) for _ in range(2))
+    )
+  assert scheduler.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admit_async_follows_priority():
+  scheduler = QuotaScheduler(
+      developer_rate=20, customer_rate=0, burst_seconds=0.05
+  )
+  scheduler.admit("dev")
+  order = []
+
+  async def admit(name, priority):
+    await scheduler.admit_async("dev", priority=priority)
+    order.append(name)
+
+  batch = [
+      asyncio.ensure_future(admit(f"batch{i}", Priority.BATCH))
+      for i in range(3)
+  ]
+  await asyncio.sleep(0.01)
+  await asyncio.gather(admit("interactive", Priority.INTERACTIVE), *batch)
+
+  assert order.index("interactive") <= 1
+
+
+@pytest.mark.asyncio
+async def test_admit_async_woken_when_queue_changes():
+  scheduler = QuotaScheduler(
+      developer_rate=2, customer_rate=0, burst_seconds=0.5
+  )
+  scheduler.admit("dev")
+  ahead = asyncio.ensure_future(scheduler.admit_async("dev"))
+  await asyncio.sleep(0.01)
+  start = time.monotonic()
+  behind = asyncio.ensure_future(scheduler.admit_async("dev"))
+  await asyncio.sleep(0.01)
+
+  # The request behind waited for two tokens, it now only needs one.
+  ahead.cancel()
+  await behind
+
+  assert time.monotonic() - start < 0.8
+  assert scheduler.stats()["queued"] == 0
@@ -0,0 +1,230 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the column buffers of GAQL results."""
+
+from ads_mcp import tables
+import pytest
+
+_COLUMNS = [
+    "campaign.id",
+    "campaign.status",
+    "metrics.impressions",
+    "metrics.clicks",
+    "metrics.cost_micros",
+    "metrics.conversions",
+]
+_ROWS = [
+    [1, "ENABLED", 100, 10, 5_000_000, 2.0],
+    [2, "PAUSED", 0, 0, 0, 0.0],
+    [3, "ENABLED", 50, 1, 1_500_000, 0.5],
+]
+
+
+def _table():
+  table = tables.ColumnTable()
+  table.append(_COLUMNS, _ROWS[:2])
+  table.append(_COLUMNS, _ROWS[2:])
+  return table
+
+
+def test_append():
+  table = _table()
+
+  assert len(table) == 3
+  assert table.kinds() == {
+      "campaign.id": "int64",
+      "campaign.status": "dictionary",
+      "metrics.impressions": "int64",
+      "metrics.clicks": "int64",
+      "metrics.cost_micros": "int64",
+      "metrics.conversions": "float64",
+  }
+  assert table.column("campaign.status").dictionary == ["ENABLED", "PAUSED"]
+  assert table.rows() == _ROWS
+
+  with pytest.raises(ValueError, match="other columns"):
+    table.append(["campaign.id"], [[4]])
+
+
+def test_append_widens_columns():
+  table = tables.ColumnTable()
+  table.append(["a", "b", "c"], [[1, "x", 1.5], [2, "y", None]])
+  table.append(["a", "b", "c"], [[2.5, {"k": 1}, 3]])
+  table.append(["a", "b", "c"], [[None, "z", True]])
+
+  assert table.kinds() == {"a": "float64", "b": "object", "c": "object"}
+  assert table.rows() == [
+      [1.0, "x", 1.5],
+      [2.0, "y", None],
+      [2.5, {"k": 1}, 3.0],
+      [None, "z", True],
+  ]
+
+
+def test_append_missing_integers():
+  large_id = 2**53 + 1
+  table = tables.ColumnTable()
+  table.append(["a", "b"], [[large_id, 10], [None, 0]])
+  table.append(["a", "b"], [[3, None]])
+
+  assert table.kinds() == {"a": "int64", "b": "int64"}
+  assert table.rows() == [[large_id, 10], [None, 0], [3, None]]
+
+  table.append(["a", "b"], [[2**64, 1]])
+  assert table.kinds() == {"a": "float64", "b": "int64"}
+  assert table.rows()[-3:] == [[None, 0], [3.0, None], [2.0**64, 1]]
+
+
+def test_missing_integers_in_metrics_and_filters():
+  table = tables.ColumnTable()
+  table.append(
+      ["metrics.clicks", "metrics.impressions"],
+      [[1, 10], [None, 10], [4, None], [2, 4]],
+  )
+  table.add_derived_metric("ctr")
+  assert [row[2] for row in table.rows()] == [0.1, None, None, 0.5]
+
+  table.filter("metrics.clicks != 4")
+  assert table.rows() == [[1, 10, 0.1], [2, 4, 0.5]]
+
+
+def test_derived_metrics():
+  table = _table()
+  for name in tables.DERIVED_METRICS:
+    table.add_derived_metric(name)
+  table.convert_micros()
+
+  assert table.columns[-4:] == ["ctr", "cpc", "cpa", "cost"]
+  assert [row[4:] for row in table.rows()] == [
+      [5.0, 2.0, 0.1, 0.5, 2.5, 5.0],
+      [0.0, 0.0, None, None, None, 0.0],
+      [1.5, 0.5, 0.02, 1.5, 3.0, 1.5],
+  ]
+
+
+def test_derived_metrics_errors():
+  with pytest.raises(ValueError, match="Unknown derived metric"):
+    tables.check_derived_metrics(["roas"], _COLUMNS)
+  with pytest.raises(ValueError, match="cpc needs metrics.clicks"):
+    tables.check_derived_metrics(["cpc"], ["metrics.cost_micros"])
+
+  table = tables.ColumnTable()
+  table.append(["metrics.cost_micros"], [["a lot"]])
+  with pytest.raises(ValueError, match="not numbers"):
+    table.add_derived_metric("cost")
+
+
+def test_derived_metrics_without_rows():
+  table = tables.ColumnTable()
+  table.append(_COLUMNS, [])
+  table.add_derived_metric("ctr")
+
+  assert table.columns[-1] == "ctr"
+  assert not table.rows()
+
+
+def test_filter():
+  table = _table()
+  table.add_derived_metric("ctr")
+  table.filter("campaign.status = ENABLED and ctr >= 0.05")
+
+  assert [row[0] for row in table.rows()] == [1]
+
+  table = _table()
+  table.add_derived_metric("cpa")
+  table.filter("cpa < 100000")
+
+  assert [row[0] for row in table.rows()] == [1, 3]
+
+  # The cpa of campaign 2 is missing, with no conversions.
+  table = _table()
+  table.add_derived_metric("cpa")
+  table.filter("cpa != 5")
+
+  assert [row[0] for row in table.rows()] == [1, 3]
+
+  table = _table()
+  table.filter("campaign.status != 'ENABLED'")
+
+  assert table.rows() == [_ROWS[1]]
+
+
+def test_filter_quoted_and():
+  table = tables.ColumnTable()
+  table.append(
+      ["campaign.id", "campaign.name"],
+      [[1, "Rock and Roll"], [2, "Jazz"], [3, "Rock AND Roll"]],
+  )
+  table.filter("campaign.name = 'Rock and Roll' AND campaign.id >= 1")
+
+  assert table.rows() == [[1, "Rock and Roll"]]
+
+  table = tables.ColumnTable()
+  table.append(["campaign.name"], [["a AND b"], ["c"]])
+  table.filter('campaign.name != "a AND b"')
+
+  assert table.rows() == [["c"]]
+
+
+def test_filter_int_literal():
+  # Both ids are the same float.
+  ids = [2**60, 2**60 + 1]
+  table = tables.ColumnTable()
+  table.append(["campaign.id"], [[ids[0]], [ids[1]]])
+  table.filter(f"campaign.id = {ids[1]}")
+
+  assert table.rows() == [[ids[1]]]
+
+
+@pytest.mark.parametrize(
+    ("conditions", "message"),
+    [("ctr >", "Invalid condition"), ("ctr > 1", "does not select ctr")],
+)
+def test_filter_errors(conditions, message):
+  with pytest.raises(ValueError, match=message):
+    _table().filter(conditions)
+
+
+def test_to_arrow(tmp_path):
+  pa = pytest.importorskip("pyarrow")
+  import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+
+  table = _table()
+  table.add_derived_metric("cpa")
+  arrow_table = table.to_arrow()
+
+  assert arrow_table.column_names == table.columns
+  assert arrow_table.schema.field("campaign.id").type == pa.int64()
+  assert pa.types.is_dictionary(
+      arrow_table.schema.field("campaign.status").type
+  )
+  assert arrow_table.column("cpa").to_pylist() == [2.5, None, 3.0]
+
+  path = str(tmp_path / "report.parquet")
+  table.write_arrow(path, "parquet")
+
+  assert pyarrow.parquet.read_table(path).num_rows == 3
+
+
+def test_to_arrow_missing_integers():
+  pa = pytest.importorskip("pyarrow")
+  large_id = 2**53 + 1
+  table = tables.ColumnTable()
+  table.append(["campaign.id"], [[large_id], [None], [3]])
+  table.filter("campaign.id != 3")
+
+  column = table.to_arrow().column("campaign.id")
+  assert column.type == pa.int64()
+  assert column.to_pylist() == [large_id]
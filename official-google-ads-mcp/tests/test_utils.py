@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the shared utilities."""
+
+import os
+from unittest import mock
+
+from ads_mcp import utils
+import pytest
+import yaml
+
+
+def test_dump_and_load_yaml_match_safe_functions():
+  data = {"name": "campaign", "fields": ["campaign.id", 1, True, None]}
+
+  text = utils.dump_yaml(data, sort_keys=False)
+
+  assert text == yaml.safe_dump(data, sort_keys=False)
+  assert utils.load_yaml(text) == data
+
+
+def test_load_yaml_rejects_unsafe_tags():
+  with pytest.raises(yaml.YAMLError):
+    utils.load_yaml("!!python/object/apply:os.system ['true']")
+
+
+def test_load_yaml_file_is_cached_until_modified(tmp_path):
+  path = tmp_path / "google-ads.yaml"
+  path.write_text("developer_token: a\n", encoding="utf-8")
+  os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+  with mock.patch.object(
+      utils, "load_yaml", wraps=utils.load_yaml
+  ) as mock_load_yaml:
+    assert utils.load_yaml_file(str(path)) == {"developer_token": "a"}
+    assert utils.load_yaml_file(str(path)) == {"developer_token": "a"}
+    assert mock_load_yaml.call_count == 1
+
+    path.write_text("developer_token: b\n", encoding="utf-8")
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+    assert utils.load_yaml_file(str(path)) == {"developer_token": "b"}
+    assert mock_load_yaml.call_count == 2
@@ -14,13 +14,64 @@
 
 """Tests for the API tools."""
 
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import re
+import threading
+import time
 from unittest import mock
 
+from ads_mcp import metrics
+from ads_mcp import report_cache
+from ads_mcp import result_cache
+from ads_mcp import retries
+from ads_mcp import scheduler
 from ads_mcp.tools import api
+from google.ads.googleads.errors import GoogleAdsException
+from google.ads.googleads.v21.enums.types.campaign_status import CampaignStatusEnum
+from google.ads.googleads.v21.errors.types import errors
+from google.ads.googleads.v21.services.types.google_ads_service import GoogleAdsRow
+from google.api_core import exceptions
+import grpc
 import proto
 import pytest
 
 
+@pytest.fixture(name="credentials_path", autouse=True)
+def fixture_credentials_path(tmp_path):
+  """Points the server at a credentials YAML file of the test."""
+  path = tmp_path / "google-ads.yaml"
+  path.write_text(
+      "developer_token: test-token\nuse_proto_plus: true\n", encoding="utf-8"
+  )
+  with mock.patch.dict(os.environ, {"GOOGLE_ADS_CREDENTIALS": str(path)}):
+    yield str(path)
+
+
+@pytest.fixture(autouse=True)
+def clear_client_pool():
+  """Clears the pooled clients and cached results, and lifts rate limits."""
+  api._CLIENT_POOL.clear()  # pylint: disable=protected-access
+  api._RESULT_CACHE.clear()  # pylint: disable=protected-access
+  with (
+      mock.patch.object(
+          api, "_RETRY_POLICY", retries.RetryPolicy(base_delay=0)
+      ),
+      mock.patch.object(api, "_SCHEDULER", scheduler.QuotaScheduler(0, 0)),
+      mock.patch.object(api, "_IN_FLIGHT", result_cache.SingleFlight()),
+      mock.patch.object(
+          api,
+          "_BATCH_QUERY_SLOTS",
+          asyncio.Semaphore(api.MAX_CONCURRENT_BATCH_QUERIES),
+      ),
+  ):
+    yield
+  api._CLIENT_POOL.clear()  # pylint: disable=protected-access
+  api._RESULT_CACHE.clear()  # pylint: disable=protected-access
+
+
 @pytest.mark.parametrize(
     ("query", "expected"),
     [
@@ -72,8 +123,9 @@ def test_format_value(mocker):
   assert api.format_value(123) == 123
 
 
-@mock.patch("ads_mcp.tools.api.GoogleAdsClient")
-def test_list_accessible_accounts(mock_google_ads_client):
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_list_accessible_accounts(mock_google_ads_client):
   """Tests the list_accessible_accounts function."""
   mock_client_instance = mock_google_ads_client.load_from_storage.return_value
   mock_service = mock_client_instance.get_service.return_value
@@ -81,20 +133,1312 @@ def test_list_accessible_accounts(mock_google_ads_client):
       "customers/123",
       "customers/456",
   ]
-  assert api.list_accessible_accounts() == ["123", "456"]
+  assert await api.list_accessible_accounts() == ["123", "456"]
 
 
-@mock.patch("ads_mcp.tools.api.GoogleAdsClient")
-def test_execute_gaql(mock_google_ads_client):
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql(mock_google_ads_client):
   """Tests the execute_gaql function."""
   mock_client_instance = mock_google_ads_client.load_from_storage.return_value
   mock_ads_service = mock_client_instance.get_service.return_value
   mock_ads_service.search_stream.return_value = [
       mock.Mock(
-          results=[mock.Mock()], field_mask=mock.Mock(paths=["campaign.id"])
+          results=[mock.Mock(**{"campaign.id": "123"})],
+          field_mask=mock.Mock(paths=["campaign.id"]),
       )
   ]
-  with mock.patch("ads_mcp.tools.api.get_nested_attr", return_value="123"):
-    assert api.execute_gaql("SELECT campaign.id FROM campaign", "123") == [
-        {"campaign.id": "123"}
+  assert await api.execute_gaql("SELECT campaign.id FROM campaign", "123") == [
+      {"campaign.id": "123"}
+  ]
+
+
+def test_ads_client_pool_evicts_least_recently_used():
+  """Tests that the pool is bounded and evicts the least recently used."""
+  pool = api.AdsClientPool(max_size=2)
+  first = pool.get(("a",), mock.Mock)
+  pool.get(("b",), mock.Mock)
+  assert pool.get(("a",), mock.Mock) is first  # "a" is now most recent.
+  pool.get(("c",), mock.Mock)
+  assert len(pool) == 2
+  assert pool.get(("a",), mock.Mock) is first
+  assert pool.get(("b",), mock.Mock) is not None
+  assert len(pool) == 2
+
+
+def test_ads_client_pool_reuses_services():
+  """Tests that service clients, and so channels, are created once."""
+  pool = api.AdsClientPool(max_size=1)
+  entry = pool.get(("a",), mock.Mock)
+  service = entry.get_service("GoogleAdsService")
+  assert entry.get_service("GoogleAdsService") is service
+  entry.ads_client.get_service.assert_called_once_with("GoogleAdsService")
+
+
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+def test_get_ads_client_per_login_customer_id(mock_google_ads_client):
+  """Tests that each login_customer_id gets its own unshared client."""
+  mock_google_ads_client.load_from_storage.side_effect = (
+      lambda path: mock.Mock(login_customer_id=None)
+  )
+  default_client = api.get_ads_client()
+  mcc_client = api.get_ads_client("999")
+  assert default_client is not mcc_client
+  assert default_client.login_customer_id is None
+  assert mcc_client.login_customer_id == "999"
+  assert api.get_ads_client("999") is mcc_client
+  assert mock_google_ads_client.load_from_storage.call_count == 2
+
+
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+@mock.patch("ads_mcp.tools.api.get_access_token")
+def test_get_ads_client_with_access_token(
+    mock_get_access_token, mock_google_ads_client
+):
+  """Tests that clients built from access tokens are pooled per token."""
+  mock_google_ads_client.side_effect = lambda *args, **kwargs: mock.Mock()
+  mock_get_access_token.return_value = mock.Mock(token="token-a")
+  client_a = api.get_ads_client("999")
+  assert api.get_ads_client("999") is client_a
+  mock_get_access_token.return_value = mock.Mock(token="token-b")
+  assert api.get_ads_client("999") is not client_a
+  assert mock_google_ads_client.call_count == 2
+  assert mock_google_ads_client.call_args.kwargs["login_customer_id"] == "999"
+  assert mock_google_ads_client.call_args.kwargs["endpoint"] is None
+
+
+@pytest.mark.asyncio
+@mock.patch.object(api.DOCS_INDEX, "get_view_fields")
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+@mock.patch("ads_mcp.tools.api.get_access_token")
+async def test_execute_gaql_with_access_token(
+    mock_get_access_token, mock_google_ads_client, mock_get_view_fields
+):
+  """Tests enum and message columns of clients built from access tokens."""
+  mock_get_access_token.return_value = mock.Mock(token="token")
+  mock_get_view_fields.return_value = {
+      "campaign.status": {"data_type": "ENUM", "is_repeated": False},
+      "campaign.network_settings": {
+          "data_type": "MESSAGE",
+          "is_repeated": False,
+      },
+  }
+  row = GoogleAdsRow()
+  row.campaign.status = CampaignStatusEnum.CampaignStatus.ENABLED
+  row.campaign.network_settings.target_search_network = True
+  paths = ["campaign.status", "campaign.network_settings"]
+
+  def make_client(*args, use_proto_plus=False, **kwargs):
+    del args, kwargs  # Unused.
+    # Like GoogleAdsClient, return raw protobuf rows without proto-plus.
+    result = row if use_proto_plus else GoogleAdsRow.pb(row)
+    client = mock.Mock()
+    client.get_service.return_value.search_stream.return_value = [
+        mock.Mock(results=[result], field_mask=mock.Mock(paths=paths))
     ]
+    return client
+
+  mock_google_ads_client.side_effect = make_client
+  [result] = await api.execute_gaql(
+      "SELECT campaign.status, campaign.network_settings FROM campaign", "123"
+  )
+  assert result["campaign.status"] == "ENABLED"
+  assert result["campaign.network_settings"]["target_search_network"] is True
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_columnar(mock_google_ads_client):
+  """Tests the columnar format of the execute_gaql function."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  paths = ["campaign.id", "campaign.name"]
+  row = mock.Mock(**{"campaign.id": 1, "campaign.name": "a"})
+  mock_ads_service.search_stream.return_value = [
+      mock.Mock(results=[row], field_mask=mock.Mock(paths=paths)),
+      mock.Mock(results=[row], field_mask=mock.Mock(paths=paths)),
+  ]
+  assert await api.execute_gaql(
+      "SELECT campaign.id, campaign.name FROM campaign",
+      "123",
+      format="columnar",
+  ) == {"columns": paths, "rows": [[1, "a"], [1, "a"]]}
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_cached(mock_google_ads_client):
+  """Tests that repeated queries are answered from the result cache."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = lambda **kwargs: _mock_batches(
+      [1], batch_size=1
+  )
+  query = "SELECT campaign.id FROM campaign"
+  assert await api.execute_gaql(query, "123") == [{"campaign.id": 1}]
+  assert await api.execute_gaql(f"  {query} ", "123") == [{"campaign.id": 1}]
+  assert mock_ads_service.search_stream.call_count == 1
+  await api.execute_gaql(query, "456")
+  assert mock_ads_service.search_stream.call_count == 2
+  stats = api.get_result_cache_stats()
+  assert stats["hits"] == 1
+  assert stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_coalesces_concurrent_queries(
+    mock_google_ads_client,
+):
+  """Tests that identical queries running at once share one API call."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+
+  def search_stream(query, customer_id):
+    del query, customer_id  # Unused.
+    time.sleep(0.2)
+    return _mock_batches([1, 2], batch_size=2)
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  responses = await asyncio.gather(
+      *(
+          api.execute_gaql("SELECT campaign.id FROM campaign", "123")
+          for _ in range(4)
+      ),
+      api.execute_gaql("SELECT campaign.id FROM campaign", "456"),
+  )
+  assert all(
+      response == [{"campaign.id": 1}, {"campaign.id": 2}]
+      for response in responses
+  )
+  assert mock_ads_service.search_stream.call_count == 2
+  assert api.get_result_cache_stats()["coalesced"] == 3
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_report_cache(mock_google_ads_client, tmp_path):
+  """Tests that closed days are read from the on-disk report cache."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = lambda **kwargs: [
+      mock.Mock(
+          results=[mock.Mock(**{"segments.date": "2024-01-01"})],
+          field_mask=mock.Mock(paths=["segments.date"]),
+      )
+  ]
+  cache = report_cache.ReportCache(str(tmp_path), lag_days=3)
+  query = (
+      "SELECT segments.date FROM customer"
+      " WHERE segments.date BETWEEN '2024-01-01' AND '2024-01-01'"
+  )
+  with mock.patch.object(api, "_REPORT_CACHE", cache):
+    assert await api.execute_gaql(query, "123") == [
+        {"segments.date": "2024-01-01"}
+    ]
+    api._RESULT_CACHE.clear()  # pylint: disable=protected-access
+    assert await api.execute_gaql(query, "123") == [
+        {"segments.date": "2024-01-01"}
+    ]
+  assert mock_ads_service.search_stream.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_multi(mock_google_ads_client):
+  """Tests that customers are queried in parallel and failures reported."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+
+  def search_stream(query, customer_id):
+    del query  # Unused.
+    time.sleep(0.2)
+    if customer_id == "3":
+      raise GoogleAdsException(
+          None, None, mock.Mock(errors=["PERMISSION_DENIED"]), None
+      )
+    return _mock_batches([int(customer_id)], batch_size=1)
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  start = time.monotonic()
+  response = await api.execute_gaql_multi(
+      "SELECT campaign.id FROM campaign", ["1", "2", "3", "4", "2"]
+  )
+  assert time.monotonic() - start < 0.6
+  assert response == {
+      "rows": [
+          {"customer_id": "1", "campaign.id": 1},
+          {"customer_id": "2", "campaign.id": 2},
+          {"customer_id": "4", "campaign.id": 4},
+      ],
+      "errors": [{"customer_id": "3", "error": "PERMISSION_DENIED"}],
+  }
+
+
+@pytest.mark.asyncio
+@mock.patch.object(api, "_BATCH_QUERY_SLOTS", asyncio.Semaphore(2))
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_multi_shares_batch_slots(mock_google_ads_client):
+  """Tests that concurrent fan-outs share the batch slots of the pool."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  lock = threading.Lock()
+  running = 0
+  max_running = 0
+
+  def search_stream(query, customer_id):
+    del query  # Unused.
+    nonlocal running, max_running
+    with lock:
+      running += 1
+      max_running = max(max_running, running)
+    time.sleep(0.05)
+    with lock:
+      running -= 1
+    return _mock_batches([int(customer_id)], batch_size=1)
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  responses = await asyncio.gather(
+      api.execute_gaql_multi(
+          "SELECT campaign.id FROM campaign", ["1", "2", "3"]
+      ),
+      api.execute_gaql_multi(
+          "SELECT campaign.name FROM campaign", ["4", "5", "6"]
+      ),
+  )
+  assert [len(response["rows"]) for response in responses] == [3, 3]
+  assert max_running == 2
+
+
+@pytest.mark.asyncio
+@mock.patch.object(api, "MULTI_QUERY_TIMEOUT_SECONDS", 0.1)
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_multi_timeout(mock_google_ads_client):
+  """Tests that slow customers time out without failing the others."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+
+  def search_stream(query, customer_id):
+    del query  # Unused.
+    if customer_id == "2":
+      time.sleep(0.3)
+    return _mock_batches([int(customer_id)], batch_size=1)
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  response = await api.execute_gaql_multi(
+      "SELECT campaign.id FROM campaign", ["1", "2"], format="columnar"
+  )
+  assert response["columns"] == ["customer_id", "campaign.id"]
+  assert response["rows"] == [["1", 1]]
+  assert response["errors"][0]["customer_id"] == "2"
+  assert "Timed out" in response["errors"][0]["error"]
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_queries_wait_for_quota_without_a_thread(mock_google_ads_client):
+  """Tests that a throttled query does not hold up the queries of others."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = lambda **kwargs: _mock_batches(
+      [1], batch_size=1
+  )
+  with (
+      mock.patch.object(
+          api,
+          "_SCHEDULER",
+          scheduler.QuotaScheduler(0, customer_rate=1, burst_seconds=1),
+      ),
+      mock.patch.object(
+          api, "_QUERY_EXECUTOR", concurrent.futures.ThreadPoolExecutor(1)
+      ),
+  ):
+    await api.execute_gaql("SELECT campaign.id FROM campaign", "1")
+    throttled = asyncio.ensure_future(
+        api.execute_gaql("SELECT campaign.name FROM campaign", "1")
+    )
+    await asyncio.sleep(0.05)
+
+    # The only thread of the pool is free for the queries of customer 2.
+    await asyncio.wait_for(
+        api.execute_gaql("SELECT campaign.id FROM campaign", "2"), 0.5
+    )
+    assert not throttled.done()
+    await throttled
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_retries_wait_for_quota_without_a_thread(mock_google_ads_client):
+  """Tests that a retry without quota gives its thread back while it waits."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  calls = []
+
+  def search_stream(query, customer_id):
+    del query  # Unused.
+    calls.append(customer_id)
+    if calls.count(customer_id) == 1 and customer_id == "1":
+      return _failing_stream([], failed_after=0)
+    return _mock_batches([int(customer_id)], batch_size=1)
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  with (
+      mock.patch.object(
+          api,
+          "_SCHEDULER",
+          scheduler.QuotaScheduler(0, customer_rate=1, burst_seconds=1),
+      ),
+      mock.patch.object(
+          api, "_QUERY_EXECUTOR", concurrent.futures.ThreadPoolExecutor(1)
+      ),
+  ):
+    retried = asyncio.ensure_future(
+        api.execute_gaql("SELECT campaign.id FROM campaign", "1")
+    )
+    await asyncio.sleep(0.05)
+
+    # The retry of customer 1 waits for quota on the event loop.
+    assert await asyncio.wait_for(
+        api.execute_gaql("SELECT campaign.id FROM campaign", "2"), 0.5
+    ) == [{"campaign.id": 2}]
+    assert not retried.done()
+    assert await retried == [{"campaign.id": 1}]
+  assert calls == ["1", "2", "1"]
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_retry_delays_wait_without_a_thread(mock_google_ads_client):
+  """Tests that a retry gives its thread back during the delay before it."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  calls = []
+
+  def search_stream(query, customer_id):
+    del query  # Unused.
+    calls.append(customer_id)
+    if calls.count(customer_id) == 1 and customer_id == "1":
+      return _failing_stream([], failed_after=0)
+    return _mock_batches([int(customer_id)], batch_size=1)
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  with (
+      mock.patch.object(
+          api,
+          "_RETRY_POLICY",
+          retries.RetryPolicy(base_delay=0.4, max_delay=0.4),
+      ),
+      mock.patch.object(
+          api, "_QUERY_EXECUTOR", concurrent.futures.ThreadPoolExecutor(1)
+      ),
+  ):
+    retried = asyncio.ensure_future(
+        api.execute_gaql("SELECT campaign.id FROM campaign", "1")
+    )
+    await asyncio.sleep(0.05)
+
+    # The retry of customer 1 waits on the event loop.
+    assert await asyncio.wait_for(
+        api.execute_gaql("SELECT campaign.id FROM campaign", "2"), 0.1
+    ) == [{"campaign.id": 2}]
+    assert not retried.done()
+    assert await retried == [{"campaign.id": 1}]
+  assert calls == ["1", "2", "1"]
+
+
+def test_query_stream_retry_delay_is_cancelled():
+  """Tests that cancelling a stream stops the delay before its retry."""
+  open_batches = mock.Mock(side_effect=[_failing_stream([], failed_after=0)])
+  stream = api.QueryStream(None, open_batches=open_batches)
+  threading.Timer(0.05, stream.cancel).start()
+  started_at = time.perf_counter()
+  with (
+      mock.patch.object(
+          api,
+          "_RETRY_POLICY",
+          retries.RetryPolicy(base_delay=10, max_delay=10),
+      ),
+      pytest.raises(RuntimeError, match="cancelled"),
+  ):
+    stream.read()
+  assert time.perf_counter() - started_at < 1
+  assert open_batches.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_waiting_for_quota_is_cancelled(mock_google_ads_client):
+  """Tests that cancelling a call stops its wait for quota."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = lambda **kwargs: (
+      _failing_stream([], failed_after=0)
+  )
+  quota_scheduler = scheduler.QuotaScheduler(
+      0, customer_rate=1, burst_seconds=1
+  )
+  with mock.patch.object(api, "_SCHEDULER", quota_scheduler):
+    call = asyncio.ensure_future(
+        api.execute_gaql("SELECT campaign.id FROM campaign", "1")
+    )
+    await asyncio.sleep(0.05)
+    assert quota_scheduler.stats()["queued"] == 1
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+      await call
+  assert quota_scheduler.stats()["queued"] == 0
+  assert mock_ads_service.search_stream.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_paginated_read_keeps_rows_while_waiting_for_quota(
+    mock_google_ads_client,
+):
+  """Tests that a page suspended for quota keeps the rows it had read."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches(list(range(6)), batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=2),
+      iter(batches),
+  ]
+  quota_scheduler = scheduler.QuotaScheduler(
+      0, customer_rate=20, burst_seconds=0.05
+  )
+  with mock.patch.object(api, "_SCHEDULER", quota_scheduler):
+    page = await api.execute_gaql(
+        "SELECT campaign.id FROM campaign ORDER BY campaign.id",
+        "123",
+        format="columnar",
+        page_size=3,
+    )
+    assert page["rows"] == [[0], [1], [2]]
+    page = await api.fetch_gaql_page(page["next_cursor"])
+  assert page == {
+      "columns": ["campaign.id"],
+      "rows": [[3], [4], [5]],
+      "next_cursor": None,
+  }
+  assert quota_scheduler.stats()["throttled"] >= 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_filtered_read_keeps_rows_while_waiting_for_quota(
+    mock_google_ads_client,
+):
+  """Tests that rows consumed before waiting for quota are kept."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches(list(range(6)), batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=2),
+      iter(batches),
+  ]
+  quota_scheduler = scheduler.QuotaScheduler(
+      0, customer_rate=20, burst_seconds=0.05
+  )
+  with mock.patch.object(api, "_SCHEDULER", quota_scheduler):
+    assert await api.execute_gaql(
+        "SELECT campaign.id FROM campaign ORDER BY campaign.id",
+        "123",
+        format="columnar",
+        having="campaign.id >= 1",
+    ) == {"columns": ["campaign.id"], "rows": [[1], [2], [3], [4], [5]]}
+  assert quota_scheduler.stats()["throttled"] == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_report_cache_fill_waits_for_quota(
+    mock_google_ads_client, tmp_path
+):
+  """Tests that a report cache fill suspended for quota fetches days once."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+
+  def search_stream(query, customer_id):
+    del customer_id  # Unused.
+    day = re.search(r"BETWEEN '([0-9-]+)'", query).group(1)
+    return [
+        mock.Mock(
+            results=[mock.Mock(**{"segments.date": day})],
+            field_mask=mock.Mock(paths=["segments.date"]),
+        )
+    ]
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  query = (
+      "SELECT segments.date FROM customer"
+      " WHERE segments.date BETWEEN '2024-01-{}' AND '2024-01-{}'"
+  )
+  quota_scheduler = scheduler.QuotaScheduler(
+      0, customer_rate=20, burst_seconds=0.05
+  )
+  with (
+      mock.patch.object(
+          api, "_REPORT_CACHE", report_cache.ReportCache(str(tmp_path), 3)
+      ),
+      mock.patch.object(api, "_SCHEDULER", quota_scheduler),
+  ):
+    await api.execute_gaql(query.format("02", "02"), "123")
+    # Days 1 and 3 are fetched by two requests, waiting for quota.
+    assert await api.execute_gaql(
+        query.format("01", "03"), "123", format="columnar"
+    ) == {
+        "columns": ["segments.date"],
+        "rows": [["2024-01-01"], ["2024-01-02"], ["2024-01-03"]],
+    }
+  assert mock_ads_service.search_stream.call_count == 3
+  assert quota_scheduler.stats()["throttled"] >= 2
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_report_cache_fallback_waits_for_quota(
+    mock_google_ads_client, tmp_path
+):
+  """Tests that rows read before waiting for quota are not fetched again."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+
+  def search_stream(query, customer_id):
+    del customer_id  # Unused.
+    # Only the rows of day 2 have their date, the others cannot be stored.
+    values = {"customer.id": 1}
+    if "'2024-01-02' AND '2024-01-02'" in query:
+      values["segments.date"] = "2024-01-02"
+    return [
+        mock.Mock(
+            results=[mock.Mock(**values)],
+            field_mask=mock.Mock(paths=list(values)),
+        )
+    ]
+
+  mock_ads_service.search_stream.side_effect = search_stream
+  query = (
+      "SELECT customer.id, segments.date FROM customer"
+      " WHERE segments.date BETWEEN '2024-01-{}' AND '2024-01-{}'"
+  )
+  quota_scheduler = scheduler.QuotaScheduler(
+      0, customer_rate=20, burst_seconds=0.05
+  )
+  with (
+      mock.patch.object(
+          api, "_REPORT_CACHE", report_cache.ReportCache(str(tmp_path), 3)
+      ),
+      mock.patch.object(api, "_SCHEDULER", quota_scheduler),
+  ):
+    await api.execute_gaql(query.format("02", "02"), "123")
+    # Days 1 and 3 are fetched, and day 2 is read from the store.
+    assert (
+        await asyncio.wait_for(
+            api.execute_gaql(query.format("01", "03"), "123"), 5
+        )
+        == [{"customer.id": 1}] * 3
+    )
+  assert mock_ads_service.search_stream.call_count == 3
+
+
+class _BlockingStream:
+  """search_stream batches waiting until the call is cancelled."""
+
+  def __init__(self, batches=()):
+    self.batches = batches
+    self.cancelled = threading.Event()
+    self.stopped = threading.Event()
+
+  def cancel(self):
+    self.cancelled.set()
+
+  def __iter__(self):
+    yield from self.batches
+    try:
+      self.cancelled.wait(5)
+      raise exceptions.Cancelled("Locally cancelled by application.")
+    finally:
+      self.stopped.set()
+
+
+@pytest.mark.asyncio
+@mock.patch.object(api, "MULTI_QUERY_TIMEOUT_SECONDS", 0.1)
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_multi_timeout_cancels_query(
+    mock_google_ads_client,
+):
+  """Tests that a query timing out is cancelled and stopped."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  stream = _BlockingStream()
+  mock_ads_service.search_stream.return_value = stream
+
+  response = await api.execute_gaql_multi(
+      "SELECT campaign.id FROM campaign", ["1"]
+  )
+  assert "Timed out" in response["errors"][0]["error"]
+  assert stream.cancelled.is_set()
+  # The batch slot of the query is only freed once its thread has stopped.
+  assert stream.stopped.is_set()
+
+
+def _mock_batches(values, batch_size):
+  """Builds search_stream batches with one campaign.id row per value."""
+  return [
+      mock.Mock(
+          results=[
+              mock.Mock(**{"campaign.id": value})
+              for value in values[i : i + batch_size]
+          ],
+          field_mask=mock.Mock(paths=["campaign.id"]),
+      )
+      for i in range(0, len(values), batch_size)
+  ]
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_paginated(mock_google_ads_client):
+  """Tests reading query results page by page with a cursor."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.return_value = _mock_batches(
+      list(range(5)), batch_size=2
+  )
+  page = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign", "123", page_size=2
+  )
+  assert page["rows"] == [{"campaign.id": 0}, {"campaign.id": 1}]
+  page = await api.fetch_gaql_page(page["next_cursor"])
+  assert page["rows"] == [{"campaign.id": 2}, {"campaign.id": 3}]
+  cursor = page["next_cursor"]
+  page = await api.fetch_gaql_page(cursor)
+  assert page == {"rows": [{"campaign.id": 4}], "next_cursor": None}
+  with pytest.raises(ValueError):
+    await api.fetch_gaql_page(cursor)
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_fetch_gaql_page_timeout_cancels_query(mock_google_ads_client):
+  """Tests that a page timing out cancels the stream of its cursor."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  stream = _BlockingStream(_mock_batches(list(range(3)), batch_size=3))
+  mock_ads_service.search_stream.return_value = stream
+  page = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign", "123", page_size=2
+  )
+
+  with pytest.raises(TimeoutError):
+    await asyncio.wait_for(api.fetch_gaql_page(page["next_cursor"]), 0.1)
+  assert stream.cancelled.is_set()
+  assert stream.stopped.is_set()
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_single_page(mock_google_ads_client):
+  """Tests that no cursor is kept when the results fit in one page."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.return_value = _mock_batches(
+      [7, 8], batch_size=2
+  )
+  assert await api.execute_gaql(
+      "SELECT campaign.id FROM campaign",
+      "123",
+      format="columnar",
+      page_size=2,
+  ) == {"columns": ["campaign.id"], "rows": [[7], [8]], "next_cursor": None}
+
+
+def test_query_stream_reads_lazily():
+  """Tests that QueryStream only pulls the batches it needs."""
+  batches = iter(_mock_batches(list(range(6)), batch_size=2))
+  stream = api.QueryStream(batches)
+  assert stream.read(3) == [[0], [1], [2]]
+  assert stream.columns == ["campaign.id"]
+  assert len(list(batches)) == 1  # The last batch was not read.
+
+
+def _transient_error(code="TRANSIENT_ERROR"):
+  failure = errors.GoogleAdsFailure(
+      errors=[
+          errors.GoogleAdsError(
+              error_code=errors.ErrorCode(internal_error=code),
+              message="Try again.",
+          )
+      ]
+  )
+  return GoogleAdsException(None, None, failure, None)
+
+
+def _failing_stream(batches, failed_after):
+  """Yields search_stream batches, failing after some of them."""
+  yield from batches[:failed_after]
+  raise _transient_error()
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_retries_transient_errors(mock_google_ads_client):
+  """Tests that streams failing partway are read again from the start."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches(list(range(4)), batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _transient_error(),
+      _failing_stream(batches, failed_after=1),
+      iter(batches),
+  ]
+  response = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign", "123", format="columnar"
+  )
+  assert response["rows"] == [[0], [1], [2], [3]]
+  assert mock_ads_service.search_stream.call_count == 3
+  assert api.get_retry_stats() == {"retries": 2, "resumed": 0, "exhausted": 0}
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_gives_up_after_max_attempts(
+    mock_google_ads_client,
+):
+  """Tests that transient errors are returned after the last attempt."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = [
+      _transient_error() for _ in range(3)
+  ]
+  with pytest.raises(RuntimeError, match="Try again."):
+    await api.execute_gaql("SELECT campaign.id FROM campaign", "123")
+  assert mock_ads_service.search_stream.call_count == 3
+  assert api.get_retry_stats()["exhausted"] == 1
+
+
+class _RpcError(grpc.RpcError):
+  """A gRPC error raised by the client library without conversion."""
+
+  def __init__(self, code):
+    super().__init__()
+    self._code = code
+
+  def code(self):
+    return self._code
+
+  def details(self):
+    return f"{self._code.name} from the server."
+
+  def trailing_metadata(self):
+    return ()
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_retries_grpc_errors(mock_google_ads_client):
+  """Tests that gRPC errors are retried by status code."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = [
+      exceptions.ServiceUnavailable("Unavailable."),
+      iter(_mock_batches([1], batch_size=1)),
+  ]
+  response = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign", "123", format="columnar"
+  )
+  assert response["rows"] == [[1]]
+  assert api.get_retry_stats()["retries"] == 1
+
+  mock_ads_service.search_stream.side_effect = [
+      _RpcError(grpc.StatusCode.PERMISSION_DENIED)
+  ]
+  with pytest.raises(RuntimeError, match="PERMISSION_DENIED from the server"):
+    await api.execute_gaql("SELECT campaign.name FROM campaign", "123")
+  assert api.get_retry_stats()["retries"] == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_paginated_resumes_ordered_stream(
+    mock_google_ads_client,
+):
+  """Tests that an ordered stream resumes after the rows already read."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches(list(range(6)), batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=2),
+      iter(batches),
+  ]
+  page = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign ORDER BY campaign.id",
+      "123",
+      format="columnar",
+      page_size=3,
+  )
+  assert page["rows"] == [[0], [1], [2]]
+  page = await api.fetch_gaql_page(page["next_cursor"])
+  assert page["rows"] == [[3], [4], [5]]
+  assert page["next_cursor"] is None
+  assert api.get_retry_stats()["resumed"] == 1
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("SELECT campaign.id FROM campaign ORDER BY campaign.id", True),
+        (
+            "SELECT campaign.id FROM campaign"
+            " ORDER BY metrics.clicks DESC, campaign.resource_name LIMIT 10",
+            True,
+        ),
+        ("SELECT campaign.id FROM campaign", False),
+        (
+            "SELECT campaign.id FROM campaign ORDER BY metrics.clicks DESC",
+            False,
+        ),
+        ("SELECT ad_group.id FROM ad_group ORDER BY campaign.id", False),
+        (
+            "SELECT campaign.id, segments.date FROM campaign"
+            " ORDER BY campaign.id",
+            False,
+        ),
+    ],
+)
+def test_has_stable_order(query, expected):
+  """Tests the has_stable_order function."""
+  assert api.has_stable_order(query) == expected
+  assert api.has_stable_order(api.preprocess_gaql(query)) == expected
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_restarts_stream_with_ties(mock_google_ads_client):
+  """Tests that a stream ordered by a key with ties is read from the start."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  # Every campaign has the same clicks, so each call may order them anew.
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(_mock_batches([0, 1, 2, 3], batch_size=2), 1),
+      iter(_mock_batches([2, 0, 3, 1], batch_size=2)),
+  ]
+  rows = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign ORDER BY metrics.clicks DESC",
+      "123",
+      format="columnar",
+  )
+  assert rows == {"columns": ["campaign.id"], "rows": [[2], [0], [3], [1]]}
+  assert api.get_retry_stats()["resumed"] == 0
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_paginated_unordered_stream_fails(
+    mock_google_ads_client,
+):
+  """Tests that an unordered stream is not resumed after a page was read."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches(list(range(6)), batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=2),
+      iter(batches),
+  ]
+  page = await api.execute_gaql(
+      "SELECT campaign.id FROM campaign", "123", page_size=3
+  )
+  with pytest.raises(RuntimeError, match="Try again."):
+    await api.fetch_gaql_page(page["next_cursor"])
+  assert mock_ads_service.search_stream.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_aggregate_gaql(mock_google_ads_client):
+  """Tests that streams failing partway are aggregated again from scratch."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches([1, 2, 1, 1], batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=1),
+      iter(batches),
+  ]
+  response = await api.aggregate_gaql(
+      "SELECT campaign.id FROM campaign",
+      "123",
+      group_by=["campaign.id"],
+      metrics=["count(*)"],
+      format="columnar",
+  )
+  assert response == {
+      "columns": ["campaign.id", "count(*)"],
+      "rows": [[1, 3], [2, 1]],
+      "groups": 2,
+      "rows_read": 4,
+  }
+  assert mock_ads_service.search_stream.call_count == 2
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_aggregate_gaql_from_result_cache(mock_google_ads_client):
+  """Tests that cached results are aggregated without calling the API."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.return_value = _mock_batches(
+      [1, 2, 2], batch_size=2
+  )
+  query = "SELECT campaign.id FROM campaign"
+  await api.execute_gaql(query, "123")
+  response = await api.aggregate_gaql(
+      query, "123", group_by=[], metrics=["count_distinct(campaign.id)"]
+  )
+  assert response["rows"] == [{"count_distinct(campaign.id)": 2}]
+  assert mock_ads_service.search_stream.call_count == 1
+
+  with pytest.raises(ValueError, match="does not select campaign.name"):
+    await api.aggregate_gaql(
+        query, "123", group_by=["campaign.name"], metrics=["count(*)"]
+    )
+  assert mock_ads_service.search_stream.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_derived_metrics(mock_google_ads_client):
+  """Tests derived metrics and conditions computed on the result columns."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  paths = ["campaign.id", "metrics.clicks", "metrics.cost_micros"]
+  mock_ads_service.search_stream.return_value = [
+      mock.Mock(
+          results=[
+              mock.Mock(**dict(zip(paths, values)))
+              for values in ([1, 4, 2_000_000], [2, 0, 0], [3, 1, 3_000_000])
+          ],
+          field_mask=mock.Mock(paths=paths),
+      )
+  ]
+  query = (
+      "SELECT campaign.id, metrics.clicks, metrics.cost_micros FROM campaign"
+  )
+  response = await api.execute_gaql(
+      query,
+      "123",
+      format="columnar",
+      convert_micros=True,
+      derived_metrics=["cpc"],
+      having="metrics.cost_micros > 0",
+  )
+  assert response == {
+      "columns": paths + ["cpc"],
+      "rows": [[1, 4, 2.0, 0.5], [3, 1, 3.0, 3.0]],
+  }
+
+  with pytest.raises(ValueError, match="ctr needs metrics.impressions"):
+    await api.execute_gaql(query, "123", derived_metrics=["ctr"])
+  with pytest.raises(ValueError, match="page_size"):
+    await api.execute_gaql(query, "123", having="cpc > 1", page_size=10)
+  assert mock_ads_service.search_stream.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_derived_metrics_without_rows(
+    mock_google_ads_client,
+):
+  """Tests derived metrics of a stream returning no batch."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.return_value = []
+  response = await api.execute_gaql(
+      "SELECT metrics.clicks, metrics.impressions FROM campaign",
+      "123",
+      format="columnar",
+      derived_metrics=["ctr"],
+      having="ctr > 0.1",
+  )
+  assert response == {
+      "columns": ["metrics.clicks", "metrics.impressions", "ctr"],
+      "rows": [],
+  }
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_export_gaql(mock_google_ads_client, tmp_path):
+  """Tests that streams failing partway are written again from scratch."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches([1, 2, 3], batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=1),
+      iter(batches),
+  ]
+  with mock.patch.object(api, "EXPORT_DIR", str(tmp_path)):
+    response = await api.export_gaql(
+        "SELECT campaign.id FROM campaign", "123", "campaigns.csv", "csv"
+    )
+    with pytest.raises(ValueError, match="exports are written in"):
+      await api.export_gaql(
+          "SELECT campaign.id FROM campaign", "123", "../campaigns.csv", "csv"
+      )
+
+  path = tmp_path / "server" / "campaigns.csv"
+  assert response == {
+      "path": str(path),
+      "format": "csv",
+      "rows": 3,
+      "schema": {"campaign.id": "int64"},
+      "bytes": path.stat().st_size,
+  }
+  assert path.read_text(encoding="utf-8").split() == [
+      "campaign.id",
+      "1",
+      "2",
+      "3",
+  ]
+  assert mock_ads_service.search_stream.call_count == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path", ["google-ads.yaml", ".env", "ads_mcp/tools/api.py", "a.csv"]
+)
+async def test_export_gaql_does_not_replace_other_files(tmp_path, path):
+  """Tests that exports only write files with the extension of their format."""
+  target = tmp_path / "server" / path
+  target.parent.mkdir(parents=True, exist_ok=True)
+  target.write_text("developer_token: secret", encoding="utf-8")
+  with mock.patch.object(api, "EXPORT_DIR", str(tmp_path)):
+    with pytest.raises(ValueError, match="must end with .jsonl"):
+      await api.export_gaql(
+          "SELECT campaign.id FROM campaign", "123", path, "jsonl"
+      )
+
+  assert target.read_text(encoding="utf-8") == "developer_token: secret"
+
+
+@mock.patch("ads_mcp.tools.api.get_access_token")
+def test_get_export_dir(mock_get_access_token, tmp_path):
+  """Tests that exports go to a directory of the request credentials."""
+  mock_get_access_token.return_value = None
+  cwd = os.getcwd()
+  os.chdir(tmp_path)
+  try:
+    with mock.patch.object(api, "EXPORT_DIR", None):
+      export_dir = api._get_export_dir()  # pylint: disable=protected-access
+  finally:
+    os.chdir(cwd)
+  assert export_dir == str(tmp_path / "exports" / "server")
+
+  with mock.patch.object(api, "EXPORT_DIR", str(tmp_path)):
+    mock_get_access_token.return_value = mock.Mock(token="token-a")
+    export_dir_a = api._get_export_dir()  # pylint: disable=protected-access
+    mock_get_access_token.return_value = mock.Mock(token="token-b")
+    export_dir_b = api._get_export_dir()  # pylint: disable=protected-access
+  assert os.path.dirname(export_dir_a) == str(tmp_path)
+  assert os.path.dirname(export_dir_b) == str(tmp_path)
+  assert export_dir_a != export_dir_b
+  assert "token" not in export_dir_a
+
+
+class _InMemorySpan:
+  """A span kept in memory by `_InMemoryTracer`."""
+
+  def __init__(self, name, attributes):
+    self.name = name
+    self.attributes = dict(attributes or {})
+    self.events = []
+    self.status = None
+    self.ended = False
+
+  def add_event(self, name):
+    self.events.append(name)
+
+  def set_attribute(self, key, value):
+    self.attributes[key] = value
+
+  def record_exception(self, exception):
+    self.events.append(type(exception).__name__)
+
+  def set_status(self, status):
+    self.status = status
+
+  def end(self):
+    self.ended = True
+
+
+class _InMemoryTracer:
+  """Keeps the spans started in memory instead of exporting them."""
+
+  def __init__(self):
+    self.spans = []
+
+  def start_span(self, name, attributes=None):
+    span = _InMemorySpan(name, attributes)
+    self.spans.append(span)
+    return span
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_metrics_and_traces(mock_google_ads_client):
+  """Tests that query streams are measured and traced."""
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  batches = _mock_batches(list(range(3)), batch_size=2)
+  mock_ads_service.search_stream.side_effect = [
+      _failing_stream(batches, failed_after=1),
+      iter(batches),
+  ]
+
+  def sample(name, **labels):
+    return metrics.REGISTRY.get_sample(name, **labels) or 0
+
+  rows = sample("ads_mcp_gaql_rows_total")
+  errors_count = sample(
+      "ads_mcp_gaql_errors_total", error_code="internal_error.TRANSIENT_ERROR"
+  )
+  streams = sample("ads_mcp_gaql_stream_seconds_count")
+  tracer = _InMemoryTracer()
+  with mock.patch.object(metrics, "TRACER", tracer):
+    await api.execute_gaql("SELECT campaign.id FROM campaign", "987")
+
+  # The rows read before the stream was restarted are counted too.
+  assert sample("ads_mcp_gaql_rows_total") == rows + 5
+  assert (
+      sample(
+          "ads_mcp_gaql_errors_total",
+          error_code="internal_error.TRANSIENT_ERROR",
+      )
+      == errors_count + 1
+  )
+  assert sample("ads_mcp_gaql_stream_seconds_count") == streams + 1
+  assert len(tracer.spans) == 1
+  span = tracer.spans[0]
+  assert span.name == "ads_mcp.gaql.search_stream"
+  assert span.attributes == {
+      "ads_mcp.customer_id": "987",
+      "ads_mcp.rows": 5,
+  }
+  assert span.events == ["first_batch"]
+  assert span.ended
+
+
+@pytest.mark.asyncio
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+async def test_execute_gaql_failure_traces(mock_google_ads_client):
+  """Tests that failed query streams end their span with an error."""
+  trace = pytest.importorskip("opentelemetry.trace")
+  mock_client_instance = mock_google_ads_client.load_from_storage.return_value
+  mock_ads_service = mock_client_instance.get_service.return_value
+  mock_ads_service.search_stream.side_effect = GoogleAdsException(
+      None, None, mock.Mock(errors=["PERMISSION_DENIED"]), None
+  )
+  tracer = _InMemoryTracer()
+  with mock.patch.object(metrics, "TRACER", tracer):
+    with pytest.raises(RuntimeError):
+      await api.execute_gaql("SELECT campaign.id FROM campaign", "987")
+
+  assert len(tracer.spans) == 1
+  span = tracer.spans[0]
+  assert span.status == trace.StatusCode.ERROR
+  assert span.events == ["GoogleAdsException"]
+  assert span.ended
+
+
+def test_compile_row_formatter():
+  """Tests the compile_row_formatter function with Google Ads API rows."""
+  row = GoogleAdsRow()
+  row.campaign.id = 123
+  row.campaign.status = CampaignStatusEnum.CampaignStatus.ENABLED
+  row.segments.keyword.info.text = "movers"
+  format_row = api.compile_row_formatter(
+      ["campaign.id", "campaign.status", "segments.keyword.info"]
+  )
+  assert format_row(row) == [
+      123,
+      "ENABLED",
+      {"text": "movers", "match_type": 0},
+  ]
+  row.campaign.status = CampaignStatusEnum.CampaignStatus.PAUSED
+  assert format_row(row)[1] == "PAUSED"
+
+  assert api.compile_row_formatter(["campaign.id"])(row) == [123]
+  assert not api.compile_row_formatter([])(row)
+
+
+def test_compile_row_formatter_with_metadata():
+  """Tests that converters are selected from the view metadata."""
+  row = GoogleAdsRow()
+  row.campaign.status = CampaignStatusEnum.CampaignStatus.ENABLED
+  row.metrics.cost_micros = 1_500_000
+  field_metadata = {
+      "campaign.status": {"data_type": "ENUM", "is_repeated": False},
+      "metrics.cost_micros": {"data_type": "INT64", "is_repeated": False},
+  }
+  paths = ["campaign.status", "metrics.cost_micros"]
+  assert api.compile_row_formatter(paths, field_metadata)(row) == [
+      "ENABLED",
+      1_500_000,
+  ]
+  assert api.compile_row_formatter(paths, field_metadata, convert_micros=True)(
+      row
+  ) == ["ENABLED", 1.5]
+
+
+def test_build_response():
+  """Tests the build_response function."""
+  columns = ["campaign.id", "campaign.name"]
+  rows = [[1, "a"], [2, "b"]]
+  assert api.build_response(columns, rows) == [
+      {"campaign.id": 1, "campaign.name": "a"},
+      {"campaign.id": 2, "campaign.name": "b"},
+  ]
+  assert api.build_response(columns, rows, "columnar") == {
+      "columns": columns,
+      "rows": rows,
+  }
+  with pytest.raises(ValueError):
+    api.build_response(columns, rows, "xml")
+
+
+@pytest.mark.asyncio
+async def test_run_blocking_copies_context():
+  """Tests that run_blocking runs in a worker thread with the caller context."""
+  var = contextvars.ContextVar("var")
+  var.set("value")
+
+  def read_var():
+    return var.get(), threading.current_thread().name
+
+  value, thread_name = await api.run_blocking(read_var)
+  assert value == "value"
+  assert thread_name.startswith("ads-mcp-query")
+
+
+@mock.patch("google.ads.googleads.client.GoogleAdsClient")
+def test_start_warm_up(mock_google_ads_client, credentials_path):
+  """Tests that the client is loaded in the background and pooled."""
+  thread = api.start_warm_up()
+  thread.join(timeout=5)
+
+  assert not thread.is_alive()
+  mock_google_ads_client.load_from_storage.assert_called_once_with(
+      credentials_path
+  )
+  assert len(api._CLIENT_POOL) == 1  # pylint: disable=protected-access
+  assert api.get_ads_client() is (
+      mock_google_ads_client.load_from_storage.return_value
+  )
+
+
+@mock.patch.object(api, "get_ads_client", side_effect=ValueError("Bad."))
+def test_start_warm_up_logs_errors(_, caplog):
+  """Tests that a failure to load the client does not stop the server."""
+  api.start_warm_up().join(timeout=5)
+
+  assert "Failed to load the Google Ads API client." in caplog.text
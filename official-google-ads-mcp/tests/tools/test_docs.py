@@ -0,0 +1,42 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the docs tools."""
+
+from unittest import mock
+
+from ads_mcp.docs_index import DocsIndex
+from ads_mcp.tools import docs
+import pytest
+
+
+def test_get_gaql_doc_resource(tmp_path):
+  """Tests that the GAQL guide is read from the docs."""
+  (tmp_path / "GAQL.md").write_text("# GAQL", encoding="utf-8")
+  with mock.patch.object(
+      docs, "DOCS_INDEX", DocsIndex(root=str(tmp_path), check_interval=0)
+  ):
+    assert docs.get_gaql_doc_resource() == "# GAQL"
+
+
+@pytest.mark.parametrize(
+    "read_doc", [docs.get_gaql_doc_resource, docs.get_reporting_doc]
+)
+def test_missing_doc_file(tmp_path, read_doc):
+  """Tests that a missing doc file fails instead of returning None."""
+  with mock.patch.object(
+      docs, "DOCS_INDEX", DocsIndex(root=str(tmp_path), check_interval=0)
+  ):
+    with pytest.raises(FileNotFoundError, match="is not found"):
+      read_doc()